@@ -0,0 +1,168 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 PolyBeacon, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measures what filtering the Keystone v3 listings on the server saves.
+
+For the groups and the users of one domain, it compares listing every
+resource and filtering on the client (``client_filter``) with asking
+Keystone for the resources of the domain only (``server_filter``): the
+bytes transferred, and the time spent fetching, decoding and filtering.
+
+By default the listings are generated, with ``--resources`` resources
+spread over ``--domains`` domains. Given ``--endpoint`` and ``--token``,
+the listings of a live Identity v3 endpoint are measured instead::
+
+    python tools/identity_filter_benchmark.py \\
+        --endpoint http://keystone:35357/v3 --token ADMIN_TOKEN --domain ID
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+import timeit
+import urllib
+import urllib2
+
+KINDS = ('groups', 'users')
+
+
+def generate_listing(kind, resources, domains):
+    """Returns the body of a synthetic listing of ``kind``, as a string."""
+    items = []
+    for index in range(resources):
+        item = {'id': '%032x' % index,
+                'name': '%s-%d' % (kind[:-1], index),
+                'domain_id': 'domain%d' % (index % domains),
+                'description': 'Synthetic %s %d' % (kind[:-1], index),
+                'links': {'self': 'http://keystone:35357/v3/%s/%032x'
+                                  % (kind, index)}}
+        if kind == 'users':
+            item.update({'email': 'user%d@example.com' % index,
+                         'enabled': True,
+                         'default_project_id': None})
+        items.append(item)
+    return json.dumps({kind: items,
+                       'links': {'self': 'http://keystone:35357/v3/%s' % kind,
+                                 'previous': None,
+                                 'next': None}})
+
+
+def synthetic_fetcher(options):
+    bodies = dict((kind, generate_listing(kind, options.resources,
+                                          options.domains))
+                  for kind in KINDS)
+    filtered = {}
+    for kind in KINDS:
+        data = json.loads(bodies[kind])
+        data[kind] = [item for item in data[kind]
+                      if item['domain_id'] == options.domain]
+        filtered[kind] = json.dumps(data)
+
+    def fetch(kind, domain=None):
+        return filtered[kind] if domain else bodies[kind]
+    return fetch
+
+
+def live_fetcher(options):
+    def fetch(kind, domain=None):
+        url = '%s/%s' % (options.endpoint.rstrip('/'), kind)
+        if domain:
+            url += '?' + urllib.urlencode({'domain_id': domain})
+        request = urllib2.Request(url, headers={'X-Auth-Token':
+                                                options.token})
+        return urllib2.urlopen(request).read()
+    return fetch
+
+
+def measure(fetch, kind, domain, server_side, repeat):
+    state = {}
+
+    def run():
+        body = fetch(kind, domain if server_side else None)
+        items = [item for item in json.loads(body)[kind]
+                 if item['domain_id'] == domain]
+        state.update(bytes=len(body), items=len(items))
+
+    best = min(timeit.repeat(run, repeat=repeat, number=1))
+    return {'bytes': state['bytes'], 'items': state['items'], 'best': best}
+
+
+def run(options):
+    if options.endpoint:
+        fetch = live_fetcher(options)
+        source = options.endpoint
+    else:
+        fetch = synthetic_fetcher(options)
+        source = 'synthetic'
+
+    results = {}
+    for kind in KINDS:
+        client = measure(fetch, kind, options.domain, False, options.repeat)
+        server = measure(fetch, kind, options.domain, True, options.repeat)
+        results[kind] = {
+            'client_filter': client,
+            'server_filter': server,
+            'bytes_saved': client['bytes'] - server['bytes'],
+            'transfer_ratio': (float(server['bytes']) / client['bytes']
+                               if client['bytes'] else None),
+        }
+    params = {'source': source, 'domain': options.domain}
+    if not options.endpoint:
+        params.update(resources=options.resources, domains=options.domains)
+    return {'params': params, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measures the savings of filtering Keystone v3 '
+                    'listings on the server.')
+    parser.add_argument('--resources', type=int, default=20000,
+                        help='groups and users of the synthetic listings')
+    parser.add_argument('--domains', type=int, default=200,
+                        help='domains of the synthetic listings')
+    parser.add_argument('--domain', default='domain0',
+                        help='domain whose groups and users are listed')
+    parser.add_argument('--endpoint',
+                        help='Identity v3 endpoint to measure instead')
+    parser.add_argument('--token', help='token used with --endpoint')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='measurements of every listing')
+    parser.add_argument('--output', metavar='FILE',
+                        help='write the results to FILE')
+    options = parser.parse_args(argv)
+    if options.endpoint and not options.token:
+        parser.error('--endpoint requires --token')
+
+    results = run(options)
+    for kind in KINDS:
+        result = results['results'][kind]
+        print('%-7s %d items: %d bytes / %.1f ms filtered on the client, '
+              '%d bytes / %.1f ms filtered on the server'
+              % (kind, result['server_filter']['items'],
+                 result['client_filter']['bytes'],
+                 result['client_filter']['best'] * 1e3,
+                 result['server_filter']['bytes'],
+                 result['server_filter']['best'] * 1e3))
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
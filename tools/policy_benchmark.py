@@ -0,0 +1,328 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 PolyBeacon, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmarks the policy engine on synthetic policies.
+
+The policies are generated from a seed, so two runs with the same options
+measure the same work:
+
+* ``parse``: loading the policy document into rules.
+* ``check_tree``: one check, evaluating the parsed check tree.
+* ``check_compiled``: one check through :meth:`Enforcer.enforce`, which
+  evaluates the compiled rules.
+* ``table_render``: the checks made when rendering a table of ``--rows``
+  rows with ``--actions`` row actions, through :func:`wildcard.policy.check`
+  with a new request for every render.
+* ``table_render_batch``: the same table decided at once through
+  :func:`wildcard.policy.check_many`.
+
+The results are written as JSON, and can be compared with the results of
+an earlier run::
+
+    python tools/policy_benchmark.py --output baseline.json
+    python tools/policy_benchmark.py --baseline baseline.json
+
+The exit status is 1 when a benchmark is slower than its baseline by more
+than ``--tolerance``.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+
+SCOPE = 'identity'
+
+
+def generate_policy(rules=300, depth=10, roles=50, seed=0):
+    """Returns a synthetic policy document, as a dictionary.
+
+    The document holds ``roles`` role rules, chains of ``depth`` rules
+    referencing each other through ``rule:``, and actions mixing role,
+    chain and target checks until it holds ``rules`` rules.
+    """
+    rand = random.Random(seed)
+    role_names = ['role%d' % i for i in range(roles)]
+    policy = {'admin_required': 'role:admin or is_admin:1',
+              'owner': 'user_id:%(user_id)s',
+              'project_member': 'project_id:%(project_id)s',
+              'default': 'rule:admin_required'}
+
+    chains = []
+    for chain in range(max(1, rules // (depth * 4))):
+        previous = 'rule:admin_required'
+        for level in range(depth):
+            name = 'chain%d_%d' % (chain, level)
+            policy[name] = '%s or role:%s' % (previous,
+                                              rand.choice(role_names))
+            previous = 'rule:%s' % name
+        chains.append(previous)
+
+    action = 0
+    while len(policy) < rules:
+        kind = action % 4
+        if kind == 0:
+            rule = 'role:%s or role:%s' % (rand.choice(role_names),
+                                           rand.choice(role_names))
+        elif kind == 1:
+            rule = rand.choice(chains)
+        elif kind == 2:
+            rule = '%s and rule:project_member' % rand.choice(chains)
+        else:
+            rule = ('rule:admin_required or (rule:owner and '
+                    'not role:%s)' % rand.choice(role_names))
+        policy['%s:action%d' % (SCOPE, action)] = rule
+        action += 1
+    return policy
+
+
+def action_names(policy):
+    return sorted(name for name in policy if name.startswith(SCOPE + ':'))
+
+
+def make_credentials(roles=50, user_roles=3, seed=0):
+    rand = random.Random(seed)
+    names = rand.sample(['role%d' % i for i in range(roles)],
+                        min(user_roles, roles))
+    return {'user_id': 'user0',
+            'project_id': 'project0',
+            'is_admin': False,
+            'roles': names}
+
+
+def make_targets(rows):
+    return [{'user_id': 'user%d' % (row % 7),
+             'project_id': 'project%d' % (row % 3),
+             'id': 'object%d' % row}
+            for row in range(rows)]
+
+
+def measure(func, repeat, number):
+    """Returns the timings of ``func``, in seconds per call."""
+    timings = timeit.repeat(func, repeat=repeat, number=number)
+    timings = [timing / number for timing in timings]
+    return {'best': min(timings),
+            'mean': sum(timings) / len(timings),
+            'repeat': repeat,
+            'number': number}
+
+
+class _User(object):
+    """The parts of an authenticated user read by the policy checks."""
+
+    def __init__(self, credentials):
+        self.id = credentials['user_id']
+        self.token = None
+        self.username = credentials['user_id']
+        self.project_id = credentials['project_id']
+        self.project_name = credentials['project_id']
+        self.user_domain_id = 'default'
+        self.is_superuser = credentials['is_admin']
+        self.roles = [{'name': name} for name in credentials['roles']]
+
+
+class _Request(object):
+
+    def __init__(self, user):
+        self.user = user
+
+
+class _Auth(object):
+    """Reads the user from the benchmark requests, which have no session."""
+
+    @staticmethod
+    def get_user(request):
+        return request.user
+
+
+def run(options):
+    from wildcard.openstack.common import policy
+
+    document = generate_policy(options.rules, options.depth,
+                               options.roles, options.seed)
+    data = json.dumps(document)
+    actions = action_names(document)
+    credentials = make_credentials(options.roles, options.user_roles,
+                                   options.seed)
+    targets = make_targets(options.rows)
+    rand = random.Random(options.seed)
+    checks = [(rand.choice(actions), rand.choice(targets))
+              for i in range(256)]
+
+    results = {}
+    results['parse'] = measure(
+        lambda: policy.Rules.load_json(data, 'default'),
+        options.repeat, 1)
+
+    rules = policy.Rules.load_json(data, 'default')
+    enforcer = policy.Enforcer(rules=rules, default_rule='default')
+    # The rules are given, the policy file is never read
+    enforcer.load_rules = lambda force_reload=False: None
+
+    def check_tree():
+        for action, target in checks:
+            rules[action](target, credentials, enforcer)
+
+    def check_compiled():
+        for action, target in checks:
+            enforcer.enforce(action, target, credentials)
+
+    # Compile every rule before measuring the compiled checks
+    check_compiled()
+    for name, func in (('check_tree', check_tree),
+                       ('check_compiled', check_compiled)):
+        timing = measure(func, options.repeat, options.number)
+        for field in ('best', 'mean'):
+            timing[field] /= len(checks)
+        results[name] = timing
+
+    results.update(run_table(options, data, actions, credentials, targets))
+
+    return {'params': dict((name, getattr(options, name))
+                           for name in ('rules', 'depth', 'roles',
+                                        'user_roles', 'rows', 'actions',
+                                        'seed')),
+            'python': platform.python_version(),
+            'results': results}
+
+
+def run_table(options, data, actions, credentials, targets):
+    path = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(path, 'policy.json'), 'w') as policy_file:
+            policy_file.write(data)
+
+        from django.conf import settings
+        if not settings.configured:
+            settings.configure(POLICY_FILES_PATH=path,
+                               POLICY_FILES={SCOPE: 'policy.json'},
+                               POLICY_FILES_RECHECK_INTERVAL=60)
+        from wildcard import policy
+
+        policy.auth_utils = _Auth
+        policy.reset()
+        user = _User(credentials)
+        rand = random.Random(options.seed)
+        row_actions = [((SCOPE, action),)
+                       for action in rand.sample(actions,
+                                                 min(options.actions,
+                                                     len(actions)))]
+
+        def table_render():
+            request = _Request(user)
+            for target in targets:
+                for rules in row_actions:
+                    policy.check(rules, request, target)
+
+        def table_render_batch():
+            policy.check_many(row_actions, _Request(user), targets)
+
+        # Load the policy file before measuring
+        table_render()
+        return {'table_render': measure(table_render, options.repeat, 1),
+                'table_render_batch': measure(table_render_batch,
+                                              options.repeat, 1)}
+    finally:
+        shutil.rmtree(path)
+
+
+def compare(results, baseline, tolerance):
+    """Prints the results against the baseline.
+
+    Returns the names of the benchmarks slower than their baseline by more
+    than ``tolerance``.
+    """
+    if baseline['params'] != results['params']:
+        print('warning: the baseline was run with different parameters: %s'
+              % json.dumps(baseline['params'], sort_keys=True))
+
+    regressions = []
+    print('%-20s %14s %14s %8s' % ('benchmark', 'baseline (us)',
+                                   'current (us)', 'ratio'))
+    for name in sorted(results['results']):
+        current = results['results'][name]['best']
+        if name not in baseline['results']:
+            print('%-20s %14s %14.2f %8s' % (name, '-', current * 1e6, '-'))
+            continue
+        previous = baseline['results'][name]['best']
+        ratio = current / previous if previous else float('inf')
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = ' slower'
+        print('%-20s %14.2f %14.2f %8.2f%s' % (name, previous * 1e6,
+                                               current * 1e6, ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the policy engine on synthetic policies.')
+    parser.add_argument('--rules', type=int, default=300,
+                        help='number of rules of the policy')
+    parser.add_argument('--depth', type=int, default=10,
+                        help='length of the rule: chains')
+    parser.add_argument('--roles', type=int, default=50,
+                        help='number of roles used by the policy')
+    parser.add_argument('--user-roles', type=int, default=3,
+                        help='number of roles of the user')
+    parser.add_argument('--rows', type=int, default=500,
+                        help='rows of the rendered table')
+    parser.add_argument('--actions', type=int, default=8,
+                        help='row actions of the rendered table')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the generated policy')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='measurements of every benchmark')
+    parser.add_argument('--number', type=int, default=20,
+                        help='runs of the checks per measurement')
+    parser.add_argument('--output', metavar='FILE',
+                        help='write the results to FILE')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare the results with those in FILE')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='slowdown over the baseline reported as a '
+                             'regression (default: 0.2)')
+    options = parser.parse_args(argv)
+
+    results = run(options)
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    if options.baseline:
+        with open(options.baseline) as baseline:
+            regressions = compare(results, json.load(baseline),
+                                  options.tolerance)
+        if regressions:
+            print('regressions: %s' % ', '.join(regressions))
+            return 1
+    elif not options.output:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
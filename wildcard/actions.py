@@ -0,0 +1,138 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Table actions which act on the selected rows concurrently.
+
+Horizon's batch actions make one blocking backend call per selected row,
+one after the other. The actions below prepare the calls in the request
+thread, run them on the bounded worker pool of
+:mod:`wildcard.api.concurrency` and then report the outcome with the usual
+single summary message per action.
+"""
+
+import functools
+import logging
+
+from django import shortcuts
+from django.utils.translation import ugettext_lazy as _  # noqa
+
+from horizon import exceptions
+from horizon import messages
+from horizon import tables
+from horizon.utils import functions
+
+from wildcard.api import concurrency
+
+
+LOG = logging.getLogger(__name__)
+
+
+class ConcurrentBatchMixin(object):
+    """Runs the per-object calls of a batch action concurrently.
+
+    ``backend`` names the backend called by the action and selects the
+    concurrency limit in ``WILDCARD_API_CONCURRENCY``.
+    """
+
+    backend = None
+
+    def get_call(self, request, obj_id):
+        """Returns a callable performing the action on ``obj_id``.
+
+        It is called in the request thread right after :meth:`allowed`
+        was checked for the object, so actions keeping per-object state on
+        ``self`` (such as enable/disable toggles) must bind that state to
+        the returned callable. The callable runs in a worker thread: it
+        must neither change ``self`` nor add messages, and hands what it
+        has to report to :meth:`completed` by returning it.
+        """
+        return functools.partial(self.action, request, obj_id)
+
+    def completed(self, request, datum, value):
+        """Called in the request thread for each successful call.
+
+        ``value`` is what the call returned. It is called after every
+        call returned, in the order of the selected rows.
+        """
+        pass
+
+    def handle(self, table, request, obj_ids):
+        action_not_allowed = []
+        selected = []
+        for datum_id in obj_ids:
+            datum = table.get_object_by_id(datum_id)
+            datum_display = table.get_object_display(datum) or _("N/A")
+            if not table._filter_action(self, request, datum):
+                action_not_allowed.append(datum_display)
+                LOG.info('Permission denied to %s: "%s"' %
+                         (self._conjugate(past=True).lower(), datum_display))
+                continue
+            selected.append((datum_id, datum, datum_display,
+                             self.get_call(request, datum_id)))
+
+        results = concurrency.run([call for i, d, s, call in selected],
+                                  backend=self.backend)
+
+        action_success = []
+        action_failure = []
+        for (datum_id, datum, datum_display, call), result in zip(
+                selected, results):
+            try:
+                self.completed(request, datum, result.get())
+                # Call update to invoke changes if needed.
+                self.update(request, datum)
+                action_success.append(datum_display)
+                self.success_ids.append(datum_id)
+                LOG.info('%s: "%s"' %
+                         (self._conjugate(past=True), datum_display))
+            except Exception as ex:
+                # Only exceptions without a message of their own are
+                # silenced, they are part of the summary below.
+                ignore = not getattr(ex, "_safe_message", None)
+                if ignore:
+                    action_failure.append(datum_display)
+                exceptions.handle(request, ignore=ignore)
+
+        # Begin with success message class, downgrade to info if problems.
+        success_message_level = messages.success
+        if action_not_allowed:
+            msg = _('You do not have permission to %(action)s: %(objs)s')
+            params = {"action":
+                      self._conjugate(action_not_allowed).lower(),
+                      "objs": functions.lazy_join(", ", action_not_allowed)}
+            messages.error(request, msg % params)
+            success_message_level = messages.info
+        if action_failure:
+            msg = _('Unable to %(action)s: %(objs)s')
+            params = {"action": self._conjugate(action_failure).lower(),
+                      "objs": functions.lazy_join(", ", action_failure)}
+            messages.error(request, msg % params)
+            success_message_level = messages.info
+        if action_success:
+            msg = _('%(action)s: %(objs)s')
+            params = {"action":
+                      self._conjugate(action_success, True),
+                      "objs": functions.lazy_join(", ", action_success)}
+            success_message_level(request, msg % params)
+
+        return shortcuts.redirect(self.get_success_url(request))
+
+
+class BatchAction(ConcurrentBatchMixin, tables.BatchAction):
+    pass
+
+
+class DeleteAction(ConcurrentBatchMixin, tables.DeleteAction):
+    pass
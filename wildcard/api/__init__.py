@@ -34,11 +34,15 @@ shouldn't need to understand the finer details of APIs for
 Keystone/Nova/Glance/Swift et. al.
 """
 from wildcard.api import base
+from wildcard.api import cache
+from wildcard.api import concurrency
 from wildcard.api import keystone
 from wildcard.api import payload
 from wildcard.api import ripcord
 
 assert base
+assert cache
+assert concurrency
 assert keystone
 assert payload
 assert ripcord
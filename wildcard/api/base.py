@@ -18,8 +18,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
 from collections import Sequence  # noqa
+import functools
+import inspect
 import logging
+import threading
 
 from django.conf import settings  # noqa
 
@@ -32,6 +36,11 @@ __all__ = ('APIResourceWrapper', 'APIDictWrapper',
 
 LOG = logging.getLogger(__name__)
 
+MEMO_ATTR = "_api_memo"
+
+_MEMO_LOCK = threading.Lock()
+_MISSING = object()
+
 
 class APIVersionManager(object):
     """Object to store and manage API versioning data and utility methods."""
@@ -268,6 +277,48 @@ def url_for(request, service_type, endpoint_type=None):
     raise exceptions.ServiceCatalogException(service_type)
 
 
+def get_page_size(request):
+    """Returns the number of rows per page chosen in the user settings."""
+    return request.session.get('horizon_pagesize',
+                               getattr(settings, 'API_RESULT_PAGE_SIZE', 20))
+
+
+def page_kwargs(limit=None, marker=None):
+    """Returns the paging arguments of a list call, leaving out unset ones.
+
+    Unpaged calls are passed no extra arguments at all.
+    """
+    kwargs = {}
+    if limit is not None:
+        kwargs['limit'] = limit
+    if marker is not None:
+        kwargs['marker'] = marker
+    return kwargs
+
+
+class Listing(object):
+    """A full listing of API resources, sorted by ``key`` for paging.
+
+    For backends which list everything at once, or whose paging does not
+    fit marker based tables; callers cache the listing and serve every
+    page of a table from it.
+    """
+
+    def __init__(self, items, key='id'):
+        self.items = sorted(items, key=lambda item: getattr(item, key))
+        self.ids = [getattr(item, key) for item in self.items]
+
+    def page(self, marker=None, limit=None):
+        """Returns the items following ``marker``, at most ``limit`` of them.
+
+        Any id can be used as a marker, including that of an item which
+        has been deleted since the page it came from was rendered.
+        """
+        start = bisect.bisect_right(self.ids, marker) if marker else 0
+        end = start + limit if limit is not None else None
+        return self.items[start:end]
+
+
 def is_service_enabled(request, service_type, service_name=None):
     service = get_service_from_catalog(request.user.service_catalog,
                                        service_type)
@@ -282,3 +333,100 @@ def is_service_enabled(request, service_type, service_name=None):
                 else:
                     return True
     return False
+
+
+def _memo_value(value):
+    """Reduces an argument to a hashable value for a memo key.
+
+    API resources are keyed by their id, so that passing a user object or
+    its id hits the same entry.
+    """
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_memo_value(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_memo_value(v) for v in value)
+    return getattr(value, 'id', value)
+
+
+def _request_memo(request):
+    """Returns the memo dict of ``request``, creating it on first use.
+
+    API calls of one request may run on several worker threads (see
+    :mod:`wildcard.api.concurrency`), so they must all get the same dict.
+    """
+    memo = getattr(request, MEMO_ATTR, None)
+    if memo is None:
+        with _MEMO_LOCK:
+            memo = getattr(request, MEMO_ATTR, None)
+            if memo is None:
+                memo = {}
+                setattr(request, MEMO_ATTR, memo)
+    return memo
+
+
+def memoized(func):
+    """Caches the result of a read-only API call for the current request.
+
+    Calls are keyed by the function and its normalized arguments, so
+    repeated reads with the same arguments during one request/response
+    cycle cost a single round-trip. Exceptions are never cached, and calls
+    made without a request (e.g. with the service credentials) are never
+    memoized. Lists are copied on the way out so that callers can modify
+    what they get back.
+    """
+    @functools.wraps(func)
+    def wrapper(request, *args, **kwargs):
+        if request is None:
+            return func(request, *args, **kwargs)
+        callargs = inspect.getcallargs(func, request, *args, **kwargs)
+        callargs.pop('request')
+        key = ((func.__module__, func.__name__),
+               tuple(sorted((name, _memo_value(value))
+                            for name, value in callargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return func(request, *args, **kwargs)
+
+        memo = _request_memo(request)
+        # A single lookup, as another thread may forget the entry between
+        # a membership test and the read.
+        result = memo.get(key, _MISSING)
+        if result is _MISSING:
+            result = memo[key] = func(request, *args, **kwargs)
+        if isinstance(result, list):
+            result = list(result)
+        return result
+    return wrapper
+
+
+def forget(request, module, *names):
+    """Drops the memoized results of ``names`` in ``module``.
+
+    With no ``names`` every result memoized for ``module`` is dropped.
+    """
+    memo = getattr(request, MEMO_ATTR, None)
+    if not memo:
+        return
+    for key in memo.keys():
+        func_module, func_name = key[0]
+        if func_module == module and (not names or func_name in names):
+            memo.pop(key, None)
+
+
+def invalidates(*names):
+    """Marks an API call as mutating the data read by ``names``.
+
+    Once the call returns, or fails part way, the memoized results of those
+    functions in the same module are dropped for the current request.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return func(request, *args, **kwargs)
+            finally:
+                if request is not None:
+                    forget(request, func.__module__, *names)
+        return wrapper
+    return decorator
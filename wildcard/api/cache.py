@@ -0,0 +1,185 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Process-wide caches shared by the API wrappers.
+
+Every cache created through :class:`LRUCache` registers itself so that all
+of them can be flushed at once with :func:`clear_all` (the test suite does
+this between test cases) and so that entries belonging to a token can be
+dropped when that token goes away with :func:`evict_token`.
+"""
+
+import calendar
+import collections
+import logging
+import threading
+import time
+import weakref
+
+from django.contrib.auth import signals
+
+
+LOG = logging.getLogger(__name__)
+
+_CACHES = weakref.WeakSet()
+
+
+def token_expiry(token):
+    """Returns the expiry of an ``openstack_auth`` token as a timestamp.
+
+    Returns ``None`` when the token does not carry an expiry.
+    """
+    expires = getattr(token, 'expires', None)
+    if expires is None:
+        return None
+    return calendar.timegm(expires.utctimetuple())
+
+
+class LRUCache(object):
+    """A bounded, thread-safe LRU mapping with optional per-entry expiry.
+
+    :param max_size: maximum number of entries kept; the least recently
+                     used entry is evicted first. ``None`` means unbounded.
+    :param ttl: default lifetime of an entry in seconds. ``None`` means
+                entries only expire when an explicit ``expires`` is given.
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = collections.OrderedDict()
+        self._lock = threading.RLock()
+        _CACHES.add(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def _expired(self, expires, now=None):
+        return expires is not None and expires <= (now or time.time())
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data.pop(key)
+            except KeyError:
+                return default
+            if self._expired(expires):
+                return default
+            # Re-insert to mark the entry as most recently used.
+            self._data[key] = (value, expires)
+            return value
+
+    def set(self, key, value, expires=None):
+        """Stores ``value`` under ``key``.
+
+        :param expires: absolute timestamp after which the entry is stale.
+                        Defaults to now plus the cache ``ttl``; an earlier
+                        of the two always wins.
+        """
+        if self.ttl is not None:
+            default_expires = time.time() + self.ttl
+            if expires is None or default_expires < expires:
+                expires = default_expires
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            while self.max_size is not None and \
+                    len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return value
+
+    def get_or_set(self, key, factory, expires=None):
+        """Returns the cached value for ``key``, creating it if needed.
+
+        ``factory`` is called without holding the lock so that a slow
+        backend call does not block unrelated lookups.
+        """
+        value = self.get(key)
+        if value is None:
+            value = self.set(key, factory(), expires=expires)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            value, expires = self._data.pop(key, (default, None))
+            return value
+
+    def evict(self, predicate):
+        """Removes every entry whose key satisfies ``predicate``."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (v, expires) in self._data.items()
+                        if self._expired(expires, now)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ClientPool(LRUCache):
+    """An LRU cache of API clients keyed by ``(endpoint, token id)``.
+
+    Reusing a client across API calls lets the underlying HTTP connection
+    be kept alive instead of being set up again for every call. Entries
+    expire together with the token they were created for.
+    """
+
+    def get_client(self, endpoint, token, factory, variant=None):
+        """Returns the client of ``endpoint`` for ``token``.
+
+        :param variant: tells apart clients of the same endpoint and token
+                        which must not be shared, such as admin clients.
+        """
+        key = (endpoint, token.id, variant)
+        client = self.get(key)
+        if client is None:
+            LOG.debug("Creating a new client connection to %s." % endpoint)
+            client = self.set(key, factory(), expires=token_expiry(token))
+        return client
+
+    def evict_token(self, token_id):
+        self.evict(lambda key: key[1] == token_id)
+
+
+def evict_token(token_id):
+    """Drops every cached entry created for ``token_id``."""
+    for cache in list(_CACHES):
+        if isinstance(cache, ClientPool):
+            cache.evict_token(token_id)
+
+
+def clear_all():
+    """Empties every registered cache."""
+    for cache in list(_CACHES):
+        cache.clear()
+
+
+def _evict_on_logout(sender, request, user, **kwargs):
+    token = getattr(user, 'token', None)
+    if token is not None:
+        evict_token(token.id)
+
+
+signals.user_logged_out.connect(_evict_on_logout,
+                                dispatch_uid='wildcard.api.cache')
@@ -0,0 +1,124 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Helpers for running independent, blocking backend calls concurrently.
+
+The number of calls in flight against a backend is bounded by the
+``WILDCARD_API_CONCURRENCY`` setting, a dictionary mapping a backend name
+(``"identity"``, ``"sip"``, ``"queue"``) to a worker count. The
+``"default"`` key applies to any backend not listed. A limit of ``1`` runs
+every call inline in the calling thread.
+
+:func:`run` reports the outcome of every call separately, for batches of
+changes whose failures are reported item by item. :func:`gather` is meant
+for independent reads a page needs together: it returns their values or
+raises the first failure, so that callers can keep wrapping the reads in a
+single ``try``/``exceptions.handle`` block.
+"""
+
+import logging
+import Queue
+import sys
+import threading
+
+from django.conf import settings  # noqa
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def max_workers(backend=None):
+    """Returns the configured concurrency limit for ``backend``."""
+    limits = getattr(settings, 'WILDCARD_API_CONCURRENCY', {})
+    return limits.get(backend, limits.get('default', DEFAULT_MAX_WORKERS))
+
+
+class Result(object):
+    """The outcome of a single call: either a value or the exception info.
+    """
+
+    def __init__(self, value=None, exc_info=None):
+        self.value = value
+        self.exc_info = exc_info
+
+    @property
+    def failed(self):
+        return self.exc_info is not None
+
+    def get(self):
+        """Returns the value, or re-raises the exception of the call."""
+        if self.exc_info is not None:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+        return self.value
+
+
+def _call(func):
+    try:
+        return Result(value=func())
+    except Exception:
+        return Result(exc_info=sys.exc_info())
+
+
+def run(calls, backend=None, workers=None):
+    """Runs ``calls`` on a bounded pool of threads.
+
+    :param calls: a sequence of callables taking no arguments (use
+                  ``functools.partial`` to bind them).
+    :param backend: name of the backend being called, used to look up the
+                    concurrency limit.
+    :param workers: overrides the configured concurrency limit.
+    :returns: a list of :class:`Result` objects in the order of ``calls``.
+              Exceptions never escape; callers decide how to report them.
+    """
+    calls = list(calls)
+    if workers is None:
+        workers = max_workers(backend)
+    workers = min(workers, len(calls))
+    if workers <= 1:
+        return [_call(func) for func in calls]
+
+    results = [None] * len(calls)
+    pending = Queue.Queue()
+    for item in enumerate(calls):
+        pending.put(item)
+
+    def worker():
+        while True:
+            try:
+                index, func = pending.get_nowait()
+            except Queue.Empty:
+                return
+            results[index] = _call(func)
+
+    threads = [threading.Thread(target=worker) for i in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def gather(calls, backend=None, workers=None):
+    """Runs ``calls`` concurrently and returns their values.
+
+    Takes the same arguments as :func:`run`. Every call is left to finish;
+    if any of them failed, the exception of the first failed call (in the
+    order of ``calls``) is re-raised with its original traceback.
+    """
+    results = run(calls, backend=backend, workers=workers)
+    return [result.get() for result in results]
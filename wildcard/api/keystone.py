@@ -19,7 +19,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import functools
 import logging
+import threading
+import time
 import urlparse
 
 from django.conf import settings  # noqa
@@ -35,10 +39,46 @@ from horizon import exceptions
 from horizon import messages
 
 from wildcard.api import base
+from wildcard.api import cache
+from wildcard.api import search
 
 
 LOG = logging.getLogger(__name__)
-DEFAULT_ROLE = None
+
+# Roles rarely change, so the role catalog of each identity endpoint is
+# shared by every request of the process for a while.
+ROLE_CATALOG = cache.LRUCache(
+    ttl=getattr(settings, 'OPENSTACK_KEYSTONE_ROLE_CACHE_TTL', 300))
+
+# Keystone v3 cannot page through projects and users, so paging is emulated
+# over a full listing which is kept briefly to serve the following pages.
+LISTINGS = cache.LRUCache(
+    max_size=getattr(settings, 'OPENSTACK_KEYSTONE_LISTING_CACHE_SIZE', 100),
+    ttl=getattr(settings, 'OPENSTACK_KEYSTONE_LISTING_CACHE_TTL', 30))
+
+# Clients are shared by the requests made with the same token, so that the
+# connections to the identity endpoints are kept alive between requests.
+CLIENTS = cache.ClientPool(
+    max_size=getattr(settings, 'OPENSTACK_KEYSTONE_CLIENT_POOL_SIZE', 100))
+
+# Identity endpoint resolved from the service catalog of each token.
+ENDPOINTS = cache.LRUCache(
+    max_size=getattr(settings, 'OPENSTACK_KEYSTONE_CLIENT_POOL_SIZE', 100))
+
+# Client of the dashboard service account, used by the calls made without a
+# request. It is authenticated again this many seconds before its token
+# expires.
+SERVICE_CLIENT = cache.LRUCache(max_size=1)
+SERVICE_TOKEN_REFRESH = getattr(settings, 'WILDCARD_ADMIN_TOKEN_REFRESH', 60)
+_SERVICE_CLIENT_LOCK = threading.Lock()
+
+# Directory of the users seen by the service account, used to look users up
+# by email or name without listing them all on every lookup.
+USER_DIRECTORY = cache.LRUCache(max_size=1)
+USER_DIRECTORY_REFRESH = getattr(settings,
+                                 'OPENSTACK_KEYSTONE_USER_DIRECTORY_REFRESH',
+                                 300)
+_USER_DIRECTORY_LOCK = threading.Lock()
 
 
 # Set up our data structure for managing Identity API versions, and
@@ -59,6 +99,11 @@ class IdentityAPIVersionManager(base.APIVersionManager):
 
 VERSIONS = IdentityAPIVersionManager("identity", preferred_version=3)
 
+# Read calls whose results depend on role assignments. Any call that grants
+# or revokes roles, or removes a principal, drops them from the request memo.
+ASSIGNMENT_READS = ('user_list', 'group_list', 'roles_for_user',
+                    'roles_for_group', 'role_assignments_index')
+
 
 # Import from oldest to newest so that "preferred" takes correct precedence.
 try:
@@ -102,6 +147,28 @@ class Service(base.APIDictWrapper):
 
 
 def _get_endpoint_url(request, endpoint_type, catalog=None):
+    """Returns the identity endpoint of ``endpoint_type`` for the request.
+
+    The endpoint is resolved once for each token, region and endpoint type.
+    """
+    user = request.user
+    token = getattr(user, 'token', None)
+    if not getattr(token, 'id', None):
+        return _resolve_endpoint_url(request, endpoint_type)
+    if getattr(user, "service_catalog", None):
+        region = user.services_region
+    else:
+        region = request.session.get('region_endpoint')
+    key = (token.id, region, endpoint_type, VERSIONS.active)
+    url = ENDPOINTS.get(key)
+    if url is None:
+        url = ENDPOINTS.set(key,
+                            _resolve_endpoint_url(request, endpoint_type),
+                            expires=cache.token_expiry(token))
+    return url
+
+
+def _resolve_endpoint_url(request, endpoint_type):
     if getattr(request.user, "service_catalog", None):
         url = base.url_for(request,
                            service_type='identity',
@@ -138,34 +205,17 @@ def keystoneclient(request, admin=False):
     Calls requiring the admin endpoint should have ``admin=True`` passed in
     as a keyword argument.
 
-    The client is cached so that subsequent API calls during the same
-    request/response cycle don't have to be re-authenticated.
+    The client is cached on the request, and pooled by token, endpoint and
+    admin flag, so that subsequent API calls made with the same token don't
+    have to set up a new client and connection. Pooled clients expire with
+    their token and are dropped when the user logs out.
+
+    Without a request, the shared client of the ``WILDCARD_ADMIN_USER``
+    service account is returned.
     """
     api_version = VERSIONS.get_active_version()
     if not request:
-        endpoint = settings.OPENSTACK_KEYSTONE_URL
-        LOG.debug(
-            "Creating a new keystoneserviceclient connection to %s." % endpoint
-        )
-        user = authenticate(
-            username=settings.WILDCARD_ADMIN_USER,
-            password=settings.WILDCARD_ADMIN_PASSWORD,
-            auth_url=endpoint,
-        )
-        catalog = user.service_catalog
-        service = base.get_service_from_catalog(catalog, 'identity')
-        endpoint = base.get_url_for_service(
-            service,
-            user.services_region,
-            endpoint_type='adminURL',
-        )
-        return api_version['client'].Client(
-            token=user.token.id,
-            endpoint=endpoint,
-            insecure=getattr(settings, 'OPENSTACK_SSL_NO_VERIFY', False),
-            cacert=getattr(settings, 'OPENSTACK_SSL_CACERT', None),
-            debug=settings.DEBUG,
-        )
+        return _service_client(api_version)
 
     user = request.user
     if admin:
@@ -188,21 +238,118 @@ def keystoneclient(request, admin=False):
         conn = getattr(request, cache_attr)
     else:
         endpoint = _get_endpoint_url(request, endpoint_type)
-        insecure = getattr(settings, 'OPENSTACK_SSL_NO_VERIFY', False)
-        cacert = getattr(settings, 'OPENSTACK_SSL_CACERT', None)
-        LOG.debug("Creating a new keystoneclient connection to %s." % endpoint)
         remote_addr = request.environ.get('REMOTE_ADDR', '')
-        conn = api_version['client'].Client(token=user.token.id,
-                                            endpoint=endpoint,
-                                            original_ip=remote_addr,
-                                            insecure=insecure,
-                                            cacert=cacert,
-                                            auth_url=endpoint,
-                                            debug=settings.DEBUG)
+        factory = functools.partial(_create_client, api_version, request,
+                                    endpoint, remote_addr)
+        if user.token.id:
+            # A client forwards the address it was created for to Keystone,
+            # so it is only shared by the requests coming from there.
+            conn = CLIENTS.get_client(endpoint, user.token, factory,
+                                      variant=(admin, remote_addr))
+        else:
+            conn = factory()
         setattr(request, cache_attr, conn)
     return conn
 
 
+def _service_client(api_version):
+    """Returns the client of the ``WILDCARD_ADMIN_USER`` service account.
+
+    The client is shared by the whole process; only one thread at a time
+    authenticates it again when its token is about to expire.
+    """
+    conn = SERVICE_CLIENT.get(VERSIONS.active)
+    if conn is None:
+        with _SERVICE_CLIENT_LOCK:
+            conn = SERVICE_CLIENT.get(VERSIONS.active)
+            if conn is None:
+                conn, expires = _create_service_client(api_version)
+                SERVICE_CLIENT.set(VERSIONS.active, conn, expires=expires)
+    return conn
+
+
+def _create_service_client(api_version):
+    endpoint = settings.OPENSTACK_KEYSTONE_URL
+    LOG.debug(
+        "Creating a new keystoneserviceclient connection to %s." % endpoint
+    )
+    user = authenticate(
+        username=settings.WILDCARD_ADMIN_USER,
+        password=settings.WILDCARD_ADMIN_PASSWORD,
+        auth_url=endpoint,
+    )
+    catalog = user.service_catalog
+    service = base.get_service_from_catalog(catalog, 'identity')
+    endpoint = base.get_url_for_service(
+        service,
+        user.services_region,
+        endpoint_type='adminURL',
+    )
+    conn = api_version['client'].Client(
+        token=user.token.id,
+        endpoint=endpoint,
+        insecure=getattr(settings, 'OPENSTACK_SSL_NO_VERIFY', False),
+        cacert=getattr(settings, 'OPENSTACK_SSL_CACERT', None),
+        debug=settings.DEBUG,
+    )
+    expires = cache.token_expiry(user.token)
+    if expires is not None:
+        expires -= SERVICE_TOKEN_REFRESH
+    return conn, expires
+
+
+def _create_client(api_version, request, endpoint, remote_addr):
+    insecure = getattr(settings, 'OPENSTACK_SSL_NO_VERIFY', False)
+    cacert = getattr(settings, 'OPENSTACK_SSL_CACERT', None)
+    LOG.debug("Creating a new keystoneclient connection to %s." % endpoint)
+    return api_version['client'].Client(token=request.user.token.id,
+                                        endpoint=endpoint,
+                                        original_ip=remote_addr,
+                                        insecure=insecure,
+                                        cacert=cacert,
+                                        auth_url=endpoint,
+                                        debug=settings.DEBUG)
+
+
+def _listing(request, kind, fetch, **filters):
+    """Returns the :class:`base.Listing` of ``kind`` matching ``filters``.
+
+    Listings are cached per token, so that nobody is served a listing
+    fetched with somebody else's privileges.
+    """
+    key = (kind, request.user.token.id, tuple(sorted(filters.items())))
+    return LISTINGS.get_or_set(key, lambda: base.Listing(fetch()))
+
+
+def _refreshes_listings(*kinds):
+    """Drops the cached listings of ``kinds`` once the decorated call ran.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                LISTINGS.evict(lambda key: key[0] in kinds)
+        return wrapper
+    return decorator
+
+
+def _filter_by(items, **attrs):
+    """Returns the items whose attributes equal the given values.
+
+    ``None`` values are not filtered on. Keystone applies the filters of
+    the v3 listings itself; this only catches the servers, or the
+    listings, ignoring them.
+    """
+    attrs = [(attr, value) for attr, value in attrs.items()
+             if value is not None]
+    return [item for item in items
+            if all(getattr(item, attr, None) == value
+                   for attr, value in attrs)]
+
+
+@base.invalidates('domain_get')
 def domain_create(request, name, description=None, enabled=None):
     manager = keystoneclient(request, admin=True).domains
     return manager.create(name,
@@ -210,11 +357,14 @@ def domain_create(request, name, description=None, enabled=None):
                           enabled=enabled)
 
 
+@base.memoized
 def domain_get(request, domain_id):
     manager = keystoneclient(request, admin=True).domains
     return manager.get(domain_id)
 
 
+@base.invalidates('domain_get')
+@_refreshes_listings('projects', 'users')
 def domain_delete(request, domain_id):
     manager = keystoneclient(request, admin=True).domains
     return manager.delete(domain_id)
@@ -225,12 +375,15 @@ def domain_list(request):
     return manager.list()
 
 
+@base.invalidates('domain_get')
 def domain_update(request, domain_id, name=None, description=None,
                   enabled=None):
     manager = keystoneclient(request, admin=True).domains
     return manager.update(domain_id, name, description, enabled)
 
 
+@base.invalidates('tenant_get')
+@_refreshes_listings('projects')
 def tenant_create(request, name, description=None, enabled=None, domain=None):
     manager = VERSIONS.get_project_manager(request, admin=True)
     if VERSIONS.active < 3:
@@ -266,11 +419,14 @@ def get_default_domain(request):
 # A quick search through the codebase reveals that it's always called with
 # admin=true so I suspect we could eliminate it entirely as with the other
 # tenant commands.
+@base.memoized
 def tenant_get(request, project, admin=True):
     manager = VERSIONS.get_project_manager(request, admin=admin)
     return manager.get(project)
 
 
+@base.invalidates('tenant_get', *ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def tenant_delete(request, project):
     manager = VERSIONS.get_project_manager(request, admin=True)
     return manager.delete(project)
@@ -278,9 +434,7 @@ def tenant_delete(request, project):
 
 def tenant_list(request, paginate=False, marker=None, domain=None, user=None):
     manager = VERSIONS.get_project_manager(request, admin=True)
-    page_size = request.session.get('horizon_pagesize',
-                                    getattr(settings, 'API_RESULT_PAGE_SIZE',
-                                            20))
+    page_size = base.get_page_size(request)
     limit = None
     if paginate:
         limit = page_size + 1
@@ -288,14 +442,21 @@ def tenant_list(request, paginate=False, marker=None, domain=None, user=None):
     has_more_data = False
     if VERSIONS.active < 3:
         tenants = manager.list(limit, marker)
-        if paginate and len(tenants) > page_size:
-            tenants.pop(-1)
-            has_more_data = True
+    elif paginate:
+        listing = _listing(request, 'projects',
+                           lambda: manager.list(domain=domain, user=user),
+                           domain=domain, user=user)
+        tenants = listing.page(marker, limit)
     else:
         tenants = manager.list(domain=domain, user=user)
+    if paginate and len(tenants) > page_size:
+        tenants.pop(-1)
+        has_more_data = True
     return (tenants, has_more_data)
 
 
+@base.invalidates('tenant_get')
+@_refreshes_listings('projects')
 def tenant_update(request, project, name=None, description=None,
                   enabled=None, domain=None):
     manager = VERSIONS.get_project_manager(request, admin=True)
@@ -306,32 +467,237 @@ def tenant_update(request, project, name=None, description=None,
                               enabled=enabled, domain=domain)
 
 
-def user_list(request, project=None, domain=None, group=None):
+@base.memoized
+def user_list(request, project=None, domain=None, group=None, marker=None,
+              limit=None, name=None, email=None):
+    """Returns the users matching the filters.
+
+    Passing ``limit`` and optionally ``marker`` (the id of the last user of
+    the previous page) returns a single page of users.
+
+    With Keystone v3 the ``domain`` and ``name`` filters are applied by the
+    server. Keystone does not filter users by email, so lookups by email
+    outside of a project or group are served from the :func:`user_directory`
+    (ignoring case) instead of filtering a listing of every user.
+    """
+    if email is not None and project is None and group is None:
+        users = _filter_by(user_directory().find_all(email=email, name=name),
+                           domain_id=domain)
+        if limit is None and marker is None:
+            return users
+        return base.Listing(users).page(marker, limit)
+
+    manager = keystoneclient(request, admin=True).users
     if VERSIONS.active < 3:
         kwargs = {"tenant_id": project}
+        kwargs.update(base.page_kwargs(limit, marker))
+        users = _filter_by(manager.list(**kwargs), name=name, email=email)
     else:
         kwargs = {
             "project": project,
             "domain": domain,
             "group": group
         }
-    users = keystoneclient(request, admin=True).users.list(**kwargs)
+        if name is not None:
+            kwargs['name'] = name
+
+        def fetch():
+            return _filter_by(manager.list(**kwargs),
+                              domain_id=domain, name=name, email=email)
+
+        if limit is None and marker is None:
+            users = fetch()
+        else:
+            listing = _listing(request, 'users', fetch, email=email,
+                               **kwargs)
+            users = listing.page(marker, limit)
     return [VERSIONS.upgrade_v2_user(user) for user in users]
 
 
+class UserDirectory(object):
+    """Indexes users by lower-cased email and by name.
+
+    Lookups are served from dictionaries, and substring searches from a
+    :class:`search.TrigramIndex` over the same fields; the directory is kept
+    up to date
+    by the user calls of this module and reloaded every
+    ``OPENSTACK_KEYSTONE_USER_DIRECTORY_REFRESH`` seconds to pick up the
+    users changed elsewhere.
+    """
+
+    FIELDS = frozenset(['email', 'name'])
+
+    SEARCH_FIELDS = ('name', 'email')
+
+    def __init__(self, users):
+        self._lock = threading.Lock()
+        self._load(users)
+
+    def _load(self, users):
+        by_id = {}
+        by_email = collections.defaultdict(set)
+        by_name = collections.defaultdict(set)
+        index = search.TrigramIndex(self.SEARCH_FIELDS, key='id')
+        for user in users:
+            by_id[user.id] = user
+            email = getattr(user, 'email', None)
+            if email:
+                by_email[email.lower()].add(user.id)
+            by_name[getattr(user, 'name', None)].add(user.id)
+            index.add(user)
+        with self._lock:
+            self.loaded = time.time()
+            self._users = by_id
+            self._by_email = by_email
+            self._by_name = by_name
+            self._index = index
+
+    def reload(self, users):
+        """Replaces the users of the directory.
+
+        Lookups keep being served from the previous users meanwhile.
+        """
+        self._load(users)
+
+    def claim_refresh(self, interval):
+        """Returns True if the directory is older than ``interval`` seconds.
+
+        The age is reset, so that a single caller reloads the directory.
+        """
+        with self._lock:
+            if time.time() - self.loaded < interval:
+                return False
+            self.loaded = time.time()
+            return True
+
+    def __len__(self):
+        return len(self._users)
+
+    def find(self, email=None, name=None):
+        """Returns the user with the given email and name.
+
+        Emails are compared ignoring case. Returns None when no user
+        matches, and raises ``NoUniqueMatch`` when several users do.
+        """
+        with self._lock:
+            ids = self._matching_ids(email, name)
+            if not ids:
+                return None
+            if len(ids) > 1:
+                raise keystone_exceptions.NoUniqueMatch()
+            return self._users[ids.pop()]
+
+    def find_all(self, email=None, name=None):
+        """Returns every user with the given email and name, by id."""
+        with self._lock:
+            ids = self._matching_ids(email, name) or ()
+            return [self._users[user_id] for user_id in sorted(ids)]
+
+    def _matching_ids(self, email, name):
+        ids = None
+        if email is not None:
+            ids = set(self._by_email.get(email.lower(), ()))
+        if name is not None:
+            named = self._by_name.get(name, set())
+            ids = named.copy() if ids is None else ids & named
+        return ids
+
+    def search(self, query, limit=None, predicate=None):
+        """Returns the users with ``query`` in their name or email.
+
+        Matching ignores case. ``limit`` and ``predicate`` are those of
+        :meth:`search.TrigramIndex.search`.
+        """
+        with self._lock:
+            index = self._index
+        return index.search(query, limit=limit, predicate=predicate)
+
+    def add(self, user):
+        with self._lock:
+            self._discard(user.id)
+            self._users[user.id] = user
+            email = getattr(user, 'email', None)
+            if email:
+                self._by_email[email.lower()].add(user.id)
+            self._by_name[getattr(user, 'name', None)].add(user.id)
+            self._index.add(user)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._discard(user_id)
+
+    def _discard(self, user_id):
+        user = self._users.pop(user_id, None)
+        if user is None:
+            return
+        email = getattr(user, 'email', None)
+        if email:
+            self._by_email[email.lower()].discard(user_id)
+        self._by_name[getattr(user, 'name', None)].discard(user_id)
+        self._index.discard(user_id)
+
+
+def _directory_users():
+    try:
+        users = keystoneclient(None).users.list()
+    except keystone_exceptions.Unauthorized:
+        # The token of the service client was revoked before it expired,
+        # the next call authenticates again.
+        SERVICE_CLIENT.clear()
+        raise
+    return [VERSIONS.upgrade_v2_user(user) for user in users]
+
+
+def user_directory():
+    """Returns the :class:`UserDirectory` of the service account.
+
+    The directory is loaded by the first caller; afterwards, a single caller
+    reloads it once it is older than the refresh interval while the others
+    keep using it.
+    """
+    directory = USER_DIRECTORY.get(VERSIONS.active)
+    if directory is None:
+        with _USER_DIRECTORY_LOCK:
+            directory = USER_DIRECTORY.get(VERSIONS.active)
+            if directory is None:
+                directory = USER_DIRECTORY.set(
+                    VERSIONS.active, UserDirectory(_directory_users()))
+    elif directory.claim_refresh(USER_DIRECTORY_REFRESH):
+        try:
+            directory.reload(_directory_users())
+        except Exception:
+            LOG.warning("Unable to refresh the user directory.",
+                        exc_info=True)
+    return directory
+
+
+def _user_directory_through(update):
+    directory = USER_DIRECTORY.get(VERSIONS.active)
+    if directory is not None:
+        update(directory)
+
+
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def user_create(request, name=None, email=None, password=None, project=None,
                 enabled=None, domain=None):
     manager = keystoneclient(request, admin=True).users
     if VERSIONS.active < 3:
         user = manager.create(name, password, email, project, enabled)
-        return VERSIONS.upgrade_v2_user(user)
+        user = VERSIONS.upgrade_v2_user(user)
     else:
-        return manager.create(name, password=password, email=email,
+        user = manager.create(name, password=password, email=email,
                               project=project, enabled=enabled, domain=domain)
+    _user_directory_through(lambda directory: directory.add(user))
+    return user
 
 
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def user_delete(request, user_id):
-    return keystoneclient(request, admin=True).users.delete(user_id)
+    result = keystoneclient(request, admin=True).users.delete(user_id)
+    _user_directory_through(lambda directory: directory.discard(user_id))
+    return result
 
 
 def user_get(request, user_id, admin=True):
@@ -339,6 +705,8 @@ def user_get(request, user_id, admin=True):
     return VERSIONS.upgrade_v2_user(user)
 
 
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def user_update(request, user, **data):
     manager = keystoneclient(request, admin=True).users
     error = None
@@ -393,9 +761,16 @@ def user_update(request, user, **data):
             data.pop('password')
         user = manager.update(user, **data)
 
-    return VERSIONS.upgrade_v2_user(user)
+    user = VERSIONS.upgrade_v2_user(user)
+    if hasattr(user, 'id'):
+        _user_directory_through(lambda directory: directory.add(user))
+    else:
+        USER_DIRECTORY.clear()
+    return user
 
 
+@base.invalidates('user_list')
+@_refreshes_listings('users')
 def user_update_enabled(request, user, enabled):
     manager = keystoneclient(request, admin=True).users
     if VERSIONS.active < 3:
@@ -421,6 +796,7 @@ def user_update_own_password(request, origpassword, password):
         return client.users.update(request.user.id, password=password)
 
 
+@base.invalidates('user_list')
 def user_update_tenant(request, user, project, admin=True):
     manager = keystoneclient(request, admin=admin).users
     if VERSIONS.active < 3:
@@ -430,15 +806,29 @@ def user_update_tenant(request, user, project, admin=True):
 
 
 def user_find(request, admin=False, **kwargs):
+    """Returns the user matching ``kwargs``, or None.
+
+    Without a request, lookups by email and name are served from the
+    :func:`user_directory`.
+    """
+    if not request and kwargs and set(kwargs) <= UserDirectory.FIELDS:
+        return user_directory().find(**kwargs)
     manager = keystoneclient(request, admin=admin).users
     user = None
     try:
         user = VERSIONS.upgrade_v2_user(manager.find(**kwargs))
     except keystone_exceptions.NotFound:
         pass
+    except keystone_exceptions.Unauthorized:
+        if not request:
+            # The token of the service client was revoked before it
+            # expired, the next call authenticates again.
+            SERVICE_CLIENT.clear()
+        raise
     return user
 
 
+@base.invalidates('group_list')
 def group_create(request, domain_id, name, description=None):
     manager = keystoneclient(request, admin=True).groups
     return manager.create(domain=domain_id,
@@ -451,34 +841,40 @@ def group_get(request, group_id, admin=True):
     return manager.get(group_id)
 
 
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def group_delete(request, group_id):
     manager = keystoneclient(request, admin=True).groups
     return manager.delete(group_id)
 
 
-def group_list(request, domain=None, project=None, user=None):
+@base.memoized
+def group_list(request, domain=None, project=None, user=None, name=None):
+    """Returns the groups matching the filters.
+
+    The ``domain`` and ``name`` filters are applied by the server.
+    """
     manager = keystoneclient(request, admin=True).groups
-    groups = manager.list(user=user)
-    # TODO(dklyle): once keystoneclient supports filtering by
-    # domain change this to use that cleaner implementation
+    filters = {}
     if domain:
-        domain_groups = []
-        for group in groups:
-            if group.domain_id == domain:
-                domain_groups.append(group)
-        groups = domain_groups
+        filters['domain_id'] = domain
+    if name is not None:
+        filters['name'] = name
+    groups = _filter_by(manager.list(user=user, **filters),
+                        domain_id=domain or None, name=name)
 
     if project:
-        project_groups = []
-        for group in groups:
-            roles = roles_for_group(request, group=group.id, project=project)
-            if roles and len(roles) > 0:
-                project_groups.append(group)
-        groups = project_groups
+        assignments = role_assignments_index(
+            request,
+            project=project,
+            groups=[group.id for group in groups])
+        groups = [group for group in groups
+                  if assignments.roles_for_group(group.id)]
 
     return groups
 
 
+@base.invalidates('group_list')
 def group_update(request, group_id, name=None, description=None):
     manager = keystoneclient(request, admin=True).groups
     return manager.update(group=group_id,
@@ -486,19 +882,55 @@ def group_update(request, group_id, name=None, description=None):
                           description=description)
 
 
+@base.invalidates('user_list', 'group_list')
+@_refreshes_listings('projects', 'users')
 def add_group_user(request, group_id, user_id):
     manager = keystoneclient(request, admin=True).users
     return manager.add_to_group(group=group_id, user=user_id)
 
 
+@base.invalidates('user_list', 'group_list')
+@_refreshes_listings('projects', 'users')
 def remove_group_user(request, group_id, user_id):
     manager = keystoneclient(request, admin=True).users
     return manager.remove_from_group(group=group_id, user=user_id)
 
 
+class RoleCatalog(object):
+    """The roles known to an identity endpoint, indexed by id and by name.
+    """
+
+    def __init__(self, roles):
+        self.roles = list(roles)
+        self.by_id = dict((role.id, role) for role in self.roles)
+        self.by_name = dict((role.name, role) for role in self.roles)
+
+    def find(self, key):
+        """Looks a role up by id, then by name."""
+        return self.by_id.get(key) or self.by_name.get(key)
+
+
+def role_catalog(request):
+    """Returns the :class:`RoleCatalog` of the identity endpoint in use.
+
+    The catalog is fetched once and then served from ``ROLE_CATALOG`` until
+    ``OPENSTACK_KEYSTONE_ROLE_CACHE_TTL`` seconds have passed or a role is
+    created, updated or deleted through this module.
+    """
+    if not request.user.is_superuser:
+        raise exceptions.NotAuthorized
+    key = _get_endpoint_url(request, 'adminURL')
+    return ROLE_CATALOG.get_or_set(
+        key,
+        lambda: RoleCatalog(keystoneclient(request, admin=True).roles.list()))
+
+
 def role_create(request, name):
     manager = keystoneclient(request, admin=True).roles
-    return manager.create(name)
+    try:
+        return manager.create(name)
+    finally:
+        ROLE_CATALOG.clear()
 
 
 def role_get(request, role_id):
@@ -506,21 +938,30 @@ def role_get(request, role_id):
     return manager.get(role_id)
 
 
+@base.invalidates(*ASSIGNMENT_READS)
 def role_update(request, role_id, name=None):
     manager = keystoneclient(request, admin=True).roles
-    return manager.update(role_id, name)
+    try:
+        return manager.update(role_id, name)
+    finally:
+        ROLE_CATALOG.clear()
 
 
+@base.invalidates(*ASSIGNMENT_READS)
 def role_delete(request, role_id):
     manager = keystoneclient(request, admin=True).roles
-    return manager.delete(role_id)
+    try:
+        return manager.delete(role_id)
+    finally:
+        ROLE_CATALOG.clear()
 
 
 def role_list(request):
     """Returns a global list of available roles."""
-    return keystoneclient(request, admin=True).roles.list()
+    return list(role_catalog(request).roles)
 
 
+@base.memoized
 def roles_for_user(request, user, project):
     manager = keystoneclient(request, admin=True).roles
     if VERSIONS.active < 3:
@@ -529,6 +970,8 @@ def roles_for_user(request, user, project):
         return manager.list(user=user, project=project)
 
 
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def add_tenant_user_role(request, project=None, user=None, role=None,
                          group=None, domain=None):
     """Adds a role for a user on a tenant."""
@@ -540,6 +983,8 @@ def add_tenant_user_role(request, project=None, user=None, role=None,
                              group=group, domain=domain)
 
 
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def remove_tenant_user_role(request, project=None, user=None, role=None,
                             group=None, domain=None):
     """Removes a given single role for a user from a tenant."""
@@ -551,6 +996,8 @@ def remove_tenant_user_role(request, project=None, user=None, role=None,
                               group=group, domain=domain)
 
 
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def remove_tenant_user(request, project=None, user=None, domain=None):
     """Removes all roles from a user on a tenant, removing them from it."""
     client = keystoneclient(request, admin=True)
@@ -560,11 +1007,73 @@ def remove_tenant_user(request, project=None, user=None, domain=None):
                                 project=project, domain=domain)
 
 
+@base.memoized
 def roles_for_group(request, group, domain=None, project=None):
     manager = keystoneclient(request, admin=True).roles
     return manager.list(group=group, domain=domain, project=project)
 
 
+class RoleAssignments(object):
+    """The role assignments on a single project or domain.
+
+    Role ids are indexed by user id and by group id so that the roles of
+    any principal can be looked up without another call to Keystone.
+    """
+
+    def __init__(self):
+        self.users = collections.defaultdict(set)
+        self.groups = collections.defaultdict(set)
+
+    def add(self, role, user=None, group=None):
+        if user is not None:
+            self.users[user].add(role)
+        if group is not None:
+            self.groups[group].add(role)
+
+    def roles_for_user(self, user):
+        return self.users.get(user, set())
+
+    def roles_for_group(self, group):
+        return self.groups.get(group, set())
+
+
+def role_assignments_list(request, project=None, domain=None):
+    manager = keystoneclient(request, admin=True).role_assignments
+    return manager.list(project=project, domain=domain)
+
+
+@base.memoized
+def role_assignments_index(request, project=None, domain=None, users=None,
+                           groups=None):
+    """Returns the :class:`RoleAssignments` on a project or domain.
+
+    On Keystone v3 this costs a single role assignment listing. Older
+    clients without the role assignment API fall back to one call per
+    principal in ``users`` and ``groups``.
+    """
+    index = RoleAssignments()
+    client = keystoneclient(request, admin=True)
+    if VERSIONS.active >= 3 and hasattr(client, 'role_assignments'):
+        for assignment in role_assignments_list(request,
+                                                project=project,
+                                                domain=domain):
+            user = getattr(assignment, 'user', {}).get('id')
+            group = getattr(assignment, 'group', {}).get('id')
+            index.add(assignment.role['id'], user=user, group=group)
+    else:
+        if project:
+            for user in users or []:
+                for role in roles_for_user(request, user, project):
+                    index.add(role.id, user=user)
+        for group in groups or []:
+            for role in roles_for_group(request, group=group,
+                                        domain=domain, project=project):
+                index.add(role.id, group=group)
+    return index
+
+
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def add_group_role(request, role, group, domain=None, project=None):
     """Adds a role for a group on a domain or project."""
     manager = keystoneclient(request, admin=True).roles
@@ -572,6 +1081,8 @@ def add_group_role(request, role, group, domain=None, project=None):
                          project=project)
 
 
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def remove_group_role(request, role, group, domain=None, project=None):
     """Removes a given single role for a group from a domain or project."""
     manager = keystoneclient(request, admin=True).roles
@@ -579,6 +1090,8 @@ def remove_group_role(request, role, group, domain=None, project=None):
                           domain=domain)
 
 
+@base.invalidates(*ASSIGNMENT_READS)
+@_refreshes_listings('projects', 'users')
 def remove_group_roles(request, group, domain=None, project=None):
     """Removes all roles from a group on a domain or project,
        removing them from it.
@@ -591,23 +1104,20 @@ def remove_group_roles(request, group, domain=None, project=None):
 
 
 def get_default_role(request):
-    """Gets the default role object from Keystone and saves it as a global
-    since this is configured in settings and should not change from request
-    to request. Supports lookup by name or id.
+    """Gets the default role object from the role catalog.
+
+    The default role is configured in settings and supports lookup by name
+    or id. Being read from the catalog, it follows renamed and deleted roles
+    instead of being kept for the lifetime of the process.
     """
-    global DEFAULT_ROLE
     default = getattr(settings, "OPENSTACK_KEYSTONE_DEFAULT_ROLE", None)
-    if default and DEFAULT_ROLE is None:
-        try:
-            roles = keystoneclient(request, admin=True).roles.list()
-        except Exception:
-            roles = []
-            exceptions.handle(request)
-        for role in roles:
-            if role.id == default or role.name == default:
-                DEFAULT_ROLE = role
-                break
-    return DEFAULT_ROLE
+    if not default:
+        return None
+    try:
+        return role_catalog(request).find(default)
+    except Exception:
+        exceptions.handle(request)
+        return None
 
 
 def ec2_manager(request):
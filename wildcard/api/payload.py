@@ -12,25 +12,58 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from django.conf import settings
+
 from payloadclient.client import get_client
 
 from wildcard.api import base
+from wildcard.api import cache
+
+
+CLIENTS = cache.ClientPool(
+    max_size=getattr(settings, 'KICKSTAND_CLIENT_POOL_SIZE', 100),
+)
+
+LISTINGS = cache.LRUCache(
+    max_size=getattr(settings, 'KICKSTAND_CLIENT_POOL_SIZE', 100),
+    ttl=getattr(settings, 'KICKSTAND_LISTING_CACHE_TTL', 30),
+)
 
 
 def client(request):
-    return get_client(
-        1,
-        payload_url=base.url_for(request, 'queue'),
-        os_auth_token=request.user.token.id,
+    endpoint = base.url_for(request, 'queue')
+    token = request.user.token
+    return CLIENTS.get_client(
+        endpoint,
+        token,
+        lambda: get_client(1, payload_url=endpoint, os_auth_token=token.id),
     )
 
 
+def _project_key(request):
+    return (base.url_for(request, 'queue'), request.user.tenant_id)
+
+
+def _queue_listing(request):
+    """Returns the :class:`base.Listing` of the queues of the project.
+
+    The payload API has no paging and lists everything at once, so the
+    pages of a table are served from a listing shared between requests
+    for ``KICKSTAND_LISTING_CACHE_TTL`` seconds.
+    """
+    return LISTINGS.get_or_set(
+        _project_key(request),
+        lambda: base.Listing(client(request).queues.list(), 'uuid'))
+
+
 def queue_create(request, name=None, description=None, disabled=False):
-    return client(request).queues.create(
+    queue = client(request).queues.create(
         name=name,
         description=description,
         disabled=disabled,
     )
+    LISTINGS.pop(_project_key(request))
+    return queue
 
 
 def queue_get(request, uuid):
@@ -38,15 +71,21 @@ def queue_get(request, uuid):
 
 
 def queue_delete(request, uuid):
-    return client(request).queues.delete(uuid)
+    result = client(request).queues.delete(uuid)
+    LISTINGS.pop(_project_key(request))
+    return result
 
 
-def queue_list(request):
-    return client(request).queues.list()
+def queue_list(request, limit=None, marker=None):
+    if limit is None and marker is None:
+        return client(request).queues.list()
+    return _queue_listing(request).page(marker, limit)
 
 
 def queue_update(request, uuid, **kwargs):
-    return client(request).queues.update(
+    queue = client(request).queues.update(
         uuid,
         **kwargs
     )
+    LISTINGS.pop(_project_key(request))
+    return queue
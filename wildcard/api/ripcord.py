@@ -12,21 +12,109 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import threading
+
+from django.conf import settings
+
 from ripcordclient.client import get_client
 
 from wildcard.api import base
+from wildcard.api import cache
+from wildcard.api import search
+
+
+CLIENTS = cache.ClientPool(
+    max_size=getattr(settings, 'KICKSTAND_CLIENT_POOL_SIZE', 100),
+)
+
+DOMAINS = cache.LRUCache(
+    max_size=getattr(settings, 'KICKSTAND_CLIENT_POOL_SIZE', 100),
+    ttl=getattr(settings, 'KICKSTAND_DOMAIN_CACHE_TTL', 60),
+)
+
+LISTINGS = cache.LRUCache(
+    max_size=getattr(settings, 'KICKSTAND_CLIENT_POOL_SIZE', 100),
+    ttl=getattr(settings, 'KICKSTAND_LISTING_CACHE_TTL', 30),
+)
+
+SUBSCRIBER_INDEXES = cache.LRUCache(
+    max_size=getattr(settings, 'KICKSTAND_SEARCH_INDEX_SIZE', 10),
+    ttl=getattr(settings, 'KICKSTAND_SEARCH_INDEX_TTL', 300),
+)
+
+SUBSCRIBER_SEARCH_FIELDS = ('username', 'email_address', 'rpid')
+
+_SUBSCRIBER_INDEX_LOCK = threading.Lock()
 
 
 def client(request):
-    return get_client(
-        1,
-        ripcord_url=base.url_for(request, 'sip'),
-        os_auth_token=request.user.token.id,
+    endpoint = base.url_for(request, 'sip')
+    token = request.user.token
+    return CLIENTS.get_client(
+        endpoint,
+        token,
+        lambda: get_client(1, ripcord_url=endpoint, os_auth_token=token.id),
     )
 
 
+def _project_key(request):
+    return (base.url_for(request, 'sip'), request.user.tenant_id)
+
+
+def _listing(request, kind, fetch):
+    """Returns the :class:`base.Listing` of ``kind`` in the project.
+
+    The ripcord API has no paging and lists everything at once, so the
+    pages of a table are served from a listing shared between requests
+    for ``KICKSTAND_LISTING_CACHE_TTL`` seconds.
+    """
+    key = (kind,) + _project_key(request)
+    return LISTINGS.get_or_set(key, lambda: base.Listing(fetch(), 'uuid'))
+
+
+def _forget_listing(request, kind):
+    LISTINGS.pop((kind,) + _project_key(request))
+
+
+def subscriber_index(request):
+    """Returns the search index over the subscribers of the project.
+
+    The index is built from a full :func:`subscriber_list`, shared between
+    requests for ``KICKSTAND_SEARCH_INDEX_TTL`` seconds and kept up to date
+    by the subscriber calls of this module. It is built by the first
+    caller, concurrent searches wait for it rather than build their own.
+    """
+    key = _project_key(request)
+    index = SUBSCRIBER_INDEXES.get(key)
+    if index is None:
+        with _SUBSCRIBER_INDEX_LOCK:
+            index = SUBSCRIBER_INDEXES.get(key)
+            if index is None:
+                index = search.TrigramIndex(SUBSCRIBER_SEARCH_FIELDS)
+                index.extend(subscriber_list(request))
+                SUBSCRIBER_INDEXES.set(key, index)
+    return index
+
+
+def subscriber_search(request, query, limit=None):
+    """Returns the subscribers with ``query`` in one of their
+    ``SUBSCRIBER_SEARCH_FIELDS``, ignoring case.
+    """
+    return subscriber_index(request).search(query, limit=limit)
+
+
+def _index_through(request, update):
+    index = SUBSCRIBER_INDEXES.get(_project_key(request))
+    if index is not None:
+        update(index)
+
+
 def subscriber_create(request, **kwargs):
-    return client(request).subscribers.create(**kwargs)
+    subscriber = client(request).subscribers.create(**kwargs)
+    _forget_listing(request, 'subscribers')
+    _index_through(request, lambda index: index.add(subscriber))
+    return subscriber
 
 
 def subscriber_get(request, uuid):
@@ -34,22 +122,107 @@ def subscriber_get(request, uuid):
 
 
 def subscriber_delete(request, uuid):
-    return client(request).subscribers.delete(uuid)
+    result = client(request).subscribers.delete(uuid)
+    _forget_listing(request, 'subscribers')
+    _index_through(request, lambda index: index.discard(uuid))
+    return result
 
 
-def subscriber_list(request):
-    return client(request).subscribers.list()
+def subscriber_list(request, limit=None, marker=None):
+    manager = client(request).subscribers
+    if limit is None and marker is None:
+        return manager.list()
+    return _listing(request, 'subscribers', manager.list).page(marker, limit)
 
 
 def subscriber_update(request, uuid, **kwargs):
-    return client(request).subscribers.update(
+    subscriber = client(request).subscribers.update(
         uuid,
         **kwargs
     )
+    _forget_listing(request, 'subscribers')
+
+    def update(index):
+        if getattr(subscriber, 'uuid', None) == uuid:
+            index.add(subscriber)
+            return
+        try:
+            index.add(subscriber_get(request, uuid))
+        except Exception:
+            # Rebuild the index on the next search rather than serve a
+            # stale entry.
+            SUBSCRIBER_INDEXES.pop(_project_key(request))
+    _index_through(request, update)
+    return subscriber
+
+
+class DomainDirectory(object):
+    """Maps the uuids of the domains of a project to their names and back.
+    """
+
+    def __init__(self, domains):
+        self._lock = threading.Lock()
+        self._names = collections.OrderedDict(
+            (domain.uuid, domain.name) for domain in domains
+        )
+
+    @property
+    def names(self):
+        """Returns a ``{uuid: name}`` dictionary, in backend order."""
+        with self._lock:
+            return collections.OrderedDict(self._names)
+
+    @property
+    def uuids(self):
+        """Returns a ``{name: uuid}`` dictionary."""
+        with self._lock:
+            return dict((name, uuid) for uuid, name in self._names.items())
+
+    def choices(self):
+        return self.names.items()
+
+    def add(self, domain):
+        with self._lock:
+            self._names[domain.uuid] = domain.name
+
+    def discard(self, uuid):
+        with self._lock:
+            self._names.pop(uuid, None)
+
+
+def domain_directory(request, expect=None):
+    """Returns the :class:`DomainDirectory` of the current project.
+
+    The directory is shared between requests for
+    ``KICKSTAND_DOMAIN_CACHE_TTL`` seconds and kept up to date by the
+    domain calls of this module.
+
+    :param expect: domain uuids the caller is about to look up. If any of
+                   them is unknown the directory is reloaded once, to pick
+                   up domains created elsewhere.
+    """
+    key = _project_key(request)
+    directory = DOMAINS.get(key)
+    if directory is not None and expect:
+        names = directory.names
+        if any(uuid not in names for uuid in expect):
+            directory = None
+    if directory is None:
+        directory = DOMAINS.set(key, DomainDirectory(domain_list(request)))
+    return directory
+
+
+def _write_through(request, update):
+    directory = DOMAINS.get(_project_key(request))
+    if directory is not None:
+        update(directory)
 
 
 def domain_create(request, **kwargs):
-    return client(request).domains.create(**kwargs)
+    domain = client(request).domains.create(**kwargs)
+    _forget_listing(request, 'domains')
+    _write_through(request, lambda directory: directory.add(domain))
+    return domain
 
 
 def domain_get(request, uuid):
@@ -57,15 +230,27 @@ def domain_get(request, uuid):
 
 
 def domain_delete(request, uuid):
-    return client(request).domains.delete(uuid)
+    result = client(request).domains.delete(uuid)
+    _forget_listing(request, 'domains')
+    _write_through(request, lambda directory: directory.discard(uuid))
+    return result
 
 
-def domain_list(request):
-    return client(request).domains.list()
+def domain_list(request, limit=None, marker=None):
+    manager = client(request).domains
+    if limit is None and marker is None:
+        return manager.list()
+    return _listing(request, 'domains', manager.list).page(marker, limit)
 
 
 def domain_update(request, uuid, **kwargs):
-    return client(request).domains.update(
+    domain = client(request).domains.update(
         uuid,
         **kwargs
     )
+    _forget_listing(request, 'domains')
+    if getattr(domain, 'uuid', None) == uuid and hasattr(domain, 'name'):
+        _write_through(request, lambda directory: directory.add(domain))
+    else:
+        DOMAINS.pop(_project_key(request))
+    return domain
@@ -0,0 +1,118 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+In-memory substring search over API resources.
+
+A :class:`TrigramIndex` maps every three character sequence found in the
+indexed fields to the resources containing it. A query is answered by
+intersecting the sets of its own trigrams, which narrows the candidates
+down to a handful before they are checked for the actual substring.
+"""
+
+import threading
+
+
+GRAM_SIZE = 3
+
+
+def trigrams(text):
+    """Returns the set of trigrams of ``text``."""
+    return set(text[i:i + GRAM_SIZE]
+               for i in range(len(text) - GRAM_SIZE + 1))
+
+
+class TrigramIndex(object):
+    """A thread-safe, case-insensitive substring index.
+
+    :param fields: names of the attributes of a resource that are searched.
+    :param key: name of the attribute identifying a resource.
+    """
+
+    def __init__(self, fields, key='uuid'):
+        self.fields = tuple(fields)
+        self.key = key
+        self._docs = {}
+        self._grams = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _texts(self, obj):
+        texts = []
+        for field in self.fields:
+            value = getattr(obj, field, None)
+            if value:
+                texts.append(unicode(value).lower())
+        return texts
+
+    def add(self, obj):
+        """Indexes ``obj``, replacing any resource with the same key."""
+        key = getattr(obj, self.key)
+        texts = self._texts(obj)
+        with self._lock:
+            self._discard(key)
+            self._docs[key] = (obj, texts)
+            for text in texts:
+                for gram in trigrams(text):
+                    self._grams.setdefault(gram, set()).add(key)
+
+    def extend(self, objs):
+        for obj in objs:
+            self.add(obj)
+
+    def discard(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        obj, texts = self._docs.pop(key, (None, ()))
+        for text in texts:
+            for gram in trigrams(text):
+                keys = self._grams.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._grams[gram]
+
+    def search(self, query, limit=None, predicate=None):
+        """Returns the resources with ``query`` in any of their fields.
+
+        Results are ordered by key. Queries shorter than a trigram are
+        answered with a scan of the index. When given, ``predicate`` is
+        called with every match and only the resources it accepts count
+        towards ``limit``.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        with self._lock:
+            grams = trigrams(query)
+            if grams:
+                sets = sorted((self._grams.get(gram, set()) for gram in grams),
+                              key=len)
+                candidates = set(sets[0]).intersection(*sets[1:])
+            else:
+                candidates = self._docs.keys()
+            matches = []
+            for key in sorted(candidates):
+                obj, texts = self._docs[key]
+                if not any(query in text for text in texts):
+                    continue
+                if predicate is None or predicate(obj):
+                    matches.append(obj)
+                    if limit is not None and len(matches) >= limit:
+                        break
+        return matches
@@ -191,11 +191,26 @@ class UpdateDomainWorkflowTests(test.BaseAdminViewTests):
         # all domain groups have role assignments
         return self._get_all_groups(domain_id)
 
+    def _get_group_assignments(self, groups, roles):
+        assignments = api.keystone.RoleAssignments()
+        for group in groups:
+            for role in roles:
+                assignments.add(role.id, group=group.id)
+        return assignments
+
+    def _get_assignments(self, groups):
+        assignments = api.keystone.RoleAssignments()
+        for group, roles in groups.items():
+            for role in roles:
+                assignments.add(role, group=group)
+        return assignments
+
     @test.create_stubs({api.keystone: ('domain_get',
                                        'get_default_role',
                                        'role_list',
                                        'group_list',
-                                       'roles_for_group')})
+                                       'roles_for_group',
+                                       'role_assignments_index')})
     def test_update_domain_get(self):
         default_role = self.roles.first()
         domain = self.domains.get(id="1")
@@ -210,11 +225,11 @@ class UpdateDomainWorkflowTests(test.BaseAdminViewTests):
         api.keystone.group_list(IsA(http.HttpRequest), domain=domain.id) \
             .AndReturn(groups)
 
-        for group in groups:
-            api.keystone.roles_for_group(IsA(http.HttpRequest),
-                                         group=group.id,
-                                         domain=domain.id) \
-                .AndReturn(roles)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            domain=domain.id,
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_group_assignments(groups, roles))
 
         self.mox.ReplayAll()
 
@@ -241,6 +256,7 @@ class UpdateDomainWorkflowTests(test.BaseAdminViewTests):
                                        'role_list',
                                        'group_list',
                                        'roles_for_group',
+                                       'role_assignments_index',
                                        'remove_group_role',
                                        'add_group_role',)})
     def test_update_domain_post(self):
@@ -259,11 +275,11 @@ class UpdateDomainWorkflowTests(test.BaseAdminViewTests):
         api.keystone.group_list(IsA(http.HttpRequest), domain=domain.id) \
             .AndReturn(groups)
 
-        for group in groups:
-            api.keystone.roles_for_group(IsA(http.HttpRequest),
-                                         group=group.id,
-                                         domain=domain.id) \
-                .AndReturn(roles)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            domain=domain.id,
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_group_assignments(groups, roles))
 
         workflow_data = self._get_workflow_data(domain)
         # update some fields
@@ -283,46 +299,38 @@ class UpdateDomainWorkflowTests(test.BaseAdminViewTests):
         # Group assignments
         api.keystone.group_list(IsA(http.HttpRequest),
                                 domain=domain.id).AndReturn(domain_groups)
-
-        # admin group - try to remove all roles on current domain
-        api.keystone.roles_for_group(
-            IsA(http.HttpRequest), group='1', domain=domain.id
-        ).AndReturn(roles)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            domain=domain.id,
+            groups=[group.id for group in domain_groups]) \
+            .AndReturn(self._get_assignments({'1': ['1', '2'],
+                                              '2': ['1'],
+                                              '3': ['2']}))
+
+        # member group 2 - has role 1, will remove it and add role 2
+        api.keystone.add_group_role(IsA(http.HttpRequest),
+                                    role='2',
+                                    group='2',
+                                    domain=domain.id)
+        # member group 3 - has role 2, will remove it and add role 1
+        api.keystone.add_group_role(IsA(http.HttpRequest),
+                                    role='1',
+                                    group='3',
+                                    domain=domain.id)
+        # admin group - remove all roles on current domain
         for role in roles:
             api.keystone.remove_group_role(IsA(http.HttpRequest),
                                            role=role.id,
                                            group='1',
                                            domain=domain.id)
-
-        # member group 1 - has role 1, will remove it
-        api.keystone.roles_for_group(
-            IsA(http.HttpRequest), group='2', domain=domain.id
-        ).AndReturn((roles[0],))
-        # remove role 1
         api.keystone.remove_group_role(IsA(http.HttpRequest),
                                        role='1',
                                        group='2',
                                        domain=domain.id)
-        # add role 2
-        api.keystone.add_group_role(IsA(http.HttpRequest),
-                                    role='2',
-                                    group='2',
-                                    domain=domain.id)
-
-        # member group 3 - has role 2
-        api.keystone.roles_for_group(
-            IsA(http.HttpRequest), group='3', domain=domain.id
-        ).AndReturn((roles[1],))
-        # remove role 2
         api.keystone.remove_group_role(IsA(http.HttpRequest),
                                        role='2',
                                        group='3',
                                        domain=domain.id)
-        # add role 1
-        api.keystone.add_group_role(IsA(http.HttpRequest),
-                                    role='1',
-                                    group='3',
-                                    domain=domain.id)
 
         self.mox.ReplayAll()
 
@@ -350,7 +358,8 @@ class UpdateDomainWorkflowTests(test.BaseAdminViewTests):
                                        'get_default_role',
                                        'role_list',
                                        'group_list',
-                                       'roles_for_group')})
+                                       'roles_for_group',
+                                       'role_assignments_index')})
     def test_update_domain_post_error(self):
         default_role = self.roles.first()
         domain = self.domains.get(id="1")
@@ -366,11 +375,11 @@ class UpdateDomainWorkflowTests(test.BaseAdminViewTests):
         api.keystone.group_list(IsA(http.HttpRequest), domain=domain.id) \
             .AndReturn(groups)
 
-        for group in groups:
-            api.keystone.roles_for_group(IsA(http.HttpRequest),
-                                         group=group.id,
-                                         domain=domain.id) \
-                .AndReturn(roles)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            domain=domain.id,
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_group_assignments(groups, roles))
 
         workflow_data = self._get_workflow_data(domain)
         # update some fields
@@ -26,6 +26,7 @@ from horizon import workflows
 
 from wildcard import api
 from wildcard.dashboards.admin.domains import constants
+from wildcard.dashboards.admin import memberships
 
 LOG = logging.getLogger(__name__)
 
@@ -110,18 +111,19 @@ class UpdateDomainGroupsAction(workflows.MembershipAction):
 
         # Figure out groups & roles
         if domain_id:
+            try:
+                assignments = api.keystone.role_assignments_index(
+                    self.request,
+                    domain=domain_id,
+                    groups=[group.id for group in all_groups])
+            except Exception:
+                exceptions.handle(request,
+                                  err_msg,
+                                  redirect=reverse(
+                                      constants.DOMAINS_INDEX_URL))
             for group in all_groups:
-                try:
-                    roles = api.keystone.roles_for_group(self.request,
-                                                         group=group.id,
-                                                         domain=domain_id)
-                except Exception:
-                    exceptions.handle(request,
-                                      err_msg,
-                                      redirect=reverse(
-                                          constants.DOMAINS_INDEX_URL))
-                for role in roles:
-                    field_name = self.get_member_field_name(role.id)
+                for role_id in assignments.roles_for_group(group.id):
+                    field_name = self.get_member_field_name(role_id)
                     self.fields[field_name].initial.append(group.id)
 
     class Meta:
@@ -221,73 +223,32 @@ class UpdateDomain(workflows.Workflow):
             exceptions.handle(request, ignore=True)
             return False
 
-        # update domain groups
-        groups_to_modify = 0
-        member_step = self.get_step(constants.DOMAIN_GROUP_MEMBER_SLUG)
+        # Get the groups currently associated with this domain, and their
+        # roles, so we can diff against them.
         try:
-            # Get our role options
             available_roles = api.keystone.role_list(request)
-            # Get the groups currently associated with this domain so we
-            # can diff against it.
             domain_groups = api.keystone.group_list(request,
                                                     domain=domain_id)
-            groups_to_modify = len(domain_groups)
-            for group in domain_groups:
-                # Check if there have been any changes in the roles of
-                # Existing domain members.
-                current_roles = api.keystone.roles_for_group(
-                    self.request,
-                    group=group.id,
-                    domain=domain_id)
-                current_role_ids = [role.id for role in current_roles]
-                for role in available_roles:
-                    # Check if the group is in the list of groups with
-                    # this role.
-                    field_name = member_step.get_member_field_name(role.id)
-                    if group.id in data[field_name]:
-                        # Add it if necessary
-                        if role.id not in current_role_ids:
-                            # group role has changed
-                            api.keystone.add_group_role(
-                                request,
-                                role=role.id,
-                                group=group.id,
-                                domain=domain_id)
-                        else:
-                            # Group role is unchanged, so remove it from
-                            # the remaining roles list to avoid removing it
-                            # later
-                            index = current_role_ids.index(role.id)
-                            current_role_ids.pop(index)
-
-                # Revoke any removed roles.
-                for id_to_delete in current_role_ids:
-                    api.keystone.remove_group_role(request,
-                                                   role=id_to_delete,
-                                                   group=group.id,
-                                                   domain=domain_id)
-                groups_to_modify -= 1
-
-            # Grant new roles on the domain.
-            for role in available_roles:
-                field_name = member_step.get_member_field_name(role.id)
-                # Count how many groups may be added for error handling.
-                groups_to_modify += len(data[field_name])
-            for role in available_roles:
-                groups_added = 0
-                field_name = member_step.get_member_field_name(role.id)
-                for group_id in data[field_name]:
-                    if not filter(lambda x: group_id == x.id, domain_groups):
-                        api.keystone.add_group_role(request,
-                                                    role=role.id,
-                                                    group=group_id,
-                                                    domain=domain_id)
-                    groups_added += 1
-                groups_to_modify -= groups_added
+            assignments = api.keystone.role_assignments_index(
+                request,
+                domain=domain_id,
+                groups=[group.id for group in domain_groups])
         except Exception:
-            exceptions.handle(
-                request, 'Failed to modify %s domain groups.'
-                % groups_to_modify)
+            exceptions.handle(request, _('Unable to retrieve the current '
+                                         'domain groups.'))
             return True
 
+        # update domain groups
+        member_step = self.get_step(constants.DOMAIN_GROUP_MEMBER_SLUG)
+        desired = {}
+        for role in available_roles:
+            field_name = member_step.get_member_field_name(role.id)
+            desired[role.id] = data[field_name]
+        current = dict((group.id, assignments.roles_for_group(group.id))
+                       for group in domain_groups)
+        reconciler = memberships.RoleReconciler(request,
+                                                available_roles,
+                                                domain=domain_id)
+        reconciler.reconcile(memberships.GROUP, desired, current)
+
         return True
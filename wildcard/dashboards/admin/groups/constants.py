@@ -24,3 +24,4 @@ GROUPS_MANAGE_VIEW_TEMPLATE = 'admin/groups/manage.html'
 GROUPS_ADD_MEMBER_URL = 'horizon:admin:groups:add_members'
 GROUPS_ADD_MEMBER_VIEW_TEMPLATE = 'admin/groups/add_non_member.html'
 GROUPS_ADD_MEMBER_AJAX_VIEW_TEMPLATE = 'admin/groups/_add_non_member.html'
+GROUPS_NON_MEMBER_SEARCH_PARAM = 'q'
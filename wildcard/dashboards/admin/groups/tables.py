@@ -22,7 +22,9 @@ from django.utils.translation import ugettext_lazy as _  # noqa
 
 from horizon import tables
 
+from wildcard import actions
 from wildcard import api
+from wildcard.dashboards.admin import policy as admin_policy
 from wildcard.dashboards.admin.groups import constants
 
 
@@ -95,7 +97,7 @@ class GroupFilterAction(tables.FilterAction):
         return filter(comp, groups)
 
 
-class GroupsTable(tables.DataTable):
+class GroupsTable(admin_policy.RowPolicyMixin, tables.DataTable):
     name = tables.Column('name', verbose_name=_('Name'))
     description = tables.Column(lambda obj: getattr(obj, 'description', None),
                                 verbose_name=_('Description'))
@@ -118,13 +120,14 @@ class UserFilterAction(tables.FilterAction):
                 or q in user.email.lower()]
 
 
-class RemoveMembers(tables.DeleteAction):
+class RemoveMembers(actions.DeleteAction):
     name = "removeGroupMember"
     action_present = _("Remove")
     action_past = _("Removed")
     data_type_singular = _("User")
     data_type_plural = _("Users")
     policy_rules = (("identity", "identity:remove_user_from_group"),)
+    backend = "identity"
 
     def allowed(self, request, user=None):
         return api.keystone.keystone_can_edit_group()
@@ -157,7 +160,7 @@ class AddMembersLink(tables.LinkAction):
         return reverse(self.url, kwargs=self.table.kwargs)
 
 
-class UsersTable(tables.DataTable):
+class UsersTable(admin_policy.RowPolicyMixin, tables.DataTable):
     name = tables.Column('name', verbose_name=_('User Name'))
     email = tables.Column('email', verbose_name=_('Email'),
                           filters=[defaultfilters.urlize])
@@ -175,7 +178,7 @@ class GroupMembersTable(UsersTable):
         table_actions = (UserFilterAction, AddMembersLink, RemoveMembers)
 
 
-class AddMembers(tables.BatchAction):
+class AddMembers(actions.BatchAction):
     name = "addMember"
     action_present = _("Add")
     action_past = _("Added")
@@ -185,6 +188,7 @@ class AddMembers(tables.BatchAction):
     requires_input = True
     success_url = constants.GROUPS_MANAGE_URL
     policy_rules = (("identity", "identity:add_user_to_group"),)
+    backend = "identity"
 
     def allowed(self, request, user=None):
         return api.keystone.keystone_can_edit_group()
@@ -210,4 +214,5 @@ class GroupNonMembersTable(UsersTable):
     class Meta:
         name = "group_non_members"
         verbose_name = _("Non-Members")
+        pagination_param = "non_member_marker"
         table_actions = (UserFilterAction, AddMembers)
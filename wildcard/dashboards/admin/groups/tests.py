@@ -14,6 +14,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from django.conf import settings
 from django.core.urlresolvers import reverse  # noqa
 from django import http
 
@@ -32,6 +33,8 @@ GROUP_UPDATE_URL = reverse(constants.GROUPS_UPDATE_URL, args=[1])
 GROUP_MANAGE_URL = reverse(constants.GROUPS_MANAGE_URL, args=[1])
 GROUP_ADD_MEMBER_URL = reverse(constants.GROUPS_ADD_MEMBER_URL, args=[1])
 
+PAGE_SIZE = getattr(settings, 'API_RESULT_PAGE_SIZE', 20)
+
 
 class GroupsViewTests(test.BaseAdminViewTests):
     def _get_domain_id(self):
@@ -209,7 +212,9 @@ class GroupsViewTests(test.BaseAdminViewTests):
         api.keystone.group_get(IsA(http.HttpRequest), group.id).\
             AndReturn(group)
         api.keystone.user_list(IgnoreArg(),
-                               domain=group.domain_id).\
+                               domain=group.domain_id,
+                               marker=None,
+                               limit=PAGE_SIZE + 1).\
             AndReturn(self.users.list())
         api.keystone.user_list(IgnoreArg(),
                                group=group.id).\
@@ -226,3 +231,82 @@ class GroupsViewTests(test.BaseAdminViewTests):
 
         self.assertRedirectsNoFollow(res, GROUP_MANAGE_URL)
         self.assertMessageCount(success=1)
+
+    @test.create_stubs({api.keystone: ('group_get',
+                                       'user_list')})
+    def test_add_member_view_pages_non_members(self):
+        group = self.groups.get(id="1")
+        users = self.users.list()
+
+        api.keystone.group_get(IsA(http.HttpRequest), group.id).\
+            AndReturn(group)
+        api.keystone.user_list(IgnoreArg(),
+                               domain=group.domain_id,
+                               marker=users[0].id,
+                               limit=2).\
+            AndReturn(users[1:3])
+        api.keystone.user_list(IgnoreArg(),
+                               group=group.id).\
+            AndReturn(users[:3])
+        api.keystone.user_list(IgnoreArg(),
+                               domain=group.domain_id,
+                               marker=users[2].id,
+                               limit=2).\
+            AndReturn(users[3:])
+        self.mox.ReplayAll()
+
+        with self.settings(API_RESULT_PAGE_SIZE=1):
+            res = self.client.get(GROUP_ADD_MEMBER_URL,
+                                  {'non_member_marker': users[0].id})
+
+        table = res.context['table']
+        self.assertEqual(table.data, [users[3]])
+        self.assertFalse(table.has_more_data())
+
+    @test.create_stubs({api.keystone: ('group_get',
+                                       'user_directory',
+                                       'user_list')})
+    def test_add_member_view_search(self):
+        group = self.groups.get(id="1")
+        directory = api.keystone.UserDirectory(self.users.list())
+
+        api.keystone.group_get(IsA(http.HttpRequest), group.id).\
+            AndReturn(group)
+        api.keystone.user_list(IgnoreArg(),
+                               group=group.id).\
+            AndReturn(self.users.list()[2:])
+        api.keystone.user_directory().AndReturn(directory)
+        self.mox.ReplayAll()
+
+        # Any part of a name matches, ignoring case, but members do not.
+        res = self.client.post(GROUP_ADD_MEMBER_URL, {'q': ' USER_T '})
+
+        table = res.context['table']
+        self.assertEqual(table.data, [self.users.get(id="2")])
+        self.assertFalse(table.has_more_data())
+        self.assertEqual(res.context['query'], 'USER_T')
+        self.assertMessageCount(res, info=0)
+
+    @test.create_stubs({api.keystone: ('group_get',
+                                       'user_directory',
+                                       'user_list')})
+    def test_add_member_view_search_truncated(self):
+        group = self.groups.get(id="1")
+        directory = api.keystone.UserDirectory(self.users.list())
+
+        api.keystone.group_get(IsA(http.HttpRequest), group.id).\
+            AndReturn(group)
+        api.keystone.user_list(IgnoreArg(),
+                               group=group.id).\
+            AndReturn([])
+        api.keystone.user_directory().AndReturn(directory)
+        self.mox.ReplayAll()
+
+        # Only the users of the group's domain are found.
+        with self.settings(API_RESULT_PAGE_SIZE=1):
+            res = self.client.get(GROUP_ADD_MEMBER_URL,
+                                  {'q': 'example.com'})
+
+        table = res.context['table']
+        self.assertEqual(table.data, [self.users.get(id="1")])
+        self.assertMessageCount(res, info=1)
@@ -20,6 +20,7 @@ from django.utils.translation import ugettext_lazy as _  # noqa
 
 from horizon import exceptions
 from horizon import forms
+from horizon import messages
 from horizon import tables
 
 from wildcard import api
@@ -95,16 +96,49 @@ class GroupManageMixin(object):
                                                          group=group_id)
         return self._group_members
 
-    def _get_group_non_members(self):
-        if not hasattr(self, "_group_non_members"):
-            domain_id = self._get_group().domain_id
-            all_users = api.keystone.user_list(self.request,
-                                               domain=domain_id)
-            group_members = self._get_group_members()
-            group_member_ids = [user.id for user in group_members]
-            self._group_non_members = filter(
-                lambda u: u.id not in group_member_ids, all_users)
-        return self._group_non_members
+    def _get_group_member_ids(self):
+        if not hasattr(self, "_group_member_ids"):
+            self._group_member_ids = set(
+                user.id for user in self._get_group_members())
+        return self._group_member_ids
+
+    def _get_group_non_members(self, marker=None, limit=None):
+        """Returns the users of the domain of the group not in the group.
+
+        Passing ``limit`` and optionally ``marker`` (the id of the last user
+        of the previous page) returns a single page of them; pages of domain
+        users are fetched until it is full.
+        """
+        domain_id = self._get_group().domain_id
+        non_members = []
+        while True:
+            users = api.keystone.user_list(self.request,
+                                           domain=domain_id,
+                                           marker=marker,
+                                           limit=limit)
+            member_ids = self._get_group_member_ids()
+            non_members.extend(user for user in users
+                               if user.id not in member_ids)
+            if (limit is None or len(users) < limit or
+                    len(non_members) >= limit):
+                return non_members[:limit]
+            marker = users[-1].id
+
+    def _search_group_non_members(self, query, limit=None):
+        """Returns the non-members with ``query`` in their name or email.
+
+        Matching ignores case and is served from the user directory, so a
+        search does not list the users of the domain. At most ``limit``
+        users are returned.
+        """
+        domain_id = self._get_group().domain_id
+        member_ids = self._get_group_member_ids()
+
+        def is_candidate(user):
+            return (user.id not in member_ids and
+                    getattr(user, 'domain_id', None) == domain_id)
+        return api.keystone.user_directory().search(query, limit=limit,
+                                                    predicate=is_candidate)
 
 
 class ManageMembersView(GroupManageMixin, tables.DataTableView):
@@ -135,13 +169,55 @@ class NonMembersView(GroupManageMixin, forms.ModalFormMixin,
     def get_context_data(self, **kwargs):
         context = super(NonMembersView, self).get_context_data(**kwargs)
         context['group'] = self._get_group()
+        context['search_param'] = constants.GROUPS_NON_MEMBER_SEARCH_PARAM
+        context['query'] = self.get_query()
         return context
 
+    def has_more_data(self, table):
+        return self._more
+
+    def get_query(self):
+        # The search form is a GET form, but modals.js posts every form of
+        # a modal.
+        param = constants.GROUPS_NON_MEMBER_SEARCH_PARAM
+        query = (self.request.GET.get(param) or
+                 self.request.POST.get(param) or '')
+        return query.strip()
+
     def get_data(self):
         group_non_members = []
+        self._more = False
+        page_size = api.base.get_page_size(self.request)
+        query = self.get_query()
         try:
-            group_non_members = self._get_group_non_members()
+            if query:
+                return self._search_data(query, page_size)
+            marker = self.request.GET.get(
+                project_tables.GroupNonMembersTable._meta.pagination_param,
+                None)
+            group_non_members = self._get_group_non_members(marker,
+                                                            page_size + 1)
         except Exception:
             exceptions.handle(self.request,
                               _('Unable to retrieve users.'))
+        if len(group_non_members) > page_size:
+            group_non_members = group_non_members[:page_size]
+            self._more = True
         return group_non_members
+
+    def _search_data(self, query, page_size):
+        """Returns the first page of non-members matching ``query``.
+
+        Search results are not paginated, the query would be lost by the
+        link to the next page. When a query matches more than a page of
+        users the user is told to refine it.
+        """
+        users = self._search_group_non_members(query, page_size + 1)
+        if len(users) > page_size:
+            users = users[:page_size]
+            messages.info(
+                self.request,
+                _('Only the first %d matching users are shown, refine the '
+                  'search to find the others.') % page_size
+            )
+        return users
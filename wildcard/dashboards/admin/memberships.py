@@ -0,0 +1,139 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import functools
+import logging
+
+from django.utils.translation import ugettext_lazy as _  # noqa
+
+from horizon import exceptions
+from horizon import messages
+
+from wildcard import api
+from wildcard.api import concurrency
+
+
+LOG = logging.getLogger(__name__)
+
+USER = "user"
+GROUP = "group"
+
+
+class RoleReconciler(object):
+    """Brings the role assignments on a project or domain to a desired state.
+
+    The desired state maps a role id to the principals (user or group ids)
+    that should hold it; the current state maps a principal to the role ids
+    it holds today. :meth:`plan` diffs the two with set operations and
+    :meth:`apply` runs the resulting grants and revokes concurrently,
+    reporting every failed item on its own.
+    """
+
+    def __init__(self, request, roles, project=None, domain=None):
+        self.request = request
+        self.roles = dict((role.id, role) for role in roles)
+        self.project = project
+        self.domain = domain
+
+    def plan(self, desired, current):
+        """Returns the ``(grants, revokes)`` needed to reach ``desired``.
+
+        Both are sorted lists of ``(principal, role)`` pairs. Roles that are
+        not in the reconciler's role list are left untouched.
+        """
+        wanted = set((principal, role)
+                     for role, principals in desired.items()
+                     if role in self.roles
+                     for principal in principals)
+        held = set((principal, role)
+                   for principal, roles in current.items()
+                   for role in roles
+                   if role in self.roles)
+        return sorted(wanted - held), sorted(held - wanted)
+
+    def _protect_current_admin(self, revokes):
+        """Drops revokes which would lock the current user out.
+
+        Admins must not revoke their own admin role on the project they
+        are logged into; when that is attempted none of their roles are
+        revoked and a warning is shown instead.
+        """
+        user = self.request.user
+        if not self.project or self.project != user.tenant_id:
+            return revokes
+        own = [role for principal, role in revokes if principal == user.id]
+        if not any(self.roles[role].name.lower() == 'admin' for role in own):
+            return revokes
+        messages.warning(self.request,
+                         _('You cannot revoke your administrative privileges '
+                           'from the project you are currently logged into. '
+                           'Please switch to another project with '
+                           'administrative privileges or remove the '
+                           'administrative role manually via the CLI.'))
+        return [(principal, role) for principal, role in revokes
+                if principal != user.id]
+
+    def _call(self, kind, grant, principal, role):
+        keystone = api.keystone
+        scope = {}
+        if self.project:
+            scope['project'] = self.project
+        if self.domain:
+            scope['domain'] = self.domain
+        if kind == USER:
+            func = (keystone.add_tenant_user_role if grant
+                    else keystone.remove_tenant_user_role)
+            return functools.partial(func, self.request, user=principal,
+                                     role=role, **scope)
+        func = keystone.add_group_role if grant else keystone.remove_group_role
+        return functools.partial(func, self.request, role=role,
+                                 group=principal, **scope)
+
+    def apply(self, kind, grants, revokes):
+        """Runs the grants and revokes, returning the number of failures."""
+        items = ([(True, principal, role) for principal, role in grants] +
+                 [(False, principal, role) for principal, role in revokes])
+        results = concurrency.run(
+            [self._call(kind, grant, principal, role)
+             for grant, principal, role in items],
+            backend='identity')
+
+        failures = 0
+        for (grant, principal, role), result in zip(items, results):
+            if not result.failed:
+                continue
+            failures += 1
+            if grant:
+                msg = _('Unable to grant role "%(role)s" to %(kind)s '
+                        '"%(principal)s".')
+            else:
+                msg = _('Unable to revoke role "%(role)s" from %(kind)s '
+                        '"%(principal)s".')
+            params = {'role': self.roles[role].name,
+                      'kind': kind,
+                      'principal': principal}
+            try:
+                result.get()
+            except Exception:
+                exceptions.handle(self.request, msg % params)
+        return failures
+
+    def reconcile(self, kind, desired, current):
+        """Plans and applies the changes for one kind of principal."""
+        grants, revokes = self.plan(desired, current)
+        if kind == USER:
+            revokes = self._protect_current_admin(revokes)
+        LOG.debug('Reconciling %s roles: %d grants, %d revokes.'
+                  % (kind, len(grants), len(revokes)))
+        return self.apply(kind, grants, revokes)
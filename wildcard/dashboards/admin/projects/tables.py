@@ -23,8 +23,10 @@ from django.utils.http import urlencode  # noqa
 from django.utils.translation import ugettext_lazy as _  # noqa
 from horizon import tables
 
+from wildcard import actions
 from wildcard import api
 from wildcard.api import keystone
+from wildcard.dashboards.admin import policy as admin_policy
 
 
 class ViewMembersLink(tables.LinkAction):
@@ -88,10 +90,11 @@ class UpdateProject(tables.LinkAction):
         return api.keystone.keystone_can_edit_project()
 
 
-class DeleteTenantsAction(tables.DeleteAction):
+class DeleteTenantsAction(actions.DeleteAction):
     data_type_singular = _("Project")
     data_type_plural = _("Projects")
     policy_rules = (("identity", "identity:delete_project"),)
+    backend = "identity"
 
     def allowed(self, request, project):
         return api.keystone.keystone_can_edit_project()
@@ -114,7 +117,7 @@ class TenantFilterAction(tables.FilterAction):
         return filter(comp, tenants)
 
 
-class TenantsTable(tables.DataTable):
+class TenantsTable(admin_policy.RowPolicyMixin, tables.DataTable):
     name = tables.Column('name', verbose_name=_('Name'))
     description = tables.Column(lambda obj: getattr(obj, 'description', None),
                                 verbose_name=_('Description'))
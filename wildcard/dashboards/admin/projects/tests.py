@@ -15,6 +15,8 @@
 #    under the License.
 
 import logging
+import threading
+import time
 
 from django.core.urlresolvers import reverse  # noqa
 from django import http
@@ -26,6 +28,7 @@ from horizon import exceptions
 from horizon.workflows import views
 
 from wildcard import api
+from wildcard.dashboards.admin import memberships
 from wildcard.dashboards.admin.projects import workflows
 from wildcard.test import helpers as test
 
@@ -483,12 +486,30 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
         return [group for group in self.groups.list()
                 if group.project_id == project_id]
 
+    def _get_group_assignments(self, groups, roles):
+        assignments = api.keystone.RoleAssignments()
+        for group in groups:
+            for role in roles:
+                assignments.add(role.id, group=group.id)
+        return assignments
+
+    def _get_assignments(self, users=None, groups=None):
+        assignments = api.keystone.RoleAssignments()
+        for user, roles in (users or {}).items():
+            for role in roles:
+                assignments.add(role, user=user)
+        for group, roles in (groups or {}).items():
+            for role in roles:
+                assignments.add(role, group=group)
+        return assignments
+
     @test.create_stubs({api.keystone: ('get_default_role',
                                        'roles_for_user',
                                        'tenant_get',
                                        'domain_get',
                                        'user_list',
                                        'roles_for_group',
+                                       'role_assignments_index',
                                        'group_list',
                                        'role_list')})
     def test_update_project_get(self):
@@ -521,11 +542,11 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
                                         user.id,
                                         self.tenant.id).AndReturn(roles)
 
-        for group in groups:
-            api.keystone.roles_for_group(IsA(http.HttpRequest),
-                                         group=group.id,
-                                         project=self.tenant.id) \
-                .AndReturn(roles)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            project=self.tenant.id,
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_group_assignments(groups, roles))
 
         self.mox.ReplayAll()
 
@@ -558,6 +579,7 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
                                        'add_tenant_user_role',
                                        'user_list',
                                        'roles_for_group',
+                                       'role_assignments_index',
                                        'remove_group_role',
                                        'add_group_role',
                                        'group_list',
@@ -569,7 +591,6 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
         users = self._get_all_users(domain_id)
         proj_users = self._get_proj_users(project.id)
         groups = self._get_all_groups(domain_id)
-        proj_groups = self._get_proj_groups(project.id)
         roles = self.roles.list()
 
         # get/init
@@ -594,11 +615,11 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
             api.keystone.roles_for_user(IsA(http.HttpRequest),
                                         user.id,
                                         self.tenant.id).AndReturn(roles)
-        for group in groups:
-            api.keystone.roles_for_group(IsA(http.HttpRequest),
-                                         group=group.id,
-                                         project=self.tenant.id) \
-                .AndReturn(roles)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            project=self.tenant.id,
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_group_assignments(groups, roles))
 
         workflow_data[USER_ROLE_PREFIX + "1"] = ['3']  # admin role
         workflow_data[USER_ROLE_PREFIX + "2"] = ['2']  # member role
@@ -622,86 +643,62 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
 
         api.keystone.user_list(IsA(http.HttpRequest),
                                project=self.tenant.id).AndReturn(proj_users)
+        api.keystone.group_list(IsA(http.HttpRequest), domain=domain_id) \
+            .AndReturn(groups)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            project=self.tenant.id,
+            users=[user.id for user in proj_users],
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_assignments(
+                users={'1': ['1', '2'], '2': ['1'], '3': ['2']},
+                groups={'1': ['1', '2'], '2': ['1'], '3': ['2']}))
 
         # admin user - try to remove all roles on current project, warning
-        api.keystone.roles_for_user(
-            IsA(http.HttpRequest), '1', self.tenant.id
-        ).AndReturn(roles)
-
-        # member user 1 - has role 1, will remove it
-        api.keystone.roles_for_user(
-            IsA(http.HttpRequest), '2', self.tenant.id
-        ).AndReturn((roles[0],))
-        # remove role 1
-        api.keystone.remove_tenant_user_role(IsA(http.HttpRequest),
-                                             project=self.tenant.id,
-                                             user='2',
-                                             role='1')
-        # add role 2
+        # member user 2 - has role 1, will remove it and add role 2
         api.keystone.add_tenant_user_role(IsA(http.HttpRequest),
                                           project=self.tenant.id,
                                           user='2',
                                           role='2')
-
-        # member user 3 - has role 2
-        api.keystone.roles_for_user(
-            IsA(http.HttpRequest), '3', self.tenant.id
-        ).AndReturn((roles[1],))
-        # remove role 2
-        api.keystone.remove_tenant_user_role(IsA(http.HttpRequest),
-                                             project=self.tenant.id,
-                                             user='3',
-                                             role='2')
-        # add role 1
+        # member user 3 - has role 2, will remove it and add role 1
         api.keystone.add_tenant_user_role(IsA(http.HttpRequest),
                                           project=self.tenant.id,
                                           user='3',
                                           role='1')
+        api.keystone.remove_tenant_user_role(IsA(http.HttpRequest),
+                                             project=self.tenant.id,
+                                             user='2',
+                                             role='1')
+        api.keystone.remove_tenant_user_role(IsA(http.HttpRequest),
+                                             project=self.tenant.id,
+                                             user='3',
+                                             role='2')
 
         # Group assignments
-        api.keystone.group_list(IsA(http.HttpRequest),
-                                domain=domain_id,
-                                project=self.tenant.id).AndReturn(proj_groups)
-
-        # admin group - try to remove all roles on current project
-        api.keystone.roles_for_group(
-            IsA(http.HttpRequest), group='1', project=self.tenant.id
-        ).AndReturn(roles)
+        # member group 2 - has role 1, will remove it and add role 2
+        api.keystone.add_group_role(IsA(http.HttpRequest),
+                                    role='2',
+                                    group='2',
+                                    project=self.tenant.id)
+        # member group 3 - has role 2, will remove it and add role 1
+        api.keystone.add_group_role(IsA(http.HttpRequest),
+                                    role='1',
+                                    group='3',
+                                    project=self.tenant.id)
+        # admin group - remove all roles on current project
         for role in roles:
             api.keystone.remove_group_role(IsA(http.HttpRequest),
                                            role=role.id,
                                            group='1',
                                            project=self.tenant.id)
-
-        # member group 1 - has role 1, will remove it
-        api.keystone.roles_for_group(
-            IsA(http.HttpRequest), group='2', project=self.tenant.id
-        ).AndReturn((roles[0],))
-        # remove role 1
         api.keystone.remove_group_role(IsA(http.HttpRequest),
                                        role='1',
                                        group='2',
                                        project=self.tenant.id)
-        # add role 2
-        api.keystone.add_group_role(IsA(http.HttpRequest),
-                                    role='2',
-                                    group='2',
-                                    project=self.tenant.id)
-
-        # member group 3 - has role 2
-        api.keystone.roles_for_group(
-            IsA(http.HttpRequest), group='3', project=self.tenant.id
-        ).AndReturn((roles[1],))
-        # remove role 2
         api.keystone.remove_group_role(IsA(http.HttpRequest),
                                        role='2',
                                        group='3',
                                        project=self.tenant.id)
-        # add role 1
-        api.keystone.add_group_role(IsA(http.HttpRequest),
-                                    role='1',
-                                    group='3',
-                                    project=self.tenant.id)
 
         self.mox.ReplayAll()
 
@@ -744,6 +741,7 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
                                        'add_tenant_user_role',
                                        'user_list',
                                        'roles_for_group',
+                                       'role_assignments_index',
                                        'remove_group_role',
                                        'add_group_role',
                                        'group_list',
@@ -785,11 +783,12 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
                 workflow_data.setdefault(USER_ROLE_PREFIX + role_ids[0], []) \
                              .append(user.id)
 
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            project=self.tenant.id,
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_group_assignments(groups, roles))
         for group in groups:
-            api.keystone.roles_for_group(IsA(http.HttpRequest),
-                                         group=group.id,
-                                         project=self.tenant.id) \
-                .AndReturn(roles)
             role_ids = [role.id for role in roles]
             if role_ids:
                 workflow_data.setdefault(GROUP_ROLE_PREFIX + role_ids[0], []) \
@@ -835,6 +834,7 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
                                        'add_tenant_user_role',
                                        'user_list',
                                        'roles_for_group',
+                                       'role_assignments_index',
                                        'remove_group_role',
                                        'add_group_role',
                                        'group_list',
@@ -846,7 +846,6 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
         users = self._get_all_users(domain_id)
         proj_users = self._get_proj_users(project.id)
         groups = self._get_all_groups(domain_id)
-        proj_groups = self._get_proj_groups(project.id)
         roles = self.roles.list()
 
         # get/init
@@ -874,11 +873,11 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
                                         user.id,
                                         self.tenant.id).AndReturn(roles)
 
-        for group in groups:
-            api.keystone.roles_for_group(IsA(http.HttpRequest),
-                                         group=group.id,
-                                         project=self.tenant.id) \
-                .AndReturn(roles)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            project=self.tenant.id,
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_group_assignments(groups, roles))
 
         workflow_data[USER_ROLE_PREFIX + "1"] = ['1', '3']  # admin role
         workflow_data[USER_ROLE_PREFIX + "2"] = ['1', '2', '3']  # member role
@@ -903,48 +902,26 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
 
         api.keystone.user_list(IsA(http.HttpRequest),
                                project=self.tenant.id).AndReturn(proj_users)
-
-        # admin user - try to remove all roles on current project, warning
-        api.keystone.roles_for_user(
-            IsA(http.HttpRequest), '1', self.tenant.id
-        ).AndReturn(roles)
-
-        # member user 1 - has role 1, will remove it
-        api.keystone.roles_for_user(
-            IsA(http.HttpRequest), '2', self.tenant.id
-        ).AndReturn((roles[1],))
-
-        # member user 3 - has role 2
-        api.keystone.roles_for_user(
-            IsA(http.HttpRequest), '3', self.tenant.id
-        ).AndReturn((roles[0],))
-        # add role 2
+        api.keystone.group_list(IsA(http.HttpRequest), domain=domain_id) \
+            .AndReturn(groups)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            project=self.tenant.id,
+            users=[user.id for user in proj_users],
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_assignments(
+                users={'1': ['1', '2'], '2': ['2'], '3': ['1']},
+                groups={'1': ['1', '2'], '2': ['2'], '3': ['1']}))
+
+        # admin user and member user 2 - have no change
+        # member user 3 - has role 1, add role 2
         api.keystone.add_tenant_user_role(IsA(http.HttpRequest),
                                           project=self.tenant.id,
                                           user='3',
                                           role='2')
 
-        # Group assignment
-        api.keystone.group_list(IsA(http.HttpRequest),
-                                domain=domain_id,
-                                project=self.tenant.id).AndReturn(proj_groups)
-
-        # admin group 1- try to remove all roles on current project
-        api.keystone.roles_for_group(
-            IsA(http.HttpRequest), group='1', project=self.tenant.id
-        ).AndReturn(roles)
-
-        # member group 1 - has no change
-        api.keystone.roles_for_group(
-            IsA(http.HttpRequest), group='2', project=self.tenant.id
-        ).AndReturn((roles[1],))
-
-        # member group 3 - has role 1
-        api.keystone.roles_for_group(
-            IsA(http.HttpRequest), group='3', project=self.tenant.id
-        ).AndReturn((roles[0],))
-
-        # add role 2
+        # Group assignments
+        # member group 3 - has role 1, add role 2
         api.keystone.add_group_role(IsA(http.HttpRequest),
                                     role='2',
                                     group='3',
@@ -976,6 +953,7 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
                                        'add_tenant_user_role',
                                        'user_list',
                                        'roles_for_group',
+                                       'role_assignments_index',
                                        'remove_group_role',
                                        'add_group_role',
                                        'group_list',
@@ -1012,11 +990,11 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
             api.keystone.roles_for_user(IsA(http.HttpRequest),
                                         user.id,
                                         self.tenant.id).AndReturn(roles)
-        for group in groups:
-            api.keystone.roles_for_group(IsA(http.HttpRequest),
-                                         group=group.id,
-                                         project=self.tenant.id) \
-                .AndReturn(roles)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            project=self.tenant.id,
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_group_assignments(groups, roles))
 
         workflow_data[USER_ROLE_PREFIX + "1"] = ['1', '3']  # admin role
         workflow_data[USER_ROLE_PREFIX + "2"] = ['1', '2', '3']  # member role
@@ -1040,25 +1018,31 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
 
         api.keystone.user_list(IsA(http.HttpRequest),
                                project=self.tenant.id).AndReturn(proj_users)
-
-        # admin user - try to remove all roles on current project, warning
-        api.keystone.roles_for_user(IsA(http.HttpRequest), '1',
-                                    self.tenant.id).AndReturn(roles)
-
-        # member user 1 - has role 1, will remove it
-        api.keystone.roles_for_user(IsA(http.HttpRequest), '2',
-                                    self.tenant.id).AndReturn((roles[1],))
-
-        # member user 3 - has role 2
-        api.keystone.roles_for_user(IsA(http.HttpRequest), '3',
-                                    self.tenant.id).AndReturn((roles[0],))
-        # add role 2
+        api.keystone.group_list(IsA(http.HttpRequest), domain=domain_id) \
+            .AndReturn(groups)
+        api.keystone.role_assignments_index(
+            IsA(http.HttpRequest),
+            project=self.tenant.id,
+            users=[user.id for user in proj_users],
+            groups=[group.id for group in groups]) \
+            .AndReturn(self._get_assignments(
+                users={'1': ['1', '2'], '2': ['2'], '3': ['1']},
+                groups={'1': ['1', '2'], '2': ['2'], '3': ['1']}))
+
+        # admin user and member user 2 - have no change
+        # member user 3 - has role 1, add role 2
         api.keystone.add_tenant_user_role(IsA(http.HttpRequest),
                                           project=self.tenant.id,
                                           user='3',
-                                          role='2')\
+                                          role='2') \
             .AndRaise(self.exceptions.keystone)
 
+        # Group assignments are still applied
+        api.keystone.add_group_role(IsA(http.HttpRequest),
+                                    role='2',
+                                    group='3',
+                                    project=self.tenant.id)
+
         self.mox.ReplayAll()
 
         # submit form data
@@ -1103,3 +1087,65 @@ class UpdateProjectWorkflowTests(test.BaseAdminViewTests):
                 self.client.get(url)
         finally:
             logging.disable(logging.NOTSET)
+
+
+class FakeRoleManager(object):
+    """Records role changes from any thread, failing those of ``broken``."""
+
+    def __init__(self, error, broken):
+        self.error = error
+        self.broken = broken
+        self.calls = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def _record(self, grant, user, role):
+        # Keep the calls in flight long enough for the workers to overlap.
+        time.sleep(0.01)
+        with self._lock:
+            self.calls.append((grant, user, role))
+            self.threads.add(threading.current_thread().name)
+        if user == self.broken:
+            raise self.error
+
+    def add_user_role(self, user, role, project):
+        self._record(True, user, role)
+
+    def remove_user_role(self, user, role, project):
+        self._record(False, user, role)
+
+    def grant(self, role, user=None, **scope):
+        self._record(True, user, role)
+
+    def revoke(self, role, user=None, **scope):
+        self._record(False, user, role)
+
+
+class RoleReconcilerTests(test.TestCase):
+    def test_apply_concurrently(self):
+        roles = self.roles.list()
+        manager = FakeRoleManager(self.exceptions.keystone, broken='3')
+        client = type('FakeClient', (object,), {'roles': manager})
+        self.mox.stubs.Set(api.keystone, 'keystoneclient',
+                           lambda request, admin=False: client)
+        request = self.factory.get('/')
+        reconciler = memberships.RoleReconciler(request, roles,
+                                                project='1')
+        grants = [('1', roles[0].id), ('2', roles[0].id),
+                  ('3', roles[0].id)]
+        revokes = [('1', roles[1].id), ('4', roles[1].id)]
+
+        with self.settings(WILDCARD_API_CONCURRENCY={'default': 4}):
+            failures = reconciler.apply(memberships.USER, grants, revokes)
+
+        self.assertEqual(failures, 1)
+        self.assertItemsEqual(
+            manager.calls,
+            [(True, user, role) for user, role in grants] +
+            [(False, user, role) for user, role in revokes])
+        self.assertTrue(len(manager.threads) > 1)
+        errors = [m.message for m in request._messages
+                  if 'error' in m.tags]
+        self.assertEqual(errors,
+                         ['Unable to grant role "%s" to user "3".'
+                          % roles[0].name])
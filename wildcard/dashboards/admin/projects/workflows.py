@@ -25,11 +25,11 @@ from django.utils.translation import ugettext_lazy as _  # noqa
 
 from horizon import exceptions
 from horizon import forms
-from horizon import messages
 from horizon import workflows
 
 from wildcard import api
 from wildcard.api import keystone
+from wildcard.dashboards.admin import memberships
 
 INDEX_URL = "horizon:admin:projects:index"
 ADD_USER_URL = "horizon:admin:projects:create_user"
@@ -240,17 +240,18 @@ class UpdateProjectGroupsAction(workflows.MembershipAction):
 
         # Figure out groups & roles
         if project_id:
+            try:
+                assignments = api.keystone.role_assignments_index(
+                    self.request,
+                    project=project_id,
+                    groups=[group.id for group in all_groups])
+            except Exception:
+                exceptions.handle(request,
+                                  err_msg,
+                                  redirect=reverse(INDEX_URL))
             for group in all_groups:
-                try:
-                    roles = api.keystone.roles_for_group(self.request,
-                                                         group=group.id,
-                                                         project=project_id)
-                except Exception:
-                    exceptions.handle(request,
-                                      err_msg,
-                                      redirect=reverse(INDEX_URL))
-                for role in roles:
-                    field_name = self.get_member_field_name(role.id)
+                for role_id in assignments.roles_for_group(group.id):
+                    field_name = self.get_member_field_name(role_id)
                     self.fields[field_name].initial.append(group.id)
 
     class Meta:
@@ -434,11 +435,15 @@ class UpdateProject(workflows.Workflow):
     def format_status_message(self, message):
         return message % self.context.get('name', 'unknown project')
 
-    def handle(self, request, data):
-        # FIXME(gabriel): This should be refactored to use Python's built-in
-        # sets and do this all in a single "roles to add" and "roles to remove"
-        # pass instead of the multi-pass thing happening now.
+    def _get_desired_roles(self, slug, roles, data):
+        step = self.get_step(slug)
+        desired = {}
+        for role in roles:
+            field_name = step.get_member_field_name(role.id)
+            desired[role.id] = data[field_name]
+        return desired
 
+    def handle(self, request, data):
         project_id = data['project_id']
         domain_id = ''
         # update project info
@@ -455,170 +460,45 @@ class UpdateProject(workflows.Workflow):
             exceptions.handle(request, ignore=True)
             return False
 
-        # update project members
-        users_to_modify = 0
-        # Project-user member step
-        member_step = self.get_step(PROJECT_USER_MEMBER_SLUG)
+        # Get the users and groups currently associated with this project,
+        # and their roles, so we can diff against them.
         try:
-            # Get our role options
             available_roles = api.keystone.role_list(request)
-            # Get the users currently associated with this project so we
-            # can diff against it.
             project_members = api.keystone.user_list(request,
                                                      project=project_id)
-            users_to_modify = len(project_members)
-
-            for user in project_members:
-                # Check if there have been any changes in the roles of
-                # Existing project members.
-                current_roles = api.keystone.roles_for_user(self.request,
-                                                            user.id,
-                                                            project_id)
-                current_role_ids = [role.id for role in current_roles]
-
-                for role in available_roles:
-                    field_name = member_step.get_member_field_name(role.id)
-                    # Check if the user is in the list of users with this role.
-                    if user.id in data[field_name]:
-                        # Add it if necessary
-                        if role.id not in current_role_ids:
-                            # user role has changed
-                            api.keystone.add_tenant_user_role(
-                                request,
-                                project=project_id,
-                                user=user.id,
-                                role=role.id)
-                        else:
-                            # User role is unchanged, so remove it from the
-                            # remaining roles list to avoid removing it later.
-                            index = current_role_ids.index(role.id)
-                            current_role_ids.pop(index)
-
-                # Prevent admins from doing stupid things to themselves.
-                is_current_user = user.id == request.user.id
-                is_current_project = project_id == request.user.tenant_id
-                admin_roles = [role for role in current_roles
-                               if role.name.lower() == 'admin']
-                if len(admin_roles):
-                    removing_admin = any([role.id in current_role_ids
-                                          for role in admin_roles])
-                else:
-                    removing_admin = False
-                if is_current_user and is_current_project and removing_admin:
-                    # Cannot remove "admin" role on current(admin) project
-                    msg = _('You cannot revoke your administrative privileges '
-                            'from the project you are currently logged into. '
-                            'Please switch to another project with '
-                            'administrative privileges or remove the '
-                            'administrative role manually via the CLI.')
-                    messages.warning(request, msg)
-
-                # Otherwise go through and revoke any removed roles.
-                else:
-                    for id_to_delete in current_role_ids:
-                        api.keystone.remove_tenant_user_role(
-                            request,
-                            project=project_id,
-                            user=user.id,
-                            role=id_to_delete)
-                users_to_modify -= 1
-
-            # Grant new roles on the project.
-            for role in available_roles:
-                field_name = member_step.get_member_field_name(role.id)
-                # Count how many users may be added for exception handling.
-                users_to_modify += len(data[field_name])
-            for role in available_roles:
-                users_added = 0
-                field_name = member_step.get_member_field_name(role.id)
-                for user_id in data[field_name]:
-                    if not filter(lambda x: user_id == x.id, project_members):
-                        api.keystone.add_tenant_user_role(request,
-                                                          project=project_id,
-                                                          user=user_id,
-                                                          role=role.id)
-                    users_added += 1
-                users_to_modify -= users_added
-        except Exception:
+            domain_groups = []
             if PROJECT_GROUP_ENABLED:
-                group_msg = _(", update project groups")
-            else:
-                group_msg = ""
-            exceptions.handle(
-                request, _('Failed to modify %(users_to_modify)s '
-                           'project members%(group_msg)s.') % {
-                               'users_to_modify': users_to_modify,
-                               'group_msg': group_msg})
+                domain_groups = api.keystone.group_list(request,
+                                                        domain=domain_id)
+            assignments = api.keystone.role_assignments_index(
+                request,
+                project=project_id,
+                users=[user.id for user in project_members],
+                groups=[group.id for group in domain_groups])
+        except Exception:
+            exceptions.handle(request, _('Unable to retrieve the current '
+                                         'project members.'))
             return True
 
+        reconciler = memberships.RoleReconciler(request,
+                                                available_roles,
+                                                project=project_id)
+
+        # update project members
+        reconciler.reconcile(
+            memberships.USER,
+            self._get_desired_roles(PROJECT_USER_MEMBER_SLUG,
+                                    available_roles, data),
+            dict((user.id, assignments.roles_for_user(user.id))
+                 for user in project_members))
+
         if PROJECT_GROUP_ENABLED:
             # update project groups
-            groups_to_modify = 0
-            member_step = self.get_step(PROJECT_GROUP_MEMBER_SLUG)
-            try:
-                # Get the groups currently associated with this project so we
-                # can diff against it.
-                project_groups = api.keystone.group_list(request,
-                                                         domain=domain_id,
-                                                         project=project_id)
-                groups_to_modify = len(project_groups)
-                for group in project_groups:
-                    # Check if there have been any changes in the roles of
-                    # Existing project members.
-                    current_roles = api.keystone.roles_for_group(
-                        self.request,
-                        group=group.id,
-                        project=project_id)
-                    current_role_ids = [role.id for role in current_roles]
-                    for role in available_roles:
-                        # Check if the group is in the list of groups with
-                        # this role.
-                        field_name = member_step.get_member_field_name(role.id)
-                        if group.id in data[field_name]:
-                            # Add it if necessary
-                            if role.id not in current_role_ids:
-                                # group role has changed
-                                api.keystone.add_group_role(
-                                    request,
-                                    role=role.id,
-                                    group=group.id,
-                                    project=project_id)
-                            else:
-                                # Group role is unchanged, so remove it from
-                                # the remaining roles list to avoid removing it
-                                # later.
-                                index = current_role_ids.index(role.id)
-                                current_role_ids.pop(index)
-
-                    # Revoke any removed roles.
-                    for id_to_delete in current_role_ids:
-                        api.keystone.remove_group_role(request,
-                                                       role=id_to_delete,
-                                                       group=group.id,
-                                                       project=project_id)
-                    groups_to_modify -= 1
-
-                # Grant new roles on the project.
-                for role in available_roles:
-                    field_name = member_step.get_member_field_name(role.id)
-                    # Count how many groups may be added for error handling.
-                    groups_to_modify += len(data[field_name])
-                for role in available_roles:
-                    groups_added = 0
-                    field_name = member_step.get_member_field_name(role.id)
-                    for group_id in data[field_name]:
-                        if not filter(lambda x: group_id == x.id,
-                                      project_groups):
-                            api.keystone.add_group_role(request,
-                                                        role=role.id,
-                                                        group=group_id,
-                                                        project=project_id)
-                        groups_added += 1
-                    groups_to_modify -= groups_added
-            except Exception:
-                exceptions.handle(request, _('Failed to modify %s project '
-                                             'members, update project groups.'
-                                             ) % groups_to_modify)
-                return True
+            reconciler.reconcile(
+                memberships.GROUP,
+                self._get_desired_roles(PROJECT_GROUP_MEMBER_SLUG,
+                                        available_roles, data),
+                dict((group.id, assignments.roles_for_group(group.id))
+                     for group in domain_groups))
 
         return True
@@ -13,13 +13,17 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import functools
+
 from django.template import defaultfilters
 from django.utils.translation import ugettext_lazy as _  # noqa
 
 from horizon import messages
 from horizon import tables
 
+from wildcard import actions
 from wildcard import api
+from wildcard.dashboards.admin import policy as admin_policy
 
 
 ENABLE = 0
@@ -55,7 +59,7 @@ class EditUserLink(tables.LinkAction):
         return api.keystone.keystone_can_edit_user()
 
 
-class ToggleEnabled(tables.BatchAction):
+class ToggleEnabled(actions.BatchAction):
     name = "toggle"
     action_present = (_("Enable"), _("Disable"))
     action_past = (_("Enabled"), _("Disabled"))
@@ -63,6 +67,7 @@ class ToggleEnabled(tables.BatchAction):
     data_type_plural = _("Users")
     classes = ("btn-toggle",)
     policy_rules = (("identity", "identity:update_user"),)
+    backend = "identity"
 
     def get_policy_target(self, request, user=None):
         if user:
@@ -88,23 +93,34 @@ class ToggleEnabled(tables.BatchAction):
         if user and user.id == request.user.id:
             self.attrs["disabled"] = "disabled"
 
-    def action(self, request, obj_id):
+    def get_call(self, request, obj_id):
+        return functools.partial(self.action, request, obj_id,
+                                 enabled=self.enabled)
+
+    def action(self, request, obj_id, enabled):
         if obj_id == request.user.id:
-            messages.info(request, _('You cannot disable the user you are '
-                                     'currently logged in as.'))
-            return
-        if self.enabled:
+            # Reported by completed()
+            return None
+        if enabled:
             api.keystone.user_update_enabled(request, obj_id, False)
-            self.current_past_action = DISABLE
+            return DISABLE
         else:
             api.keystone.user_update_enabled(request, obj_id, True)
-            self.current_past_action = ENABLE
+            return ENABLE
+
+    def completed(self, request, user, past_action):
+        if past_action is None:
+            messages.info(request, _('You cannot disable the user you are '
+                                     'currently logged in as.'))
+        else:
+            self.current_past_action = past_action
 
 
-class DeleteUsersAction(tables.DeleteAction):
+class DeleteUsersAction(actions.DeleteAction):
     data_type_singular = _("User")
     data_type_plural = _("Users")
     policy_rules = (("identity", "identity:delete_user"),)
+    backend = "identity"
 
     def allowed(self, request, datum):
         if not api.keystone.keystone_can_edit_user() or \
@@ -125,7 +141,7 @@ class UserFilterAction(tables.FilterAction):
                 or q in user.email.lower()]
 
 
-class UsersTable(tables.DataTable):
+class UsersTable(admin_policy.RowPolicyMixin, tables.DataTable):
     STATUS_CHOICES = (
         ("true", True),
         ("false", False)
@@ -145,5 +161,6 @@ class UsersTable(tables.DataTable):
     class Meta:
         name = "users"
         verbose_name = _("Users")
+        pagination_param = "user_marker"
         row_actions = (EditUserLink, ToggleEnabled, DeleteUsersAction)
         table_actions = (UserFilterAction, CreateUserLink, DeleteUsersAction)
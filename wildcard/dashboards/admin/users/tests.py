@@ -20,6 +20,7 @@
 
 from socket import timeout as socket_timeout  # noqa
 
+from django.conf import settings  # noqa
 from django.core.urlresolvers import reverse  # noqa
 from django import http
 
@@ -27,9 +28,12 @@ from mox import IgnoreArg  # noqa
 from mox import IsA  # noqa
 
 from wildcard import api
+from wildcard.dashboards.admin.users import tables
+from wildcard import policy
 from wildcard.test import helpers as test
 
 
+PAGE_SIZE = getattr(settings, 'API_RESULT_PAGE_SIZE', 20)
 USERS_INDEX_URL = reverse('horizon:admin:users:index')
 USER_CREATE_URL = reverse('horizon:admin:users:create')
 USER_UPDATE_URL = reverse('horizon:admin:users:update', args=[1])
@@ -56,8 +60,9 @@ class UsersViewTests(test.BaseAdminViewTests):
         domain = self._get_default_domain()
         domain_id = domain.id
         users = self._get_users(domain_id)
-        api.keystone.user_list(
-            IgnoreArg(), domain=domain_id).AndReturn(users)
+        api.keystone.user_list(IgnoreArg(), domain=domain_id,
+                               marker=None, limit=PAGE_SIZE + 1) \
+            .AndReturn(users)
 
         self.mox.ReplayAll()
 
@@ -370,7 +375,9 @@ class UsersViewTests(test.BaseAdminViewTests):
         users = self._get_users(domain_id)
         user.enabled = False
 
-        api.keystone.user_list(IgnoreArg(), domain=domain_id).AndReturn(users)
+        api.keystone.user_list(IgnoreArg(), domain=domain_id,
+                               marker=None, limit=PAGE_SIZE + 1) \
+            .AndReturn(users)
         api.keystone.user_update_enabled(IgnoreArg(),
                                          user.id,
                                          True).AndReturn(user)
@@ -391,7 +398,8 @@ class UsersViewTests(test.BaseAdminViewTests):
 
         self.assertTrue(user.enabled)
 
-        api.keystone.user_list(IgnoreArg(), domain=domain_id) \
+        api.keystone.user_list(IgnoreArg(), domain=domain_id,
+                               marker=None, limit=PAGE_SIZE + 1) \
             .AndReturn(users)
         api.keystone.user_update_enabled(IgnoreArg(),
                                          user.id,
@@ -412,7 +420,8 @@ class UsersViewTests(test.BaseAdminViewTests):
         users = self._get_users(domain_id)
         user.enabled = False
 
-        api.keystone.user_list(IgnoreArg(), domain=domain_id) \
+        api.keystone.user_list(IgnoreArg(), domain=domain_id,
+                               marker=None, limit=PAGE_SIZE + 1) \
             .AndReturn(users)
         api.keystone.user_update_enabled(IgnoreArg(), user.id, True) \
                     .AndRaise(self.exceptions.keystone)
@@ -429,7 +438,8 @@ class UsersViewTests(test.BaseAdminViewTests):
         domain_id = domain.id
         users = self._get_users(domain_id)
         for i in range(0, 2):
-            api.keystone.user_list(IgnoreArg(), domain=domain_id) \
+            api.keystone.user_list(IgnoreArg(), domain=domain_id,
+                                   marker=None, limit=PAGE_SIZE + 1) \
                 .AndReturn(users)
 
         self.mox.ReplayAll()
@@ -441,13 +451,37 @@ class UsersViewTests(test.BaseAdminViewTests):
                          u'You cannot disable the user you are currently '
                          u'logged in as.')
 
+    @test.create_stubs({api.keystone: ('user_delete', 'user_list')})
+    def test_delete_users_reports_each_failure(self):
+        domain = self._get_default_domain()
+        domain_id = domain.id
+        users = self._get_users(domain_id)
+        user_two = self.users.get(id="2")
+        user_three = self.users.get(id="3")
+
+        api.keystone.user_list(IgnoreArg(), domain=domain_id,
+                               marker=None, limit=PAGE_SIZE + 1) \
+            .AndReturn(users)
+        api.keystone.user_delete(IgnoreArg(), user_two.id)
+        api.keystone.user_delete(IgnoreArg(), user_three.id) \
+            .AndRaise(self.exceptions.keystone)
+        self.mox.ReplayAll()
+
+        formData = {'action': 'users__delete',
+                    'object_ids': [user_two.id, user_three.id]}
+        res = self.client.post(USERS_INDEX_URL, formData)
+
+        self.assertRedirectsNoFollow(res, USERS_INDEX_URL)
+        self.assertMessageCount(info=1, error=1)
+
     @test.create_stubs({api.keystone: ('user_list',)})
     def test_delete_user_with_improper_permissions(self):
         domain = self._get_default_domain()
         domain_id = domain.id
         users = self._get_users(domain_id)
         for i in range(0, 2):
-            api.keystone.user_list(IgnoreArg(), domain=domain_id) \
+            api.keystone.user_list(IgnoreArg(), domain=domain_id,
+                                   marker=None, limit=PAGE_SIZE + 1) \
                 .AndReturn(users)
 
         self.mox.ReplayAll()
@@ -460,6 +494,34 @@ class UsersViewTests(test.BaseAdminViewTests):
                          % self.request.user.username)
 
 
+class RowPolicyTests(test.BaseAdminViewTests):
+    def test_row_actions_read_the_decision_matrix(self):
+        users = self.users.list()
+        denied = users[1].id
+        calls = []
+
+        def check_many(actions, request, targets):
+            calls.append((actions, targets))
+            return [[target.get('user_id') != denied for target in targets]
+                    for rules in actions]
+        self.mox.stubs.Set(policy, 'check_many', check_many)
+
+        table = tables.UsersTable(self.request, users)
+        rows = dict((row.datum.id, row) for row in table.get_rows())
+
+        # The delete target is the same for every user, and is decided once.
+        self.assertEqual([len(targets) for actions, targets in calls],
+                         [len(users), len(users), 1])
+        names = dict((user.id, [action.name for action in
+                                table.get_row_actions(user)])
+                     for user in users)
+        self.assertNotIn('edit', names[denied])
+        self.assertNotIn('toggle', names[denied])
+        self.assertIn('edit', names[users[2].id])
+        self.assertIn('toggle', names[users[2].id])
+        self.assertEqual(len(rows), len(users))
+
+
 class SeleniumTests(test.SeleniumAdminTestCase):
     def _get_default_domain(self):
         domain = {"id": None, "name": None}
@@ -478,7 +540,8 @@ class SeleniumTests(test.SeleniumAdminTestCase):
         api.keystone.tenant_list(IgnoreArg(), domain=None, user=None) \
             .AndReturn([self.tenants.list(), False])
         api.keystone.role_list(IgnoreArg()).AndReturn(self.roles.list())
-        api.keystone.user_list(IgnoreArg(), domain=None) \
+        api.keystone.user_list(IgnoreArg(), domain=None,
+                               marker=None, limit=PAGE_SIZE + 1) \
             .AndReturn(self.users.list())
         api.keystone.get_default_role(IgnoreArg()) \
                     .AndReturn(self.roles.first())
@@ -42,15 +42,27 @@ class IndexView(tables.DataTableView):
     table_class = project_tables.UsersTable
     template_name = 'admin/users/index.html'
 
+    def has_more_data(self, table):
+        return self._more
+
     def get_data(self):
         users = []
+        self._more = False
+        marker = self.request.GET.get(
+            project_tables.UsersTable._meta.pagination_param, None)
+        page_size = api.base.get_page_size(self.request)
         domain_context = self.request.session.get('domain_context', None)
         try:
             users = api.keystone.user_list(self.request,
-                                           domain=domain_context)
+                                           domain=domain_context,
+                                           marker=marker,
+                                           limit=page_size + 1)
         except Exception:
             exceptions.handle(self.request,
                               _('Unable to retrieve user list.'))
+        if len(users) > page_size:
+            users = users[:page_size]
+            self._more = True
         return users
 
 
@@ -26,6 +26,13 @@ class CreateDomainLink(tables.LinkAction):
     classes = ("ajax-modal", "btn-create")
 
 
+class ExportDomainsLink(tables.LinkAction):
+    name = "export"
+    verbose_name = _("Export Domains")
+    url = "horizon:project:domains:export"
+    classes = ("btn-download",)
+
+
 class EditDomainLink(tables.LinkAction):
     name = "edit"
     verbose_name = _("Edit")
@@ -47,13 +54,14 @@ class DomainsTable(tables.DataTable):
 
     class Meta:
         name = "domains"
+        pagination_param = "domain_marker"
         verbose_name = _("Domains")
         row_actions = (
             EditDomainLink,
             DeleteDomainsAction,
         )
         table_actions = (
-            CreateDomainLink, DeleteDomainsAction,
+            CreateDomainLink, ExportDomainsLink, DeleteDomainsAction,
         )
 
     def get_object_id(self, datum):
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from django.conf import settings
 from django.core.urlresolvers import reverse
 from django import http
 
@@ -21,7 +22,9 @@ from wildcard import api
 from wildcard.test import helpers as test
 
 
+PAGE_SIZE = getattr(settings, 'API_RESULT_PAGE_SIZE', 20)
 INDEX_URL = reverse('horizon:project:domains:index')
+EXPORT_URL = reverse('horizon:project:domains:export')
 CREATE_URL = reverse('horizon:project:domains:create')
 UPDATE_URL = reverse('horizon:project:domains:update', args=[1])
 
@@ -38,7 +41,9 @@ class DomainTests(test.TestCase):
     @test.create_stubs({api.ripcord: ('domain_list',)})
     def test_index(self):
         api.ripcord.domain_list(
-            IsA(http.HttpRequest)
+            IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.project_domains.list())
         self.mox.ReplayAll()
 
@@ -48,6 +53,20 @@ class DomainTests(test.TestCase):
         domains = res.context['domains_table'].data
         self.assertItemsEqual(domains, self.project_domains.list())
 
+    @test.create_stubs({api.ripcord: ('domain_list',)})
+    def test_export(self):
+        domains = self.project_domains.list()
+        api.ripcord.domain_list(IsA(http.HttpRequest)).AndReturn(domains)
+        self.mox.ReplayAll()
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res['Content-Disposition'],
+                         'attachment; filename="domains.csv"')
+        lines = ''.join(res.streaming_content).splitlines()
+        self.assertEqual(lines, ['uuid,name'] +
+                         ['%s,%s' % (d.uuid, d.name) for d in domains])
+
     def _test_create_successful(self, domain, create_args, post_data):
         api.ripcord.domain_create(
             IsA(http.HttpRequest),
@@ -109,6 +128,8 @@ class DomainTests(test.TestCase):
         )
         api.ripcord.domain_list(
             IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.project_domains.list())
         self.mox.ReplayAll()
 
@@ -21,6 +21,7 @@ from horizon import tables
 
 from wildcard import api
 
+from wildcard.dashboards.project import exports
 from wildcard.dashboards.project.domains \
     import forms as project_forms
 from wildcard.dashboards.project.domains \
@@ -34,13 +35,39 @@ class IndexView(tables.DataTableView):
     table_class = project_tables.DomainsTable
     template_name = 'project/domains/index.html'
 
+    def has_more_data(self, table):
+        return self._more
+
     def get_data(self):
+        domains = []
+        self._more = False
+        marker = self.request.GET.get(
+            project_tables.DomainsTable._meta.pagination_param, None)
+        page_size = api.base.get_page_size(self.request)
         try:
-            return api.ripcord.domain_list(self.request)
+            domains = api.ripcord.domain_list(
+                self.request,
+                limit=page_size + 1,
+                marker=marker,
+            )
         except Exception:
             exceptions.handle(
                 self.request, _('Unable to retrieve domain list.')
             )
+        if len(domains) > page_size:
+            domains = domains[:page_size]
+            self._more = True
+        return domains
+
+
+class ExportView(exports.ExportView):
+    fields = ('uuid', 'name')
+    filename = 'domains'
+    redirect_url = INDEX_URL
+    error_message = _('Unable to export domains.')
+
+    def list(self):
+        return api.ripcord.domain_list(self.request)
 
 
 class CreateView(forms.ModalFormView):
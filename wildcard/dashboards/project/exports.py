@@ -0,0 +1,128 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Streaming exports of the resources listed by the project panels.
+
+The backends list everything in a single call, so an export fetches the
+full listing once and serializes its rows while the response is streamed.
+Only the listing is held in memory, never the serialized export.
+"""
+
+import abc
+import csv
+import json
+import logging
+
+from django import http
+from django.utils.translation import ugettext_lazy as _
+from django.views import generic
+
+from horizon import exceptions
+
+
+LOG = logging.getLogger(__name__)
+
+
+class _Echo(object):
+    """A file-like object which returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def to_csv(fields, rows):
+    """Yields ``rows`` as CSV lines, starting with a header line."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            unicode(row[field]).encode('utf-8')
+            if row[field] is not None else ''
+            for field in fields
+        ])
+
+
+def to_json(fields, rows):
+    """Yields ``rows`` as a JSON list of objects, one object at a time."""
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps(
+            dict((field, row[field]) for field in fields),
+            default=unicode,
+        )
+        separator = ','
+    yield ']'
+
+
+FORMATS = {
+    'csv': (to_csv, 'text/csv'),
+    'json': (to_json, 'application/json'),
+}
+
+
+class ExportView(generic.View):
+    """Streams every resource of a panel as CSV or JSON.
+
+    Subclasses set ``fields``, ``filename`` and ``redirect_url`` and
+    implement :meth:`list`. The format is picked with the ``format`` query
+    parameter and defaults to CSV.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    fields = ()
+    filename = None
+    redirect_url = None
+    error_message = _('Unable to export data.')
+
+    @abc.abstractmethod
+    def list(self):
+        """Returns every resource to export."""
+
+    def prepare(self):
+        """Called once, before the first row is serialized.
+
+        Lookup tables needed by :meth:`get_row` are built here.
+        """
+
+    def get_row(self, obj):
+        return dict((field, getattr(obj, field, None))
+                    for field in self.fields)
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in FORMATS:
+            raise http.Http404
+        serializer, content_type = FORMATS[export_format]
+
+        # The resources are fetched up front so that backend errors can
+        # still be reported to the user.
+        try:
+            objects = self.list()
+            self.prepare()
+        except Exception:
+            exceptions.handle(request, self.error_message,
+                              redirect=self.redirect_url)
+
+        rows = (self.get_row(obj) for obj in objects)
+        response = http.StreamingHttpResponse(
+            serializer(self.fields, rows),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="%s.%s"' % (self.filename, export_format)
+        )
+        return response
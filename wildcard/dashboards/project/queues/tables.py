@@ -13,12 +13,14 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import functools
 import logging
 
 from django.utils.translation import ugettext_lazy as _  # noqa
 
 from horizon import tables
 
+from wildcard import actions
 from wildcard import api
 
 
@@ -32,6 +34,13 @@ class CreateQueueLink(tables.LinkAction):
     classes = ("ajax-modal", "btn-create")
 
 
+class ExportQueuesLink(tables.LinkAction):
+    name = "export"
+    verbose_name = _("Export Queues")
+    url = "horizon:project:queues:export"
+    classes = ("btn-download",)
+
+
 class EditQueueLink(tables.LinkAction):
     name = "edit"
     verbose_name = _("Edit")
@@ -39,13 +48,14 @@ class EditQueueLink(tables.LinkAction):
     classes = ("ajax-modal", "btn-edit")
 
 
-class ToggleEnabled(tables.BatchAction):
+class ToggleEnabled(actions.BatchAction):
     name = "toggle"
     action_present = (_("Enable"), _("Disable"))
     action_past = (_("Enabled"), _("Disabled"))
     data_type_singular = _("Queue")
     data_type_plural = _("Queues")
     classes = ("btn-toggle",)
+    backend = "queue"
 
     def allowed(self, request, queue=None):
         if queue:
@@ -53,14 +63,22 @@ class ToggleEnabled(tables.BatchAction):
             self.current_present_action = int(not self.disabled)
         return True
 
-    def action(self, request, obj_id):
-        api.payload.queue_update(request, obj_id, disabled=not self.disabled)
-        self.current_past_action = int(not self.disabled)
+    def get_call(self, request, obj_id):
+        return functools.partial(self.action, request, obj_id,
+                                 disabled=not self.disabled)
+
+    def action(self, request, obj_id, disabled):
+        api.payload.queue_update(request, obj_id, disabled=disabled)
+        return int(disabled)
+
+    def completed(self, request, datum, past_action):
+        self.current_past_action = past_action
 
 
-class DeleteQueuesAction(tables.DeleteAction):
+class DeleteQueuesAction(actions.DeleteAction):
     data_type_singular = _("Queue")
     data_type_plural = _("Queues")
+    backend = "queue"
 
     def delete(self, request, obj_id):
         api.payload.queue_delete(request, obj_id)
@@ -79,9 +97,11 @@ class QueuesTable(tables.DataTable):
 
     class Meta:
         name = "queues"
+        pagination_param = "queue_marker"
         verbose_name = _("Queues")
         row_actions = (EditQueueLink, ToggleEnabled, DeleteQueuesAction)
-        table_actions = (CreateQueueLink, DeleteQueuesAction)
+        table_actions = (CreateQueueLink, ExportQueuesLink,
+                         DeleteQueuesAction)
 
     def get_object_id(self, datum):
         return datum.uuid
@@ -14,6 +14,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+
+from django.conf import settings  # noqa
 from django.core.urlresolvers import reverse  # noqa
 from django import http
 
@@ -23,7 +26,9 @@ from wildcard import api
 from wildcard.test import helpers as test
 
 
+PAGE_SIZE = getattr(settings, 'API_RESULT_PAGE_SIZE', 20)
 INDEX_URL = reverse('horizon:project:queues:index')
+EXPORT_URL = reverse('horizon:project:queues:export')
 CREATE_URL = reverse('horizon:project:queues:create')
 UPDATE_URL = reverse('horizon:project:queues:update', args=[1])
 
@@ -33,7 +38,9 @@ class QueueTests(test.TestCase):
     @test.create_stubs({api.payload: ('queue_list',)})
     def test_index(self):
         api.payload.queue_list(
-            IsA(http.HttpRequest)
+            IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.queues.list())
         self.mox.ReplayAll()
 
@@ -43,6 +50,21 @@ class QueueTests(test.TestCase):
         queues = res.context['queues_table'].data
         self.assertItemsEqual(queues, self.queues.list())
 
+    @test.create_stubs({api.payload: ('queue_list',)})
+    def test_export_json(self):
+        api.payload.queue_list(IsA(http.HttpRequest)) \
+            .AndReturn(self.queues.list())
+        self.mox.ReplayAll()
+
+        res = self.client.get(EXPORT_URL, {'format': 'json'})
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res['Content-Disposition'],
+                         'attachment; filename="queues.json"')
+        rows = json.loads(''.join(res.streaming_content))
+        self.assertEqual([(row['uuid'], row['name']) for row in rows],
+                         [(q.uuid, q.name) for q in self.queues.list()])
+
     def _test_create_successful(self, queue, create_args, post_data):
         api.payload.queue_create(
             IsA(http.HttpRequest),
@@ -143,6 +165,8 @@ class QueueTests(test.TestCase):
         )
         api.payload.queue_list(
             IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.queues.list())
         self.mox.ReplayAll()
 
@@ -158,6 +182,8 @@ class QueueTests(test.TestCase):
 
         api.payload.queue_list(
             IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.queues.list())
         api.payload.queue_update(
             IsA(http.HttpRequest),
@@ -179,6 +205,8 @@ class QueueTests(test.TestCase):
 
         api.payload.queue_list(
             IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.queues.list())
         api.payload.queue_update(
             IsA(http.HttpRequest),
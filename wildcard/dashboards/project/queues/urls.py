@@ -24,6 +24,7 @@ urlpatterns = patterns(
     '',
     url(r'^$', views.IndexView.as_view(), name='index'),
     url(r'^create/$', views.CreateView.as_view(), name='create'),
+    url(r'^export/$', views.ExportView.as_view(), name='export'),
     url(
         r'^(?P<queue_id>[^/]+)/update/$',
         views.UpdateView.as_view(),
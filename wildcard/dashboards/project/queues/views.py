@@ -24,6 +24,7 @@ from horizon import tables
 
 from wildcard import api
 
+from wildcard.dashboards.project import exports
 from wildcard.dashboards.project.queues \
     import forms as project_forms
 from wildcard.dashboards.project.queues \
@@ -34,13 +35,40 @@ class IndexView(tables.DataTableView):
     table_class = project_tables.QueuesTable
     template_name = 'project/queues/index.html'
 
+    def has_more_data(self, table):
+        return self._more
+
     def get_data(self):
+        queues = []
+        self._more = False
+        marker = self.request.GET.get(
+            project_tables.QueuesTable._meta.pagination_param, None)
+        page_size = api.base.get_page_size(self.request)
         try:
-            return api.payload.queue_list(self.request)
+            queues = api.payload.queue_list(
+                self.request,
+                limit=page_size + 1,
+                marker=marker,
+            )
         except Exception:
             exceptions.handle(
                 self.request, _('Unable to retrieve queue list.')
             )
+        if len(queues) > page_size:
+            queues = queues[:page_size]
+            self._more = True
+        return queues
+
+
+class ExportView(exports.ExportView):
+    fields = ('uuid', 'name', 'description', 'disabled', 'user_id',
+              'project_id', 'created_at', 'updated_at')
+    filename = 'queues'
+    redirect_url = reverse_lazy('horizon:project:queues:index')
+    error_message = _('Unable to export queues.')
+
+    def list(self):
+        return api.payload.queue_list(self.request)
 
 
 class CreateView(forms.ModalFormView):
@@ -12,6 +12,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import csv
+import functools
+import logging
+
 from django.conf import settings
 from django.forms.util import flatatt
 from django.utils.safestring import mark_safe
@@ -24,6 +29,10 @@ from horizon import messages
 from horizon.utils import validators
 
 from wildcard import api
+from wildcard.api import concurrency
+
+
+LOG = logging.getLogger(__name__)
 
 
 class TextInputWithGenerator(forms.TextInput):
@@ -76,10 +85,9 @@ class BaseSubscriberForm(forms.SelfHandlingForm):
 
     def __init__(self, *args, **kwargs):
         super(BaseSubscriberForm, self).__init__(*args, **kwargs)
-        self.fields['domain_id'].choices = [
-            (s.uuid, s.name)
-            for s in api.ripcord.domain_list(self.request)
-        ]
+        self.fields['domain_id'].choices = api.ripcord.domain_directory(
+            self.request,
+        ).choices()
 
 
 class CreateSubscriberForm(BaseSubscriberForm):
@@ -132,3 +140,192 @@ class UpdateSubscriberForm(BaseSubscriberForm):
             exceptions.handle(request, ignore=True)
             messages.error(request, _('Unable to update the subscriber.'))
         return True
+
+
+IMPORT_COLUMNS = ('username', 'password', 'domain', 'email_address', 'rpid')
+IMPORT_CHUNK_SIZE = 100
+
+
+class SubscriberRowForm(forms.Form):
+    """Validates one row of a subscriber import.
+
+    The fields are those of :class:`BaseSubscriberForm`, except that the
+    domain is given by name and resolved to its uuid.
+    """
+
+    domain = forms.CharField(label=_("Domain"))
+
+    def __init__(self, data, domains):
+        super(SubscriberRowForm, self).__init__(data)
+        for name in ('username', 'password', 'email_address', 'rpid'):
+            self.fields[name] = copy.deepcopy(
+                BaseSubscriberForm.base_fields[name]
+            )
+        self.domains = domains
+
+    def clean_domain(self):
+        name = self.cleaned_data['domain']
+        if name not in self.domains:
+            raise forms.ValidationError(_('Unknown domain "%s".') % name)
+        return self.domains[name]
+
+
+class ImportFailure(object):
+    """A row which could not be imported."""
+
+    def __init__(self, line, username, error):
+        self.line = line
+        self.username = username
+        self.error = error
+
+
+class ImportReport(object):
+    """The outcome of an import.
+
+    Only the rows which failed are kept, the others are counted.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.failures = []
+
+    def add_created(self):
+        self.total += 1
+        self.created += 1
+
+    def add_failure(self, line, username, error):
+        self.total += 1
+        self.failures.append(ImportFailure(line, username, error))
+
+
+class ImportSubscribersForm(forms.SelfHandlingForm):
+
+    csv_file = forms.FileField(
+        label=_("CSV File"),
+        help_text=_("One subscriber per row, with a header row naming the "
+                    "columns: %s.") % ", ".join(IMPORT_COLUMNS),
+    )
+
+    def clean_csv_file(self):
+        upload = self.cleaned_data['csv_file']
+        try:
+            header = next(csv.reader(upload), None) or []
+        except csv.Error as e:
+            raise forms.ValidationError(_("Malformed CSV file: %s.") % e)
+        missing = [column for column in IMPORT_COLUMNS
+                   if column not in header]
+        if missing:
+            raise forms.ValidationError(
+                _("Missing columns: %s.") % ", ".join(missing)
+            )
+        upload.seek(0)
+        return upload
+
+    def _rows(self, upload, report):
+        """Yields ``(line, data)`` for every row, reading lazily.
+
+        Rows which are not UTF-8 are added to ``report`` as failures. A
+        file which cannot be parsed is read up to the broken line, which
+        is reported as the last failure.
+        """
+        reader = csv.DictReader(upload)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # The reader does not count the line it failed on.
+                report.add_failure(
+                    reader.line_num + 1, u'',
+                    _("Malformed CSV, the rest of the file was not "
+                      "imported: %s.") % e
+                )
+                return
+            try:
+                data = dict(
+                    (column, (row.get(column) or '').decode('utf-8').strip())
+                    for column in IMPORT_COLUMNS
+                )
+            except UnicodeDecodeError:
+                username = (row.get('username') or '').decode('utf-8',
+                                                              'replace')
+                report.add_failure(reader.line_num, username.strip(),
+                                   _("The row is not valid UTF-8."))
+                continue
+            yield reader.line_num, data
+
+    def _chunks(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _import_chunk(self, request, chunk, domains, report):
+        pending = []
+        for line, data in chunk:
+            row = SubscriberRowForm(data, domains)
+            if not row.is_valid():
+                error = u"; ".join(
+                    u"%s: %s" % (field, u" ".join(errors))
+                    for field, errors in row.errors.items()
+                )
+                report.add_failure(line, data['username'], error)
+                continue
+            kwargs = dict(row.cleaned_data)
+            kwargs['domain_id'] = kwargs.pop('domain')
+            pending.append((line, kwargs))
+
+        outcomes = concurrency.run(
+            [functools.partial(api.ripcord.subscriber_create, request,
+                               **subscriber)
+             for line, subscriber in pending],
+            backend='sip',
+        )
+        for (line, kwargs), outcome in zip(pending, outcomes):
+            if outcome.failed:
+                LOG.error('Unable to import the subscriber of line %d.',
+                          line, exc_info=outcome.exc_info)
+                report.add_failure(line, kwargs['username'],
+                                   _("Unable to create subscriber."))
+            else:
+                report.add_created()
+
+    @sensitive_variables('data')
+    def handle(self, request, data):
+        """Creates the subscribers of the upload, a chunk at a time.
+
+        Rows are read and validated as they are needed, and the rows of a
+        chunk are created concurrently. Returns an :class:`ImportReport`
+        whose failures are sorted by line.
+        """
+        try:
+            domains = api.ripcord.domain_directory(request).uuids
+        except Exception:
+            exceptions.handle(request, _('Unable to retrieve domain list.'))
+            return False
+
+        report = ImportReport()
+        for chunk in self._chunks(self._rows(data['csv_file'], report)):
+            self._import_chunk(request, chunk, domains, report)
+        report.failures.sort(key=lambda failure: failure.line)
+
+        if report.created:
+            messages.success(
+                request,
+                _('Imported %(created)d of %(total)d subscribers.') % {
+                    'created': report.created,
+                    'total': report.total,
+                }
+            )
+        if report.failures:
+            messages.error(
+                request,
+                _('%d rows could not be imported.') % len(report.failures)
+            )
+        return report
@@ -12,12 +12,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+
 from django.template import defaultfilters
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 
 from horizon import tables
 
+from wildcard import actions
 from wildcard import api
 
 
@@ -28,6 +31,20 @@ class CreateSubscriberLink(tables.LinkAction):
     classes = ("ajax-modal", "btn-create")
 
 
+class ImportSubscribersLink(tables.LinkAction):
+    name = "import"
+    verbose_name = _("Import Subscribers")
+    url = "horizon:project:subscribers:import"
+    classes = ("ajax-modal", "btn-create")
+
+
+class ExportSubscribersLink(tables.LinkAction):
+    name = "export"
+    verbose_name = _("Export Subscribers")
+    url = "horizon:project:subscribers:export"
+    classes = ("btn-download",)
+
+
 class EditSubscriberLink(tables.LinkAction):
     name = "edit"
     verbose_name = _("Edit")
@@ -35,13 +52,14 @@ class EditSubscriberLink(tables.LinkAction):
     classes = ("ajax-modal", "btn-edit")
 
 
-class ToggleEnabled(tables.BatchAction):
+class ToggleEnabled(actions.BatchAction):
     name = "toggle"
     action_present = (_("Enable"), _("Disable"))
     action_past = (_("Enabled"), _("Disabled"))
     data_type_singular = _("Subscriber")
     data_type_plural = _("Subscribers")
     classes = ("btn-toggle",)
+    backend = "sip"
 
     def allowed(self, request, subscriber=None):
         if subscriber:
@@ -49,18 +67,26 @@ class ToggleEnabled(tables.BatchAction):
             self.current_present_action = int(not self.disabled)
         return True
 
-    def action(self, request, obj_id):
+    def get_call(self, request, obj_id):
+        return functools.partial(self.action, request, obj_id,
+                                 disabled=not self.disabled)
+
+    def action(self, request, obj_id, disabled):
         api.ripcord.subscriber_update(
             request,
             obj_id,
-            disabled=not self.disabled
+            disabled=disabled
         )
-        self.current_past_action = int(not self.disabled)
+        return int(disabled)
+
+    def completed(self, request, datum, past_action):
+        self.current_past_action = past_action
 
 
-class DeleteSubscribersAction(tables.DeleteAction):
+class DeleteSubscribersAction(actions.DeleteAction):
     data_type_singular = _("Subscriber")
     data_type_plural = _("Subscribers")
+    backend = "sip"
 
     def delete(self, request, obj_id):
         api.ripcord.subscriber_delete(request, obj_id)
@@ -70,7 +96,7 @@ class DomainColumn(tables.Column):
 
     def get_raw_data(self, datum):
         data = super(DomainColumn, self).get_raw_data(datum)
-        return self.table._domains[data]
+        return self.table._domains.get(data, data)
 
 
 class SubscribersTable(tables.DataTable):
@@ -87,20 +113,27 @@ class SubscribersTable(tables.DataTable):
 
     class Meta:
         name = "subscribers"
+        pagination_param = "subscriber_marker"
         verbose_name = _("Subscribers")
         row_actions = (
             EditSubscriberLink,
             ToggleEnabled,
             DeleteSubscribersAction,
         )
-        table_actions = (CreateSubscriberLink, DeleteSubscribersAction)
+        table_actions = (
+            CreateSubscriberLink,
+            ImportSubscribersLink,
+            ExportSubscribersLink,
+            DeleteSubscribersAction,
+        )
 
     @cached_property
     def _domains(self):
-        return {
-            d.uuid: d.name
-            for d in api.ripcord.domain_list(self.request)
-        }
+        directory = api.ripcord.domain_directory(
+            self.request,
+            expect=set(datum.domain_id for datum in self.data),
+        )
+        return directory.names
 
     def get_object_id(self, datum):
         return datum.uuid
@@ -12,7 +12,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+
 from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.urlresolvers import reverse
 from django import http
 
@@ -21,11 +24,15 @@ from mox import IsA
 from wildcard import api
 from wildcard.dashboards.project.subscribers import forms
 from wildcard.dashboards.project.subscribers import tables
+from wildcard.dashboards.project.subscribers import views
 from wildcard.test import helpers as test
 
 
+PAGE_SIZE = getattr(settings, 'API_RESULT_PAGE_SIZE', 20)
 INDEX_URL = reverse('horizon:project:subscribers:index')
 CREATE_URL = reverse('horizon:project:subscribers:create')
+IMPORT_URL = reverse('horizon:project:subscribers:import')
+EXPORT_URL = reverse('horizon:project:subscribers:export')
 UPDATE_URL = reverse('horizon:project:subscribers:update', args=[1])
 
 
@@ -45,7 +52,9 @@ class SubscriberTests(test.TestCase):
     @test.create_stubs({api.ripcord: ('subscriber_list', 'domain_list')})
     def test_index(self):
         api.ripcord.subscriber_list(
-            IsA(http.HttpRequest)
+            IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.subscribers.list())
         api.ripcord.domain_list(
             IsA(http.HttpRequest)
@@ -58,6 +67,65 @@ class SubscriberTests(test.TestCase):
         subscribers = res.context['subscribers_table'].data
         self.assertItemsEqual(subscribers, self.subscribers.list())
 
+    @test.create_stubs({api.ripcord: ('subscriber_list', 'domain_list')})
+    def test_index_paginated(self):
+        subscribers = self.subscribers.list() * 2
+        api.ripcord.subscriber_list(
+            IsA(http.HttpRequest),
+            limit=2,
+            marker='1',
+        ).AndReturn(subscribers)
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
+        self.mox.ReplayAll()
+
+        with self.settings(API_RESULT_PAGE_SIZE=1):
+            res = self.client.get(INDEX_URL, {'subscriber_marker': '1'})
+
+        table = res.context['subscribers_table']
+        self.assertEqual(len(table.data), 1)
+        self.assertTrue(table.has_more_data())
+
+    @test.create_stubs({api.ripcord: ('subscriber_search', 'domain_list')})
+    def test_index_search(self):
+        api.ripcord.subscriber_search(
+            IsA(http.HttpRequest),
+            'example',
+            limit=PAGE_SIZE + 1,
+        ).AndReturn(self.subscribers.list())
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
+        self.mox.ReplayAll()
+
+        res = self.client.get(INDEX_URL, {'q': ' example '})
+
+        table = res.context['subscribers_table']
+        self.assertItemsEqual(table.data, self.subscribers.list())
+        self.assertFalse(table.has_more_data())
+        self.assertEqual(res.context['query'], 'example')
+        self.assertMessageCount(res, info=0)
+
+    @test.create_stubs({api.ripcord: ('subscriber_search', 'domain_list')})
+    def test_index_search_truncated(self):
+        api.ripcord.subscriber_search(
+            IsA(http.HttpRequest),
+            'example',
+            limit=2,
+        ).AndReturn(self.subscribers.list() * 2)
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
+        self.mox.ReplayAll()
+
+        with self.settings(API_RESULT_PAGE_SIZE=1):
+            res = self.client.get(INDEX_URL, {'q': 'example'})
+
+        table = res.context['subscribers_table']
+        self.assertEqual(len(table.data), 1)
+        self.assertMessageCount(res, info=1)
+
     def _test_create_successful(self, subscriber, create_args, post_data):
         api.ripcord.domain_list(
             IsA(http.HttpRequest)
@@ -118,7 +186,8 @@ class SubscriberTests(test.TestCase):
             post_data,
         )
 
-    @test.create_stubs({api.ripcord: ('subscriber_delete', 'subscriber_list')})
+    @test.create_stubs({api.ripcord: ('subscriber_delete', 'subscriber_list',
+                                      'domain_list')})
     def test_delete(self):
         uuid = '1'
         api.ripcord.subscriber_delete(
@@ -127,7 +196,12 @@ class SubscriberTests(test.TestCase):
         )
         api.ripcord.subscriber_list(
             IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.subscribers.list())
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
         self.mox.ReplayAll()
 
         form_data = {'action': 'subscribers__delete__%s' % uuid}
@@ -135,14 +209,20 @@ class SubscriberTests(test.TestCase):
 
         self.assertRedirectsNoFollow(res, INDEX_URL)
 
-    @test.create_stubs({api.ripcord: ('subscriber_update', 'subscriber_list')})
+    @test.create_stubs({api.ripcord: ('subscriber_update', 'subscriber_list',
+                                      'domain_list')})
     def test_enable_subscriber(self):
         subscriber = self.subscribers.get(uuid='1')
         subscriber.disabled = True
 
         api.ripcord.subscriber_list(
             IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.subscribers.list())
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
         api.ripcord.subscriber_update(
             IsA(http.HttpRequest),
             subscriber.uuid,
@@ -156,14 +236,20 @@ class SubscriberTests(test.TestCase):
 
         self.assertRedirectsNoFollow(res, INDEX_URL)
 
-    @test.create_stubs({api.ripcord: ('subscriber_update', 'subscriber_list')})
+    @test.create_stubs({api.ripcord: ('subscriber_update', 'subscriber_list',
+                                      'domain_list')})
     def test_disable_subscriber(self):
         subscriber = self.subscribers.get(uuid="1")
         subscriber.disabled = False
 
         api.ripcord.subscriber_list(
             IsA(http.HttpRequest),
+            limit=PAGE_SIZE + 1,
+            marker=None,
         ).AndReturn(self.subscribers.list())
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
         api.ripcord.subscriber_update(
             IsA(http.HttpRequest),
             subscriber.uuid,
@@ -177,6 +263,164 @@ class SubscriberTests(test.TestCase):
 
         self.assertRedirectsNoFollow(res, INDEX_URL)
 
+    @test.create_stubs({api.ripcord: ('subscriber_create', 'domain_list')})
+    def test_import(self):
+        upload = SimpleUploadedFile('subscribers.csv', '\r\n'.join([
+            'username,password,domain,email_address,rpid',
+            'alice,password1,test name,alice@example.com,100',
+            'bob,short,test name,,',
+            'carol,password3,nowhere,,',
+            'dave,password4,test name,,',
+        ]))
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
+        api.ripcord.subscriber_create(
+            IsA(http.HttpRequest),
+            username=u'alice',
+            password=u'password1',
+            domain_id='1',
+            email_address=u'alice@example.com',
+            rpid=u'100',
+        ).AndReturn(self.subscribers.first())
+        api.ripcord.subscriber_create(
+            IsA(http.HttpRequest),
+            username=u'dave',
+            password=u'password4',
+            domain_id='1',
+            email_address=u'',
+            rpid=u'',
+        ).AndRaise(self.exceptions.keystone)
+        self.mox.ReplayAll()
+
+        res = self.client.post(IMPORT_URL, {
+            'method': 'ImportSubscribersForm',
+            'csv_file': upload,
+        })
+
+        self.assertNoFormErrors(res)
+        self.assertTemplateUsed(res, 'project/subscribers/import.html')
+        report = res.context['report']
+        self.assertEqual((report.total, report.created), (4, 1))
+        self.assertEqual([f.line for f in report.failures], [3, 4, 5])
+        self.assertEqual([f.username for f in report.failures],
+                         ['bob', 'carol', 'dave'])
+        self.assertEqual(report.failures[2].error,
+                         u'Unable to create subscriber.')
+        self.assertMessageCount(success=1, error=1)
+
+    @test.create_stubs({api.ripcord: ('subscriber_create', 'domain_list')})
+    def test_import_unreadable_rows(self):
+        upload = SimpleUploadedFile('subscribers.csv', '\r\n'.join([
+            'username,password,domain,email_address,rpid',
+            'alice,password1,test name,,',
+            'j\xf6rg,password2,test name,,',
+            'bad\0,password3,test name,,',
+            'dave,password4,test name,,',
+        ]))
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
+        api.ripcord.subscriber_create(
+            IsA(http.HttpRequest),
+            username=u'alice',
+            password=u'password1',
+            domain_id='1',
+            email_address=u'',
+            rpid=u'',
+        ).AndReturn(self.subscribers.first())
+        self.mox.ReplayAll()
+
+        res = self.client.post(IMPORT_URL, {
+            'method': 'ImportSubscribersForm',
+            'csv_file': upload,
+        })
+
+        self.assertNoFormErrors(res)
+        report = res.context['report']
+        self.assertEqual((report.total, report.created), (3, 1))
+        self.assertEqual([f.line for f in report.failures], [3, 4])
+        self.assertEqual(report.failures[0].username, u'j\ufffdrg')
+        self.assertEqual(report.failures[0].error,
+                         u'The row is not valid UTF-8.')
+        self.assertMessageCount(success=1, error=1)
+
+    def test_import_malformed_header(self):
+        upload = SimpleUploadedFile('subscribers.csv',
+                                    'username,pass\0word\r\nalice,secret\r\n')
+
+        res = self.client.post(IMPORT_URL, {
+            'method': 'ImportSubscribersForm',
+            'csv_file': upload,
+        })
+
+        self.assertFormErrors(res, 1)
+
+    def test_import_missing_columns(self):
+        upload = SimpleUploadedFile('subscribers.csv',
+                                    'username,password\r\nalice,secret\r\n')
+
+        res = self.client.post(IMPORT_URL, {
+            'method': 'ImportSubscribersForm',
+            'csv_file': upload,
+        })
+
+        self.assertFormErrors(res, 1)
+
+    @test.create_stubs({api.ripcord: ('subscriber_list', 'domain_list')})
+    def test_export(self):
+        api.ripcord.subscriber_list(IsA(http.HttpRequest)) \
+            .AndReturn(self.subscribers.list())
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
+        self.mox.ReplayAll()
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertEqual(res['Content-Disposition'],
+                         'attachment; filename="subscribers.csv"')
+        lines = ''.join(res.streaming_content).splitlines()
+        self.assertEqual(lines[0], ','.join(views.ExportView.fields))
+        self.assertEqual(len(lines), len(self.subscribers.list()) + 1)
+        self.assertNotIn(self.subscribers.first().password, lines[1])
+
+    @test.create_stubs({api.ripcord: ('subscriber_list', 'domain_list')})
+    def test_export_json(self):
+        api.ripcord.subscriber_list(IsA(http.HttpRequest)) \
+            .AndReturn(self.subscribers.list())
+        api.ripcord.domain_list(
+            IsA(http.HttpRequest)
+        ).AndReturn(self.project_domains.list())
+        self.mox.ReplayAll()
+
+        res = self.client.get(EXPORT_URL, {'format': 'json'})
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        rows = json.loads(''.join(res.streaming_content))
+        self.assertEqual([row['uuid'] for row in rows],
+                         [s.uuid for s in self.subscribers.list()])
+        domains = dict((d.uuid, d.name) for d in self.project_domains.list())
+        for row in rows:
+            self.assertEqual(row['domain'], domains[row['domain_id']])
+
+    @test.create_stubs({api.ripcord: ('subscriber_list',)})
+    def test_export_error(self):
+        api.ripcord.subscriber_list(IsA(http.HttpRequest)) \
+            .AndRaise(self.exceptions.keystone)
+        self.mox.ReplayAll()
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertRedirectsNoFollow(res, INDEX_URL)
+
+    def test_export_unknown_format(self):
+        res = self.client.get(EXPORT_URL, {'format': 'xml'})
+
+        self.assertEqual(res.status_code, 404)
+
     def test_object_display(self):
         subscriber = self.subscribers.get(uuid="1")
         table = tables.SubscribersTable(self.request, [subscriber])
@@ -22,6 +22,8 @@ urlpatterns = patterns(
     '',
     url(r'^$', views.IndexView.as_view(), name='index'),
     url(r'^create/$', views.CreateView.as_view(), name='create'),
+    url(r'^import/$', views.ImportView.as_view(), name='import'),
+    url(r'^export/$', views.ExportView.as_view(), name='export'),
     url(
         r'^(?P<subscriber_id>[^/]+)/update/$',
         views.UpdateView.as_view(),
@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+
 from django.core.urlresolvers import reverse_lazy
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext_lazy as _
@@ -19,10 +21,13 @@ from django.views.decorators.debug import sensitive_post_parameters
 
 from horizon import exceptions
 from horizon import forms
+from horizon import messages
 from horizon import tables
 
 from wildcard import api
+from wildcard.api import concurrency
 
+from wildcard.dashboards.project import exports
 from wildcard.dashboards.project.subscribers \
     import forms as project_forms
 from wildcard.dashboards.project.subscribers \
@@ -31,18 +36,105 @@ from wildcard.dashboards.project.subscribers \
 
 INDEX_URL = reverse_lazy('horizon:project:subscribers:index')
 
+SEARCH_PARAM = 'q'
+
 
 class IndexView(tables.DataTableView):
     table_class = project_tables.SubscribersTable
     template_name = 'project/subscribers/index.html'
 
+    def has_more_data(self, table):
+        return self._more
+
+    def get_query(self):
+        # Searched with a plain GET form, as the filter action of a table
+        # only ever filters the rows on the page from javascript.
+        return self.request.GET.get(SEARCH_PARAM, '').strip()
+
+    def get_context_data(self, **kwargs):
+        context = super(IndexView, self).get_context_data(**kwargs)
+        context['search_param'] = SEARCH_PARAM
+        context['query'] = self.get_query()
+        return context
+
     def get_data(self):
+        query = self.get_query()
+        if query:
+            return self.get_search_data(query)
+
+        subscribers = []
+        self._more = False
+        marker = self.request.GET.get(
+            project_tables.SubscribersTable._meta.pagination_param, None)
+        page_size = api.base.get_page_size(self.request)
         try:
-            return api.ripcord.subscriber_list(self.request)
+            # The domain directory is only loaded alongside the subscribers
+            # to warm its cache, the table looks it up again when rendering
+            # domain names.
+            subscribers = concurrency.gather([
+                functools.partial(api.ripcord.subscriber_list,
+                                  self.request,
+                                  limit=page_size + 1,
+                                  marker=marker),
+                functools.partial(api.ripcord.domain_directory, self.request),
+            ], backend='sip')[0]
         except Exception:
             exceptions.handle(
                 self.request, _('Unable to retrieve subscriber list.')
             )
+        if len(subscribers) > page_size:
+            subscribers = subscribers[:page_size]
+            self._more = True
+        return subscribers
+
+    def get_search_data(self, query):
+        """Returns the first page of subscribers matching ``query``.
+
+        Search results are not paginated, the query would be lost by the
+        link to the next page. When a query matches more than a page of
+        subscribers the user is told to refine it.
+        """
+        self._more = False
+        page_size = api.base.get_page_size(self.request)
+        try:
+            subscribers = api.ripcord.subscriber_search(
+                self.request,
+                query,
+                limit=page_size + 1,
+            )
+        except Exception:
+            exceptions.handle(
+                self.request, _('Unable to search subscribers.')
+            )
+            return []
+        if len(subscribers) > page_size:
+            subscribers = subscribers[:page_size]
+            messages.info(
+                self.request,
+                _('Only the first %d matching subscribers are shown, refine '
+                  'the search to find the others.') % page_size
+            )
+        return subscribers
+
+
+class ExportView(exports.ExportView):
+    fields = ('uuid', 'username', 'email_address', 'domain_id', 'domain',
+              'rpid', 'disabled')
+    filename = 'subscribers'
+    redirect_url = INDEX_URL
+    error_message = _('Unable to export subscribers.')
+
+    def list(self):
+        return api.ripcord.subscriber_list(self.request)
+
+    def prepare(self):
+        self.domains = api.ripcord.domain_directory(self.request).names
+
+    def get_row(self, subscriber):
+        row = super(ExportView, self).get_row(subscriber)
+        row['domain'] = self.domains.get(subscriber.domain_id,
+                                         subscriber.domain_id)
+        return row
 
 
 class CreateView(forms.ModalFormView):
@@ -55,6 +147,24 @@ class CreateView(forms.ModalFormView):
         return super(CreateView, self).dispatch(*args, **kwargs)
 
 
+class ImportView(forms.ModalFormView):
+    form_class = project_forms.ImportSubscribersForm
+    template_name = 'project/subscribers/import.html'
+    success_url = INDEX_URL
+
+    def form_valid(self, form):
+        """Shows the per-row report instead of redirecting."""
+        try:
+            report = form.handle(self.request, form.cleaned_data)
+        except Exception:
+            report = False
+            exceptions.handle(self.request)
+        if report is False:
+            return self.form_invalid(form)
+        context = self.get_context_data(form=form, report=report)
+        return self.render_to_response(context)
+
+
 class UpdateView(forms.ModalFormView):
     form_class = project_forms.UpdateSubscriberForm
     template_name = 'project/subscribers/update.html'
@@ -67,8 +177,16 @@ class UpdateView(forms.ModalFormView):
     def get_object(self):
         if not hasattr(self, "_object"):
             try:
-                self._object = api.ripcord.subscriber_get(
-                    self.request, self.kwargs['subscriber_id'])
+                # The domain directory is only loaded alongside the
+                # subscriber to warm its cache, the form looks it up again
+                # for its choices.
+                self._object = concurrency.gather([
+                    functools.partial(api.ripcord.subscriber_get,
+                                      self.request,
+                                      self.kwargs['subscriber_id']),
+                    functools.partial(api.ripcord.domain_directory,
+                                      self.request),
+                ], backend='sip')[0]
             except Exception:
                 exceptions.handle(
                     self.request,
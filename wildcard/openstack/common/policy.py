@@ -54,12 +54,23 @@ always reject an access.  (Note that if a rule is either the empty
 list ("[]") or the empty string, this is equivalent to the "@" policy
 check.)  Of these, the "!" policy check is probably the most useful,
 as it allows particular rules to be explicitly disabled.
+
+Rules enforced by name are compiled on first use into flat evaluators (see
+:class:`Compiler`): "rule:" references are inlined, "role:" checks become
+set membership tests and the target interpolation of generic checks is
+prepared once.  The compiled rules are dropped whenever the rules change,
+and produce the same results as evaluating the Check tree.
 """
 
 import abc
+import httplib
 import re
+import socket
+import sys
+import threading
+import time
 import urllib
-import urllib2
+import urlparse
 
 from oslo.config import cfg
 import six
@@ -76,6 +87,22 @@ policy_opts = [
     cfg.StrOpt('policy_default_rule',
                default='default',
                help=_('Rule enforced when requested rule is not found')),
+    cfg.IntOpt('policy_recheck_interval',
+               default=0,
+               help=_('Minimum number of seconds between two checks of '
+                      'the policy file for changes')),
+    cfg.FloatOpt('policy_http_timeout',
+                 default=5.0,
+                 help=_('Timeout in seconds of the requests made to remote '
+                        'policy servers by http: checks')),
+    cfg.IntOpt('policy_http_cache_ttl',
+               default=5,
+               help=_('Number of seconds the decisions of remote policy '
+                      'servers are cached for')),
+    cfg.BoolOpt('policy_http_fallback',
+                default=False,
+                help=_('Decision of http: checks when the remote policy '
+                       'server cannot be reached in time')),
 ]
 
 CONF = cfg.CONF
@@ -156,15 +183,31 @@ class Enforcer(object):
                   is called this will be overwritten.
     :param default_rule: Default rule to use, CONF.default_rule will
                          be used if none is specified.
+    :param recheck_interval: Minimum number of seconds between two checks
+                             of the policy file for changes,
+                             CONF.policy_recheck_interval will be used if
+                             none is specified.
+    :param http_client: HttpClient used by http: checks, one configured
+                        from CONF will be created if none is specified.
     """
 
-    def __init__(self, policy_file=None, rules=None, default_rule=None):
+    def __init__(self, policy_file=None, rules=None, default_rule=None,
+                 recheck_interval=None, http_client=None):
         self.rules = Rules(rules, default_rule)
         self.default_rule = default_rule or CONF.policy_default_rule
 
         self.policy_path = None
         self.policy_file = policy_file or CONF.policy_file
 
+        if recheck_interval is None:
+            recheck_interval = CONF.policy_recheck_interval
+        self.recheck_interval = recheck_interval
+        self._next_check = 0
+
+        self._http_client = http_client
+
+        self._compiler = None
+
     def set_rules(self, rules, overwrite=True):
         """Create a new Rules object based on the provided dict of rules.
 
@@ -181,21 +224,30 @@ class Enforcer(object):
             self.rules = Rules(rules, self.default_rule)
         else:
             self.rules.update(rules)
+        self._compiler = None
 
     def clear(self):
         """Clears Enforcer rules, policy's cache and policy's path."""
         self.set_rules({})
         self.default_rule = None
         self.policy_path = None
+        self._next_check = 0
 
     def load_rules(self, force_reload=False):
         """Loads policy_path's rules.
 
-        Policy file is cached and will be reloaded if modified.
+        Policy file is cached and will be reloaded if modified.  Once rules
+        are loaded, the file is not looked at again before recheck_interval
+        seconds have passed.
 
         :param force_reload: Whether to overwrite current rules.
         """
 
+        now = time.time()
+        if not force_reload and self.rules and now < self._next_check:
+            return
+        self._next_check = now + self.recheck_interval
+
         if not self.policy_path:
             self.policy_path = self._get_policy_path()
 
@@ -206,6 +258,37 @@ class Enforcer(object):
             self.set_rules(rules)
             LOG.debug(_("Rules successfully reloaded"))
 
+    def target_keys(self, rule):
+        """Returns the keys of the target a named rule may read.
+
+        Two targets agreeing on these keys always get the same decision
+        for the same credentials.  Returns None when the rule may depend
+        on any part of the target.
+        """
+
+        self.load_rules()
+        return self._get_compiler().target_keys(rule)
+
+    @property
+    def http_client(self):
+        """The HttpClient used by http: checks."""
+
+        if self._http_client is None:
+            self._http_client = HttpClient(
+                timeout=CONF.policy_http_timeout,
+                cache_ttl=CONF.policy_http_cache_ttl,
+                fallback=CONF.policy_http_fallback)
+        return self._http_client
+
+    def _get_compiler(self):
+        """Returns the compiler holding the compiled form of the rules."""
+
+        compiler = self._compiler
+        # The rules may also have been replaced without set_rules()
+        if compiler is None or compiler.rules is not self.rules:
+            compiler = self._compiler = Compiler(self)
+        return compiler
+
     def _get_policy_path(self):
         """Locate the policy json data file.
 
@@ -260,6 +343,21 @@ class Enforcer(object):
         elif not self.rules:
             # No rules to reference means we're going to fail closed
             result = False
+        elif 'roles' in creds:
+            try:
+                # Evaluate the compiled rule
+                compiler = self._get_compiler()
+                evaluate = compiler.rule(rule)
+                roles = frozenset(x.lower() for x in creds['roles'])
+                if compiler.depends_on_roles_only(rule):
+                    result = compiler.decide_by_roles(rule, creds, roles,
+                                                      evaluate)
+                else:
+                    result = evaluate(target, creds, roles)
+            except KeyError:
+                LOG.debug(_("Rule [%s] doesn't exist") % rule)
+                # If the rule doesn't exist, fail closed
+                result = False
         else:
             try:
                 # Evaluate the rule
@@ -463,6 +561,377 @@ class OrCheck(BaseCheck):
         return self
 
 
+def _accept(target, creds, roles):
+    return True
+
+
+def _reject(target, creds, roles):
+    return False
+
+
+class Compiler(object):
+    """Compiles the rules of an Enforcer into flat evaluators.
+
+    An evaluator is a function of ``(target, creds, roles)``, ``roles``
+    being the lowercased roles of ``creds`` as a frozenset.  It returns
+    the same result as the Check tree it was compiled from, including the
+    handling of ``KeyError``: a rule referenced with "rule:" that raises
+    KeyError evaluates to False.
+
+    Check classes without a compiled form are called as they are.
+
+    A Compiler is shared by the threads of the process: rules are compiled
+    and scanned by one thread at a time, so that no thread ever sees a
+    rule whose compilation another thread has not finished.
+    """
+
+    def __init__(self, enforcer):
+        self.enforcer = enforcer
+        self.rules = enforcer.rules
+        # Reentrant, rules referencing other rules are compiled recursively
+        self._lock = threading.RLock()
+        self._compiled = {}
+        self._compiling = set()
+        self._keys = {}
+        self._scanning = set()
+        self._role_decisions = {}
+
+    def rule(self, name):
+        """Returns the evaluator of the named rule.
+
+        Raises KeyError if there is no such rule (nor default rule).
+        """
+
+        try:
+            return self._compiled[name][0]
+        except KeyError:
+            return self._rule(name)[0]
+
+    def _rule(self, name):
+        """Returns ``(evaluator, may_raise)`` for the named rule."""
+
+        try:
+            return self._compiled[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name in self._compiled:
+                # Compiled by another thread while waiting for the lock
+                return self._compiled[name]
+
+            check = self.rules[name]
+            if name in self._compiling:
+                # A rule referencing itself; bind it late so that it
+                # behaves the same way as the Check tree does.
+                compiled = self._compiled
+
+                def evaluate(target, creds, roles):
+                    return compiled[name][0](target, creds, roles)
+
+                return evaluate, True
+
+            self._compiling.add(name)
+            try:
+                self._compiled[name] = self.check(check)
+            finally:
+                self._compiling.discard(name)
+            return self._compiled[name]
+
+    def target_keys(self, name):
+        """Returns the frozenset of target keys read by the named rule.
+
+        None means the rule may read any part of the target.
+        """
+
+        return self._scan(name)[0]
+
+    def depends_on_roles_only(self, name):
+        """Tells whether the named rule only reads the roles of the caller.
+
+        Such a rule ignores the target and only reads the "roles" (through
+        "role:" checks) and "is_admin" credentials.
+        """
+
+        target_keys, cred_keys = self._scan(name)
+        return (target_keys is not None and not target_keys and
+                cred_keys is not None and cred_keys <= _ROLE_CREDENTIALS)
+
+    def _scan(self, name):
+        """Returns the ``(target_keys, cred_keys)`` read by the named rule.
+
+        Either may be None when it cannot be known.
+        """
+
+        try:
+            return self._keys[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name in self._keys:
+                return self._keys[name]
+
+            try:
+                check = self.rules[name]
+            except KeyError:
+                # Missing rules fail closed, whatever the target
+                return frozenset(), frozenset()
+
+            if name in self._scanning:
+                # A rule referencing itself, give up on it
+                return None, None
+
+            self._scanning.add(name)
+            try:
+                keys = self._keys[name] = self._check_keys(check)
+            finally:
+                self._scanning.discard(name)
+            return keys
+
+    def _check_keys(self, check):
+        kind = type(check)
+        if kind in (TrueCheck, FalseCheck):
+            return frozenset(), frozenset()
+        elif kind is RoleCheck:
+            return frozenset(), frozenset(['roles'])
+        elif kind is NotCheck:
+            return self._check_keys(check.rule)
+        elif kind in (AndCheck, OrCheck):
+            target_keys, cred_keys = set(), set()
+            for rule in check.rules:
+                rule_target_keys, rule_cred_keys = self._check_keys(rule)
+                if target_keys is not None:
+                    if rule_target_keys is None:
+                        target_keys = None
+                    else:
+                        target_keys.update(rule_target_keys)
+                if cred_keys is not None:
+                    if rule_cred_keys is None:
+                        cred_keys = None
+                    else:
+                        cred_keys.update(rule_cred_keys)
+            return _frozen(target_keys), _frozen(cred_keys)
+        elif kind is RuleCheck:
+            return self._scan(check.match)
+        elif kind is GenericCheck:
+            # Matching the roles list as text depends on its order and case
+            cred_keys = None if check.kind == 'roles' else frozenset(
+                [check.kind])
+            # Only plain "%(name)s" interpolations are understood
+            if '%' in _interpolation_re.sub('', check.match):
+                return None, cred_keys
+            return (frozenset(_interpolation_re.findall(check.match)),
+                    cred_keys)
+        return None, None
+
+    def decide_by_roles(self, name, creds, roles, evaluate):
+        """Returns the decision of a rule only reading the caller's roles.
+
+        Decisions are shared by every caller with the same roles, until
+        the rules change.  Only the decisions of the evaluator the rule
+        was compiled to are shared.
+        """
+
+        key = (name, roles, creds.get('is_admin'))
+        try:
+            return self._role_decisions[key]
+        except KeyError:
+            pass
+        result = evaluate({}, creds, roles)
+        compiled = self._compiled.get(name)
+        if compiled is None or compiled[0] is not evaluate:
+            return result
+        if len(self._role_decisions) >= MAX_ROLE_DECISIONS:
+            self._role_decisions.clear()
+        self._role_decisions[key] = result
+        return result
+
+    def check(self, check):
+        """Returns ``(evaluator, may_raise)`` for a Check tree.
+
+        ``may_raise`` tells whether the evaluator can raise KeyError.
+        """
+
+        # Subclasses may override __call__, so the exact type is matched.
+        kind = type(check)
+        if kind is TrueCheck:
+            return _accept, False
+        elif kind is FalseCheck:
+            return _reject, False
+        elif kind is NotCheck:
+            return self._not(check)
+        elif kind is AndCheck:
+            return self._and(check)
+        elif kind is OrCheck:
+            return self._or(check)
+        elif kind is RuleCheck:
+            return self._rule_check(check)
+        elif kind is RoleCheck:
+            return self._role_check(check)
+        elif kind is GenericCheck:
+            return self._generic_check(check)
+
+        enforcer = self.enforcer
+
+        def evaluate(target, creds, roles):
+            return check(target, creds, enforcer)
+
+        return evaluate, True
+
+    def _not(self, check):
+        inner, may_raise = self.check(check.rule)
+
+        def evaluate(target, creds, roles):
+            return not inner(target, creds, roles)
+
+        return evaluate, may_raise
+
+    def _flatten(self, check):
+        """Returns the checks of nested operators of the same kind."""
+
+        checks = []
+        for rule in check.rules:
+            if type(rule) is type(check):
+                checks.extend(self._flatten(rule))
+            else:
+                checks.append(rule)
+        return checks
+
+    def _and(self, check):
+        evaluators = []
+        may_raise = False
+        for rule in self._flatten(check):
+            evaluator, raises = self.check(rule)
+            if evaluator is _accept:
+                continue
+            evaluators.append(evaluator)
+            may_raise = may_raise or raises
+            if evaluator is _reject:
+                # Later checks are never reached
+                break
+
+        if not evaluators:
+            return _accept, False
+        elif evaluators == [_reject]:
+            return _reject, False
+
+        def evaluate(target, creds, roles):
+            for evaluator in evaluators:
+                if not evaluator(target, creds, roles):
+                    return False
+            return True
+
+        return evaluate, may_raise
+
+    def _or(self, check):
+        evaluators = []
+        may_raise = False
+        for rule in self._flatten(check):
+            evaluator, raises = self.check(rule)
+            if evaluator is _reject:
+                continue
+            evaluators.append(evaluator)
+            may_raise = may_raise or raises
+            if evaluator is _accept:
+                # Later checks are never reached
+                break
+
+        if not evaluators:
+            return _reject, False
+        elif evaluators == [_accept]:
+            return _accept, False
+
+        def evaluate(target, creds, roles):
+            for evaluator in evaluators:
+                if evaluator(target, creds, roles):
+                    return True
+            return False
+
+        return evaluate, may_raise
+
+    def _rule_check(self, check):
+        try:
+            inner, may_raise = self._rule(check.match)
+        except KeyError:
+            # We don't have any matching rule; fail closed
+            return _reject, False
+
+        if not may_raise:
+            return inner, False
+
+        def evaluate(target, creds, roles):
+            try:
+                return inner(target, creds, roles)
+            except KeyError:
+                return False
+
+        return evaluate, False
+
+    def _role_check(self, check):
+        match = check.match.lower()
+
+        def evaluate(target, creds, roles):
+            return match in roles
+
+        return evaluate, False
+
+    def _generic_check(self, check):
+        kind = check.kind
+        text = six.text_type
+
+        if '%' not in check.match:
+            # Nothing to interpolate, the match is a constant
+            match = check.match
+
+            def evaluate(target, creds, roles):
+                if kind in creds:
+                    return match == text(creds[kind])
+                return False
+
+            return evaluate, False
+
+        key = _single_key_re.match(check.match)
+        if key is not None:
+            # The common "%(name)s" form
+            key = key.group(1)
+
+            def evaluate(target, creds, roles):
+                match = '%s' % (target[key],)
+                if kind in creds:
+                    return match == text(creds[kind])
+                return False
+
+            return evaluate, True
+
+        pattern = check.match
+
+        def evaluate(target, creds, roles):
+            match = pattern % target
+            if kind in creds:
+                return match == text(creds[kind])
+            return False
+
+        return evaluate, True
+
+
+# Matches generic check values made of a single target interpolation
+_single_key_re = re.compile(r'^%\(([^)]*)\)s\Z')
+
+# Matches the target interpolations of generic check values
+_interpolation_re = re.compile(r'%\(([^)]*)\)s')
+
+# Credentials read by rules which only depend on the caller's roles
+_ROLE_CREDENTIALS = frozenset(['roles', 'is_admin'])
+
+# Bound on the number of role set decisions kept by a Compiler
+MAX_ROLE_DECISIONS = 4096
+
+
+def _frozen(keys):
+    return None if keys is None else frozenset(keys)
+
+
 def _parse_check(rule):
     """Parse a single base check rule into an appropriate Check object."""
 
@@ -817,21 +1286,135 @@ class RoleCheck(Check):
         return self.match.lower() in [x.lower() for x in creds['roles']]
 
 
+class HttpClient(object):
+    """Asks remote policy servers for decisions.
+
+    Connections are kept alive and reused, every request is bounded by
+    ``timeout`` and decisions are cached for ``cache_ttl`` seconds.  When a
+    server cannot be reached in time or answers with an error, the
+    decision is ``fallback``, which is not cached.
+
+    :param timeout: socket timeout, in seconds, of the requests.
+    :param cache_ttl: number of seconds decisions are cached for; 0
+                      disables the cache.
+    :param fallback: decision used when a server fails to answer.
+    :param max_idle: number of idle connections kept per server.
+    :param max_cached: number of decisions kept in the cache.
+    """
+
+    def __init__(self, timeout=5.0, cache_ttl=5, fallback=False,
+                 max_idle=4, max_cached=1024):
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.fallback = fallback
+        self.max_idle = max_idle
+        self.max_cached = max_cached
+        self._idle = {}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def decide(self, url, data):
+        """POSTs ``data`` to ``url`` and returns whether it answered True.
+        """
+
+        body = urllib.urlencode(sorted(data.items()))
+        key = (url, body)
+        now = time.time()
+        cached = self._cache.get(key)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
+        try:
+            decision = self._post(url, body) == "True"
+        except (socket.error, httplib.HTTPException) as e:
+            LOG.warn(_("Policy server %(url)s failed to answer: %(error)s") %
+                     {'url': url, 'error': e})
+            return self.fallback
+
+        if self.cache_ttl:
+            with self._lock:
+                if len(self._cache) >= self.max_cached:
+                    self._cache.clear()
+                self._cache[key] = (decision, now + self.cache_ttl)
+        return decision
+
+    def clear(self):
+        """Drops the cached decisions and closes the idle connections."""
+
+        with self._lock:
+            self._cache.clear()
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def _connect(self, server):
+        with self._lock:
+            connections = self._idle.get(server)
+            if connections:
+                return connections.pop(), True
+        scheme, netloc = server
+        if scheme == 'https':
+            return httplib.HTTPSConnection(netloc,
+                                           timeout=self.timeout), False
+        return httplib.HTTPConnection(netloc, timeout=self.timeout), False
+
+    def _release(self, server, connection):
+        with self._lock:
+            connections = self._idle.setdefault(server, [])
+            if len(connections) < self.max_idle:
+                connections.append(connection)
+                return
+        connection.close()
+
+    def _post(self, url, body):
+        parts = urlparse.urlsplit(url)
+        server = (parts.scheme, parts.netloc)
+        path = urlparse.urlunsplit(('', '', parts.path or '/', parts.query,
+                                    ''))
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+        while True:
+            connection, reused = self._connect(server)
+            try:
+                connection.request('POST', path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (socket.error, httplib.HTTPException):
+                connection.close()
+                if reused and not isinstance(sys.exc_info()[1],
+                                             socket.timeout):
+                    # The server may have closed an idle connection,
+                    # retry on a fresh one.
+                    continue
+                raise
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(server, connection)
+
+        if not 200 <= response.status < 300:
+            raise httplib.HTTPException(
+                _("Unexpected status %d") % response.status)
+        return data
+
+
 @register('http')
 class HttpCheck(Check):
     def __call__(self, target, creds, enforcer):
         """Check http: rules by calling to a remote server.
 
         This example implementation simply verifies that the response
-        is exactly 'True'.
+        is exactly 'True'.  Requests go through the HttpClient of the
+        enforcer.
         """
 
         url = ('http:' + self.match) % target
         data = {'target': jsonutils.dumps(target),
                 'credentials': jsonutils.dumps(creds)}
-        post_data = urllib.urlencode(data)
-        f = urllib2.urlopen(url, post_data)
-        return f.read() == "True"
+        return enforcer.http_client.decide(url, data)
 
 
 @register(None)
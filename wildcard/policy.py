@@ -34,6 +34,15 @@ CONF = cfg.CONF
 
 _ENFORCER = None
 _BASE_PATH = getattr(settings, 'POLICY_FILES_PATH', '')
+# Policy files are checked for changes at most once per interval
+_RECHECK_INTERVAL = getattr(settings, 'POLICY_FILES_RECHECK_INTERVAL', 10)
+# Options of the client asking remote policy servers in http: checks
+_HTTP_CHECK = getattr(settings, 'POLICY_HTTP_CHECK', {})
+
+# Name of the request attribute holding the decisions made for the request
+DECISIONS_ATTR = '_policy_decisions'
+
+_MISSING = object()
 
 
 def _get_enforcer():
@@ -41,8 +50,11 @@ def _get_enforcer():
     if not _ENFORCER:
         _ENFORCER = {}
         policy_files = getattr(settings, 'POLICY_FILES', {})
+        http_client = policy.HttpClient(**_HTTP_CHECK)
         for service in policy_files.keys():
-            enforcer = policy.Enforcer()
+            enforcer = policy.Enforcer(
+                recheck_interval=_RECHECK_INTERVAL,
+                http_client=http_client)
             enforcer.policy_path = os.path.join(_BASE_PATH,
                                                 policy_files[service])
             if os.path.isfile(enforcer.policy_path):
@@ -87,24 +99,133 @@ def check(actions, request, target={}):
                       representing the location of the object e.g.
                       {'tenant_id': object.tenant_id}
     :returns: boolean if the user has permission or not for the actions.
-    """
-    user = auth_utils.get_user(request)
-    credentials = _user_to_credentials(request, user)
 
-    enforcer = _get_enforcer()
+    Decisions are cached on the request, keyed by the action and by the
+    values of the target keys its rule reads, so that rendering a table
+    evaluates every distinct decision once.
+    """
+    decisions = _get_decisions(request)
+    context = {}
 
     for action in actions:
         scope, action = action[0], action[1]
-        if scope in enforcer:
-            # if any check fails return failure
-            if not enforcer[scope].enforce(action, target, credentials):
-                return False
-        # if no policy for scope, allow action, underlying API will
-        # ultimately block the action if not permitted, treat as though
-        # allowed
+        # if any check fails return failure
+        if not _decide(request, decisions, context, scope, action, target):
+            return False
+    return True
+
+
+def check_many(actions, request, targets):
+    """Check several lists of actions against several targets at once.
+
+    :param actions: list of action lists, each as taken by :func:`check`
+                    (typically the ``policy_rules`` of table actions)
+    :param request: django http request object
+    :param targets: list of target dictionaries (typically one per row)
+    :returns: a decision matrix, with one list of booleans (one per target)
+              for every action list.
+
+    The credentials are prepared once, and every decision which does not
+    depend on the target values is made once for all the targets.
+    """
+    decisions = _get_decisions(request)
+    context = {}
+
+    matrix = []
+    for rules in actions:
+        row = []
+        for target in targets:
+            allowed = True
+            for action in rules:
+                scope, action = action[0], action[1]
+                if not _decide(request, decisions, context,
+                               scope, action, target):
+                    allowed = False
+                    break
+            row.append(allowed)
+        matrix.append(row)
+    return matrix
+
+
+def _decide(request, decisions, context, scope, action, target):
+    """Returns the decision for one action on one target.
+
+    ``context`` is a dictionary caching the credentials and enforcers
+    between the decisions of a single check.
+    """
+    key = _decision_key(decisions, scope, action, target)
+    allowed = decisions.get(key, _MISSING) if key else _MISSING
+    if allowed is not _MISSING:
+        return allowed
+
+    if not context:
+        user = auth_utils.get_user(request)
+        context['credentials'] = _user_to_credentials(request, user)
+        context['enforcer'] = _get_enforcer()
+    enforcer = context['enforcer']
+    allowed = _enforce(enforcer, scope, action, target,
+                       context['credentials'])
+    if key is None:
+        _learn_target_keys(decisions, enforcer, scope, action)
+        key = _decision_key(decisions, scope, action, target)
+    if key:
+        decisions[key] = allowed
+    return allowed
+
+
+def _enforce(enforcer, scope, action, target, credentials):
+    if scope in enforcer:
+        return bool(enforcer[scope].enforce(action, target, credentials))
+    # if no policy for scope, allow action, underlying API will
+    # ultimately block the action if not permitted, treat as though
+    # allowed
     return True
 
 
+def _get_decisions(request):
+    """Returns the decisions cached on ``request``.
+
+    The credentials are the same for every check made during a request, so
+    a decision only depends on the action and on the part of the target its
+    rule reads.
+    """
+    if request is None:
+        return {}
+    decisions = getattr(request, DECISIONS_ATTR, None)
+    if decisions is None:
+        decisions = {}
+        setattr(request, DECISIONS_ATTR, decisions)
+    return decisions
+
+
+def _learn_target_keys(decisions, enforcer, scope, action):
+    if scope in enforcer:
+        keys = enforcer[scope].target_keys(action)
+    else:
+        keys = frozenset()
+    decisions[('keys', scope, action)] = keys
+
+
+def _decision_key(decisions, scope, action, target):
+    """Returns the cache key of a decision.
+
+    Returns None when the target keys read by the rule are not known yet,
+    and False when the decision cannot be cached.
+    """
+    keys = decisions.get(('keys', scope, action), _MISSING)
+    if keys is _MISSING:
+        return None
+    if keys is None:
+        return False
+    values = tuple((name, target.get(name, _MISSING))
+                   for name in sorted(keys))
+    try:
+        hash(values)
+    except TypeError:
+        return False
+    return ('decision', scope, action, values)
+
+
 def _user_to_credentials(request, user):
     if not hasattr(user, "_credentials"):
         roles = [role['name'] for role in user.roles]
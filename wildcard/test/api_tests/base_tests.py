@@ -0,0 +1,111 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from wildcard.api import base
+from wildcard.test import helpers as test
+
+
+CALLS = []
+
+
+class Resource(object):
+    def __init__(self, id):
+        self.id = id
+
+
+@base.memoized
+def thing_list(request, project=None, users=None):
+    CALLS.append(('thing_list', project, users))
+    return ['a', 'b']
+
+
+@base.memoized
+def thing_get(request, thing):
+    CALLS.append(('thing_get', thing))
+    if thing == 'missing':
+        raise KeyError(thing)
+    return thing
+
+
+@base.invalidates('thing_list')
+def thing_create(request, name):
+    CALLS.append(('thing_create', name))
+    if name == 'bad':
+        raise ValueError(name)
+
+
+class MemoizedTests(test.TestCase):
+
+    def setUp(self):
+        super(MemoizedTests, self).setUp()
+        del CALLS[:]
+
+    def test_repeated_reads_share_a_call(self):
+        self.assertEqual(thing_list(self.request, project='1'), ['a', 'b'])
+        self.assertEqual(thing_list(self.request, '1'), ['a', 'b'])
+        self.assertEqual(len(CALLS), 1)
+
+        thing_list(self.request, project='2')
+        self.assertEqual(len(CALLS), 2)
+
+    def test_arguments_are_normalized(self):
+        thing_get(self.request, Resource('1'))
+        thing_get(self.request, '1')
+        thing_list(self.request, users=set(['2', '1']))
+        thing_list(self.request, users=set(['1', '2']))
+        self.assertEqual(len(CALLS), 2)
+
+    def test_results_are_copied(self):
+        thing_list(self.request).append('c')
+        self.assertEqual(thing_list(self.request), ['a', 'b'])
+
+    def test_memo_is_per_request(self):
+        thing_list(self.request)
+        thing_list(self.factory.get('/'))
+        thing_list(None)
+        thing_list(None)
+        self.assertEqual(len(CALLS), 4)
+
+    def test_exceptions_are_not_cached(self):
+        self.assertRaises(KeyError, thing_get, self.request, 'missing')
+        self.assertRaises(KeyError, thing_get, self.request, 'missing')
+        self.assertEqual(len(CALLS), 2)
+
+    def test_mutation_invalidates(self):
+        thing_list(self.request)
+        thing_get(self.request, '1')
+        thing_create(self.request, 'new')
+        thing_list(self.request)
+        thing_get(self.request, '1')
+        self.assertEqual([call[0] for call in CALLS],
+                         ['thing_list', 'thing_get', 'thing_create',
+                          'thing_list'])
+
+    def test_failed_mutation_invalidates(self):
+        thing_list(self.request)
+        self.assertRaises(ValueError, thing_create, self.request, 'bad')
+        thing_list(self.request)
+        self.assertEqual(len(CALLS), 3)
+
+
+class ListingTests(test.TestCase):
+
+    def test_page(self):
+        listing = base.Listing([Resource(id) for id in ('3', '1', '4', '2')])
+        self.assertEqual(listing.ids, ['1', '2', '3', '4'])
+        self.assertEqual([r.id for r in listing.page(limit=2)], ['1', '2'])
+        self.assertEqual([r.id for r in listing.page('2', 1)], ['3'])
+        # The marker of a deleted item still finds its place.
+        self.assertEqual([r.id for r in listing.page('25')], ['3', '4'])
+        self.assertEqual(listing.page('4', 2), [])
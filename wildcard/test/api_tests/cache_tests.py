@@ -0,0 +1,78 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import time
+
+from wildcard.api import cache
+from wildcard.test import helpers as test
+
+
+class FakeToken(object):
+    def __init__(self, id, expires=None):
+        self.id = id
+        self.expires = expires
+
+
+class LRUCacheTests(test.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        lru = cache.LRUCache(max_size=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_expired_entries_are_misses(self):
+        lru = cache.LRUCache()
+        lru.set('a', 1, expires=time.time() - 1)
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual(len(lru), 0)
+
+    def test_clear_all(self):
+        lru = cache.LRUCache()
+        lru.set('a', 1)
+        cache.clear_all()
+        self.assertIsNone(lru.get('a'))
+
+
+class ClientPoolTests(test.TestCase):
+
+    def test_client_reused_for_same_token(self):
+        pool = cache.ClientPool(max_size=10)
+        token = FakeToken('token')
+        first = pool.get_client('http://sip', token, object)
+        second = pool.get_client('http://sip', token, object)
+        self.assertIs(first, second)
+        other = pool.get_client('http://sip', FakeToken('other'), object)
+        self.assertIsNot(first, other)
+
+    def test_client_expires_with_token(self):
+        pool = cache.ClientPool(max_size=10)
+        expired = datetime.datetime.utcnow() - datetime.timedelta(seconds=5)
+        token = FakeToken('token', expires=expired)
+        first = pool.get_client('http://sip', token, object)
+        second = pool.get_client('http://sip', token, object)
+        self.assertIsNot(first, second)
+
+    def test_evict_token(self):
+        pool = cache.ClientPool(max_size=10)
+        token = FakeToken('token')
+        first = pool.get_client('http://sip', token, object)
+        cache.evict_token('token')
+        second = pool.get_client('http://sip', token, object)
+        self.assertIsNot(first, second)
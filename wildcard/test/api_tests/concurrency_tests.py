@@ -0,0 +1,61 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from wildcard.api import concurrency
+from wildcard.test import helpers as test
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+class ConcurrencyTests(test.TestCase):
+
+    def test_results_are_in_call_order(self):
+        calls = [lambda i=i: i * 2 for i in range(10)]
+        results = concurrency.run(calls, workers=4)
+        self.assertEqual([r.get() for r in results], range(0, 20, 2))
+
+    def test_calls_run_on_worker_threads(self):
+        threads = set()
+
+        def call():
+            threads.add(threading.current_thread().name)
+
+        concurrency.run([call] * 4, workers=2)
+        self.assertNotIn(threading.current_thread().name, threads)
+
+    def test_failures_are_reported_per_call(self):
+        results = concurrency.run([lambda: 1, lambda: fail('boom')],
+                                  workers=2)
+        self.assertFalse(results[0].failed)
+        self.assertTrue(results[1].failed)
+        self.assertRaises(ValueError, results[1].get)
+
+    def test_gather_returns_values(self):
+        self.assertEqual(concurrency.gather([lambda: 'a', lambda: 'b'],
+                                            workers=2),
+                         ['a', 'b'])
+
+    def test_gather_raises_first_failure(self):
+        done = []
+        calls = [lambda: fail('first'),
+                 lambda: fail('second'),
+                 lambda: done.append(True)]
+        with self.assertRaises(ValueError) as cm:
+            concurrency.gather(calls, workers=3)
+        self.assertEqual(str(cm.exception), 'first')
+        self.assertEqual(done, [True])
@@ -0,0 +1,369 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import datetime
+
+from django.conf import settings
+from django import http
+from keystoneclient import base as keystone_base
+from mox import IsA
+
+from wildcard import api
+from wildcard.test import helpers as test
+
+
+class RoleAssignmentsTests(test.TestCase):
+
+    def test_index_by_principal(self):
+        assignments = api.keystone.RoleAssignments()
+        assignments.add('1', user='u1')
+        assignments.add('2', user='u1')
+        assignments.add('1', group='g1')
+
+        self.assertEqual(assignments.roles_for_user('u1'), set(['1', '2']))
+        self.assertEqual(assignments.roles_for_group('g1'), set(['1']))
+        self.assertEqual(assignments.roles_for_user('g1'), set())
+        self.assertEqual(assignments.roles_for_group('missing'), set())
+
+
+class RoleAssignmentsIndexTests(test.APITestCase):
+
+    def _assignment(self, role, **principal):
+        info = {'role': {'id': role}, 'scope': {'project': {'id': '1'}}}
+        for kind, principal_id in principal.items():
+            info[kind] = {'id': principal_id}
+        return keystone_base.Resource(None, info, loaded=True)
+
+    def test_v3_index_from_one_listing(self):
+        self.mox.stubs.Set(api.keystone.VERSIONS, '_active', 3)
+        keystoneclient = self.stub_keystoneclient()
+        keystoneclient.role_assignments = self.mox.CreateMockAnything()
+        keystoneclient.role_assignments.list(project='1', domain=None) \
+            .AndReturn([self._assignment('r1', user='u1'),
+                        self._assignment('r2', user='u1'),
+                        self._assignment('r1', group='g1')])
+        self.mox.ReplayAll()
+
+        index = api.keystone.role_assignments_index(self.request,
+                                                    project='1')
+        self.assertEqual(index.roles_for_user('u1'), set(['r1', 'r2']))
+        self.assertEqual(index.roles_for_group('g1'), set(['r1']))
+        self.assertEqual(index.roles_for_user('g1'), set())
+
+
+class ServiceUser(object):
+    services_region = 'RegionOne'
+
+    def __init__(self, token, service_catalog):
+        self.token = token
+        self.service_catalog = service_catalog
+
+
+class KeystoneClientPoolTests(test.APITestCase):
+
+    def setUp(self):
+        super(KeystoneClientPoolTests, self).setUp()
+        created = self.created = []
+
+        class FakeClient(object):
+            def __init__(self, **kwargs):
+                self.auth_token = kwargs['token']
+                created.append(kwargs)
+
+        client_module = api.keystone.VERSIONS.get_active_version()['client']
+        self.mox.stubs.Set(client_module, 'Client', FakeClient)
+
+    def _request(self, remote_addr='127.0.0.1'):
+        request = self.factory.get('/', REMOTE_ADDR=remote_addr)
+        request.user = self.request.user
+        request.session = self.request.session
+        return request
+
+    def test_client_shared_across_requests(self):
+        keystoneclient = self._original_keystoneclient
+        first = keystoneclient(self._request())
+        second = keystoneclient(self._request())
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(self.created[0]['token'], self.token.id)
+
+    def test_client_forwards_the_address_of_the_caller(self):
+        keystoneclient = self._original_keystoneclient
+        first = keystoneclient(self._request('10.0.0.1'))
+        second = keystoneclient(self._request('10.0.0.2'))
+
+        self.assertIsNot(first, second)
+        self.assertEqual([kwargs['original_ip'] for kwargs in self.created],
+                         ['10.0.0.1', '10.0.0.2'])
+        self.assertIs(keystoneclient(self._request('10.0.0.1')), first)
+
+    def test_client_dropped_with_token(self):
+        keystoneclient = self._original_keystoneclient
+        first = keystoneclient(self._request())
+        api.cache.evict_token(self.token.id)
+        second = keystoneclient(self._request())
+
+        self.assertIsNot(first, second)
+        self.assertEqual(len(self.created), 2)
+
+    def _expect_service_login(self, token):
+        api.keystone.authenticate(username='admin',
+                                  password='secret',
+                                  auth_url=settings.OPENSTACK_KEYSTONE_URL) \
+            .AndReturn(ServiceUser(token, self.service_catalog))
+
+    def test_service_client_authenticates_once(self):
+        self.mox.StubOutWithMock(api.keystone, 'authenticate')
+        self._expect_service_login(self.token)
+        self.mox.ReplayAll()
+
+        keystoneclient = self._original_keystoneclient
+        first = keystoneclient(None)
+        second = keystoneclient(None)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.created[0]['endpoint'],
+                         'http://admin.keystone.example.com:35357/v2.0')
+
+    def test_service_client_refreshed_before_expiry(self):
+        expiring = copy.copy(self.token)
+        expiring.expires = (datetime.datetime.utcnow() +
+                            datetime.timedelta(seconds=10))
+        self.mox.StubOutWithMock(api.keystone, 'authenticate')
+        self._expect_service_login(expiring)
+        self._expect_service_login(self.token)
+        self.mox.ReplayAll()
+
+        keystoneclient = self._original_keystoneclient
+        first = keystoneclient(None)
+        second = keystoneclient(None)
+
+        self.assertIsNot(first, second)
+        self.assertIs(keystoneclient(None), second)
+
+    def test_endpoint_url_is_cached(self):
+        self.mox.StubOutWithMock(api.base, 'url_for')
+        api.base.url_for(IsA(http.HttpRequest),
+                         service_type='identity',
+                         endpoint_type='adminURL') \
+            .AndReturn('http://keystone:35357/v2.0')
+        self.mox.ReplayAll()
+
+        for request in (self.request, self._request()):
+            url = api.keystone._get_endpoint_url(request, 'adminURL')
+            self.assertEqual(url, 'http://keystone:35357/v%s'
+                             % api.keystone.VERSIONS.active)
+
+
+class DirectoryUser(object):
+    def __init__(self, id, name, email):
+        self.id = id
+        self.name = name
+        self.email = email
+
+
+class UserDirectoryTests(test.APITestCase):
+
+    def test_find_by_email_or_name(self):
+        directory = api.keystone.UserDirectory(self.users.list())
+        user = self.users.get(id='2')
+
+        self.assertEqual(directory.find(email='TWO@example.com'), user)
+        self.assertEqual(directory.find(name='user_two'), user)
+        self.assertEqual(directory.find(email=user.email, name=user.name),
+                         user)
+        self.assertIsNone(directory.find(email=user.email, name='test_user'))
+        self.assertIsNone(directory.find(email='missing@example.com'))
+
+    def test_add_replaces_user(self):
+        directory = api.keystone.UserDirectory(self.users.list())
+        user = DirectoryUser('2', 'user_two', 'new@example.com')
+        directory.add(user)
+
+        self.assertEqual(directory.find(email='new@example.com'), user)
+        self.assertIsNone(directory.find(email='two@example.com'))
+        self.assertEqual(len(directory), len(self.users.list()))
+
+    def test_search(self):
+        directory = api.keystone.UserDirectory(self.users.list())
+        directory.add(DirectoryUser('2', 'renamed', 'new@example.com'))
+        directory.discard('3')
+
+        self.assertEqual([u.id for u in directory.search('USER')],
+                         ['1', '4'])
+        self.assertEqual([u.id for u in directory.search('new@')], ['2'])
+        self.assertEqual([u.id for u in directory.search(
+            'example.com', limit=1, predicate=lambda u: u.id != '1')],
+            ['2'])
+
+    def test_find_not_unique(self):
+        users = self.users.list()
+        twin = DirectoryUser('twin', 'twin', users[1].email)
+        directory = api.keystone.UserDirectory(users + [twin])
+
+        self.assertRaises(api.keystone.keystone_exceptions.NoUniqueMatch,
+                          directory.find, email=twin.email)
+        self.assertEqual(directory.find(email=users[0].email), users[0])
+
+    def test_user_find_lists_users_once(self):
+        user = self.users.get(id='2')
+        keystoneclient = self.stub_keystoneclient()
+        keystoneclient.users = self.mox.CreateMockAnything()
+        keystoneclient.users.list().AndReturn(self.users.list())
+        keystoneclient.users.delete(user.id).AndReturn(None)
+        self.mox.ReplayAll()
+
+        self.assertEqual(api.keystone.user_find(None, email=user.email), user)
+        self.assertEqual(api.keystone.user_find(None, name=user.name), user)
+        api.keystone.user_delete(self.request, user.id)
+        self.assertIsNone(api.keystone.user_find(None, email=user.email))
+
+    def test_directory_refreshed(self):
+        user = self.users.get(id='2')
+        keystoneclient = self.stub_keystoneclient()
+        keystoneclient.users = self.mox.CreateMockAnything()
+        keystoneclient.users.list().AndReturn(self.users.list())
+        keystoneclient.users.list().AndReturn([])
+        self.mox.ReplayAll()
+
+        directory = api.keystone.user_directory()
+        self.assertEqual(directory.find(email=user.email), user)
+        directory.loaded -= api.keystone.USER_DIRECTORY_REFRESH
+        self.assertIs(api.keystone.user_directory(), directory)
+        self.assertIsNone(directory.find(email=user.email))
+
+
+class IdentityFilterTests(test.APITestCase):
+
+    def test_group_list_filtered_by_server(self):
+        groups = [group for group in self.groups.list()
+                  if group.domain_id == '1']
+        keystoneclient = self.stub_keystoneclient()
+        keystoneclient.groups = self.mox.CreateMockAnything()
+        keystoneclient.groups.list(user=None, domain_id='1') \
+            .AndReturn(groups)
+        self.mox.ReplayAll()
+
+        self.assertEqual(api.keystone.group_list(self.request, domain='1'),
+                         groups)
+
+    def test_group_list_filtered_when_server_ignores_filters(self):
+        group = self.groups.get(id='4')
+        keystoneclient = self.stub_keystoneclient()
+        keystoneclient.groups = self.mox.CreateMockAnything()
+        keystoneclient.groups.list(user=None, domain_id='2',
+                                   name=group.name) \
+            .AndReturn(self.groups.list())
+        self.mox.ReplayAll()
+
+        self.assertEqual(api.keystone.group_list(self.request, domain='2',
+                                                 name=group.name),
+                         [group])
+
+    def test_user_list_filtered_by_name(self):
+        user = self.users.get(id='2')
+        keystoneclient = self.stub_keystoneclient()
+        keystoneclient.users = self.mox.CreateMockAnything()
+        if api.keystone.VERSIONS.active < 3:
+            keystoneclient.users.list(tenant_id=None) \
+                .AndReturn(self.users.list())
+        else:
+            keystoneclient.users.list(project=None, domain=None, group=None,
+                                      name=user.name) \
+                .AndReturn([user])
+        self.mox.ReplayAll()
+
+        self.assertEqual(api.keystone.user_list(self.request,
+                                                name=user.name),
+                         [user])
+
+    @test.create_stubs({api.keystone: ('user_directory',)})
+    def test_user_list_by_email_uses_the_directory(self):
+        user = self.users.get(id='2')
+        directory = api.keystone.UserDirectory(self.users.list())
+        api.keystone.user_directory().AndReturn(directory)
+        self.mox.ReplayAll()
+
+        # No listing is requested from Keystone.
+        self.assertEqual(api.keystone.user_list(self.request,
+                                                domain=user.domain_id,
+                                                email='TWO@example.com'),
+                         [user])
+
+    def test_user_list_of_a_group_filtered_by_email(self):
+        user = self.users.get(id='2')
+        keystoneclient = self.stub_keystoneclient()
+        keystoneclient.users = self.mox.CreateMockAnything()
+        if api.keystone.VERSIONS.active < 3:
+            keystoneclient.users.list(tenant_id=None) \
+                .AndReturn(self.users.list())
+        else:
+            # Keystone ignores an email filter, none is sent.
+            keystoneclient.users.list(project=None, domain=None, group='1') \
+                .AndReturn(self.users.list())
+        self.mox.ReplayAll()
+
+        self.assertEqual(api.keystone.user_list(self.request, group='1',
+                                                email=user.email),
+                         [user])
+
+
+class RoleCatalogTests(test.APITestCase):
+
+    def test_roles_are_cached_until_they_change(self):
+        roles = self.roles.list()
+        keystoneclient = self.stub_keystoneclient()
+        keystoneclient.roles = self.mox.CreateMockAnything()
+        keystoneclient.roles.list().AndReturn(roles)
+        keystoneclient.roles.create('new_role').AndReturn(roles[0])
+        keystoneclient.roles.list().AndReturn(roles)
+        self.mox.ReplayAll()
+
+        self.assertEqual(api.keystone.role_list(self.request), roles)
+        # Served from the catalog, even for another request.
+        request = self.factory.get('/')
+        request.user = self.request.user
+        self.assertEqual(api.keystone.get_default_role(request),
+                         self.roles.member)
+        api.keystone.role_create(self.request, 'new_role')
+        self.assertEqual(api.keystone.role_list(self.request), roles)
+
+    def test_find_by_id_or_name(self):
+        roles = self.roles.list()
+        catalog = api.keystone.RoleCatalog(roles)
+        self.assertEqual(catalog.find(roles[0].id), roles[0])
+        self.assertEqual(catalog.find(roles[1].name), roles[1])
+        self.assertIsNone(catalog.find('missing'))
+
+
+class ListingTests(test.APITestCase):
+
+    def test_tenant_list_pages_over_one_listing(self):
+        tenants = self.tenants.list()
+        self.request.session['horizon_pagesize'] = 1
+        keystoneclient = self.stub_keystoneclient()
+        keystoneclient.projects = self.mox.CreateMockAnything()
+        keystoneclient.projects.list(domain=None, user=None) \
+            .AndReturn(tenants)
+        self.mox.ReplayAll()
+
+        page, more = api.keystone.tenant_list(self.request, paginate=True)
+        self.assertEqual(page, [tenants[0]])
+        self.assertTrue(more)
+        page, more = api.keystone.tenant_list(self.request, paginate=True,
+                                              marker=tenants[-2].id)
+        self.assertEqual(page, [tenants[-1]])
+        self.assertFalse(more)
@@ -0,0 +1,48 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from django import http
+
+from mox import IsA
+
+from payloadclient.v1 import queue
+
+from wildcard import api
+from wildcard.test import helpers as test
+
+
+class QueueListTests(test.TestCase):
+
+    @test.create_stubs({api.payload: ('client',)})
+    def test_queues_are_paged_locally(self):
+        queues = [queue.Queue(queue.QueueManager(None), {'uuid': uuid})
+                  for uuid in ('b', 'a', 'c')]
+        client = self.mox.CreateMockAnything()
+        client.queues = self.mox.CreateMockAnything()
+        api.payload.client(IsA(http.HttpRequest)) \
+            .MultipleTimes().AndReturn(client)
+        # The client lists everything and takes no paging arguments, the
+        # pages are served from a single listing until a queue changes.
+        client.queues.list().AndReturn(queues)
+        client.queues.delete('c').AndReturn(None)
+        client.queues.list().AndReturn(queues[:2])
+        self.mox.ReplayAll()
+
+        page = api.payload.queue_list(self.request, limit=1, marker='a')
+        self.assertEqual([q.uuid for q in page], ['b'])
+        page = api.payload.queue_list(self.request, limit=5, marker='b')
+        self.assertEqual([q.uuid for q in page], ['c'])
+        api.payload.queue_delete(self.request, 'c')
+        page = api.payload.queue_list(self.request, limit=5, marker='b')
+        self.assertEqual(page, [])
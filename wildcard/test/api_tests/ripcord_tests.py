@@ -0,0 +1,186 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+from django import http
+
+from mox import IsA
+
+from ripcordclient.v1 import domain
+from ripcordclient.v1 import subscriber
+
+from wildcard import api
+from wildcard.test import helpers as test
+
+
+class DomainDirectoryTests(test.TestCase):
+
+    def _domain(self, uuid, name):
+        return domain.Domain(domain.DomainManager(None),
+                             {'uuid': uuid, 'name': name})
+
+    @test.create_stubs({api.ripcord: ('domain_list',)})
+    def test_directory_is_cached(self):
+        api.ripcord.domain_list(IsA(http.HttpRequest)) \
+            .AndReturn(self.project_domains.list())
+        self.mox.ReplayAll()
+
+        directory = api.ripcord.domain_directory(self.request)
+        self.assertEqual(directory.names, {'1': 'test name'})
+        self.assertEqual(directory.uuids, {'test name': '1'})
+        self.assertEqual(directory.choices(), [('1', 'test name')])
+        self.assertIs(api.ripcord.domain_directory(self.request), directory)
+
+    @test.create_stubs({api.ripcord: ('domain_list',)})
+    def test_unknown_uuid_reloads(self):
+        other = self._domain('2', 'other name')
+        api.ripcord.domain_list(IsA(http.HttpRequest)) \
+            .AndReturn(self.project_domains.list())
+        api.ripcord.domain_list(IsA(http.HttpRequest)) \
+            .AndReturn(self.project_domains.list() + [other])
+        self.mox.ReplayAll()
+
+        api.ripcord.domain_directory(self.request, expect=['1'])
+        directory = api.ripcord.domain_directory(self.request,
+                                                 expect=['1', '2'])
+        self.assertEqual(directory.names['2'], 'other name')
+
+    @test.create_stubs({api.ripcord: ('client', 'domain_list')})
+    def test_writes_go_through(self):
+        created = self._domain('2', 'created')
+        renamed = self._domain('1', 'renamed')
+        client = self.mox.CreateMockAnything()
+        client.domains = self.mox.CreateMockAnything()
+        api.ripcord.domain_list(IsA(http.HttpRequest)) \
+            .AndReturn(self.project_domains.list())
+        api.ripcord.client(IsA(http.HttpRequest)) \
+            .MultipleTimes().AndReturn(client)
+        client.domains.create(name='created').AndReturn(created)
+        client.domains.update('1', name='renamed').AndReturn(renamed)
+        client.domains.delete('2').AndReturn(None)
+        self.mox.ReplayAll()
+
+        directory = api.ripcord.domain_directory(self.request)
+        api.ripcord.domain_create(self.request, name='created')
+        self.assertEqual(directory.names, {'1': 'test name', '2': 'created'})
+        api.ripcord.domain_update(self.request, '1', name='renamed')
+        self.assertEqual(directory.uuids, {'renamed': '1', 'created': '2'})
+        api.ripcord.domain_delete(self.request, '2')
+        self.assertEqual(directory.names, {'1': 'renamed'})
+
+
+class SubscriberSearchTests(test.TestCase):
+
+    @test.create_stubs({api.ripcord: ('client', 'subscriber_list')})
+    def test_search_index_is_kept_up_to_date(self):
+        subscriber = self.subscribers.first()
+        client = self.mox.CreateMockAnything()
+        client.subscribers = self.mox.CreateMockAnything()
+        api.ripcord.subscriber_list(IsA(http.HttpRequest)) \
+            .AndReturn(self.subscribers.list())
+        api.ripcord.client(IsA(http.HttpRequest)) \
+            .MultipleTimes().AndReturn(client)
+        client.subscribers.delete(subscriber.uuid).AndReturn(None)
+        client.subscribers.create(username='new').AndReturn(subscriber)
+        self.mox.ReplayAll()
+
+        self.assertEqual(
+            api.ripcord.subscriber_search(self.request, 'EXAMPLE.com'),
+            [subscriber])
+        self.assertEqual(
+            api.ripcord.subscriber_search(self.request, 'rpid'),
+            [subscriber])
+
+        api.ripcord.subscriber_delete(self.request, subscriber.uuid)
+        self.assertEqual(
+            api.ripcord.subscriber_search(self.request, 'example'), [])
+        api.ripcord.subscriber_create(self.request, username='new')
+        self.assertEqual(
+            api.ripcord.subscriber_search(self.request, 'username'),
+            [subscriber])
+
+    def test_search_index_is_built_once(self):
+        calls = []
+
+        def subscriber_list(request):
+            calls.append(request)
+            # Keep the build in flight while the other searches start.
+            time.sleep(0.05)
+            return self.subscribers.list()
+        self.mox.stubs.Set(api.ripcord, 'subscriber_list', subscriber_list)
+
+        threads = [threading.Thread(target=api.ripcord.subscriber_index,
+                                    args=(self.request,))
+                   for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(
+            api.ripcord.subscriber_search(self.request, 'example.com'),
+            [self.subscribers.first()])
+
+
+class ListingTests(test.TestCase):
+
+    def _subscriber(self, uuid):
+        return subscriber.Subscriber(subscriber.SubscriberManager(None),
+                                     {'uuid': uuid, 'username': uuid})
+
+    @test.create_stubs({api.ripcord: ('client',)})
+    def test_lists_are_paged_locally(self):
+        subscribers = [self._subscriber(uuid) for uuid in ('3', '1', '2')]
+        client = self.mox.CreateMockAnything()
+        client.subscribers = self.mox.CreateMockAnything()
+        client.domains = self.mox.CreateMockAnything()
+        api.ripcord.client(IsA(http.HttpRequest)) \
+            .MultipleTimes().AndReturn(client)
+        # The client lists everything and takes no paging arguments, the
+        # pages are served from a single listing.
+        client.subscribers.list().AndReturn(subscribers)
+        client.subscribers.list().AndReturn(subscribers)
+        client.domains.list().AndReturn(self.project_domains.list())
+        self.mox.ReplayAll()
+
+        page = api.ripcord.subscriber_list(self.request, limit=2)
+        self.assertEqual([s.uuid for s in page], ['1', '2'])
+        page = api.ripcord.subscriber_list(self.request, limit=2,
+                                           marker='2')
+        self.assertEqual([s.uuid for s in page], ['3'])
+        self.assertEqual(api.ripcord.subscriber_list(self.request),
+                         subscribers)
+        page = api.ripcord.domain_list(self.request, marker='1')
+        self.assertEqual(page, [])
+
+    @test.create_stubs({api.ripcord: ('client',)})
+    def test_writes_drop_the_listing(self):
+        subscribers = [self._subscriber(uuid) for uuid in ('1', '2')]
+        client = self.mox.CreateMockAnything()
+        client.subscribers = self.mox.CreateMockAnything()
+        api.ripcord.client(IsA(http.HttpRequest)) \
+            .MultipleTimes().AndReturn(client)
+        client.subscribers.list().AndReturn(subscribers)
+        client.subscribers.delete('1').AndReturn(None)
+        client.subscribers.list().AndReturn(subscribers[1:])
+        self.mox.ReplayAll()
+
+        page = api.ripcord.subscriber_list(self.request, limit=1)
+        self.assertEqual([s.uuid for s in page], ['1'])
+        api.ripcord.subscriber_delete(self.request, '1')
+        page = api.ripcord.subscriber_list(self.request, limit=1)
+        self.assertEqual([s.uuid for s in page], ['2'])
@@ -0,0 +1,72 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from wildcard.api import search
+from wildcard.test import helpers as test
+
+
+class Doc(object):
+    def __init__(self, uuid, name, email=None):
+        self.uuid = uuid
+        self.name = name
+        self.email = email
+
+
+class TrigramIndexTests(test.TestCase):
+
+    def setUp(self):
+        super(TrigramIndexTests, self).setUp()
+        self.index = search.TrigramIndex(('name', 'email'))
+        self.index.extend([Doc('1', 'alice', 'alice@example.com'),
+                           Doc('2', 'Bob', 'bob@example.org'),
+                           Doc('3', 'carol')])
+
+    def _search(self, query, **kwargs):
+        return [doc.uuid for doc in self.index.search(query, **kwargs)]
+
+    def test_trigrams(self):
+        self.assertEqual(search.trigrams('abcd'), set(['abc', 'bcd']))
+        self.assertEqual(search.trigrams('ab'), set())
+
+    def test_substring_search(self):
+        self.assertEqual(self._search('example'), ['1', '2'])
+        self.assertEqual(self._search('EXAMPLE.org'), ['2'])
+        self.assertEqual(self._search('lic'), ['1'])
+        self.assertEqual(self._search('missing'), [])
+        self.assertEqual(self._search('  '), [])
+
+    def test_short_queries_scan(self):
+        self.assertEqual(self._search('o'), ['1', '2', '3'])
+        self.assertEqual(self._search('ca'), ['3'])
+
+    def test_no_cross_field_matches(self):
+        # "alice" + "alice@..." would contain "ealice" if the fields were
+        # indexed as one string.
+        self.assertEqual(self._search('ealice'), [])
+
+    def test_limit(self):
+        self.assertEqual(self._search('example', limit=1), ['1'])
+
+    def test_predicate(self):
+        self.assertEqual(self._search('example', limit=1,
+                                      predicate=lambda doc: doc.uuid != '1'),
+                         ['2'])
+
+    def test_updates(self):
+        self.index.add(Doc('2', 'robert'))
+        self.assertEqual(self._search('bob'), [])
+        self.assertEqual(self._search('rob'), ['2'])
+        self.index.discard('1')
+        self.assertEqual(self._search('example'), [])
+        self.assertEqual(len(self.index), 2)
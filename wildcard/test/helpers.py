@@ -42,6 +42,7 @@ from horizon import middleware
 from horizon.test import helpers as horizon_helpers
 
 from wildcard import api
+from wildcard.api import cache
 from wildcard import context_processors
 from wildcard.test.test_data import utils as test_utils
 
@@ -109,6 +110,7 @@ class TestCase(horizon_helpers.TestCase):
     """
     def setUp(self):
         test_utils.load_test_data(self)
+        cache.clear_all()
         self.mox = mox.Mox()
         self.factory = RequestFactoryWithMessages()
         self.context = {'authorized_tenants': self.tenants.list()}
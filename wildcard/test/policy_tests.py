@@ -0,0 +1,363 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import BaseHTTPServer
+import SocketServer
+import threading
+import time
+import urlparse
+
+from wildcard.openstack.common import policy
+from wildcard import policy as wildcard_policy
+from wildcard.test import helpers as test
+
+
+RULES = {
+    'admin': 'role:Admin',
+    'owner': 'project_id:%(project_id)s and not role:dunce',
+    'admin_or_owner': 'rule:admin or rule:owner',
+    'user': 'rule:admin_or_owner and user_id:%(user.id)s',
+    'missing_ref': 'rule:missing or role:member',
+    'disabled': '! and rule:user',
+    'infix': 'project_id:x%(project_id)sy or rule:user',
+    'list': [['role:admin'], ['project_id:%(project_id)s', 'role:member']],
+    'negated': 'not rule:user',
+    'constant': 'is_admin:True or domain_id:1',
+    'default': 'role:member',
+}
+
+TARGETS = [
+    {},
+    {'project_id': '1'},
+    {'project_id': '2', 'user.id': 'u'},
+    {'project_id': '1', 'user.id': 'u', 'domain_id': '1'},
+]
+
+CREDENTIALS = [
+    {'roles': roles, 'project_id': '1', 'user_id': 'u', 'domain_id': '1',
+     'is_admin': is_admin}
+    for roles in ([], ['admin'], ['Member'], ['dunce', 'member'])
+    for is_admin in (True, False)
+]
+
+
+class CompiledPolicyTests(test.TestCase):
+
+    def _enforcer(self, default_rule=None):
+        enforcer = policy.Enforcer(default_rule=default_rule)
+        # The rules below are all there is, never read the policy file.
+        enforcer.load_rules = lambda force_reload=False: None
+        enforcer.set_rules(policy.Rules(
+            dict((k, policy.parse_rule(v)) for k, v in RULES.items()),
+            default_rule))
+        return enforcer
+
+    def _tree(self, enforcer, rule, target, creds):
+        try:
+            return enforcer.rules[rule](target, creds, enforcer)
+        except KeyError:
+            return False
+
+    def test_compiled_rules_match_the_tree(self):
+        for default_rule in (None, 'default'):
+            enforcer = self._enforcer(default_rule)
+            for rule in RULES.keys() + ['unknown']:
+                for target in TARGETS:
+                    for creds in CREDENTIALS:
+                        self.assertEqual(
+                            enforcer.enforce(rule, target, creds),
+                            self._tree(enforcer, rule, target, creds),
+                            (default_rule, rule, target, creds))
+
+    def test_rules_are_recompiled_when_replaced(self):
+        enforcer = self._enforcer()
+        creds = {'roles': ['admin']}
+        self.assertTrue(enforcer.enforce('admin', {}, creds))
+
+        enforcer.set_rules({'admin': policy.parse_rule('role:root')})
+        self.assertFalse(enforcer.enforce('admin', {}, creds))
+
+        enforcer.rules = policy.Rules(
+            {'admin': policy.parse_rule('role:admin')})
+        self.assertTrue(enforcer.enforce('admin', {}, creds))
+
+    def test_rule_references_are_inlined(self):
+        enforcer = self._enforcer()
+        compiler = enforcer._get_compiler()
+        compiler.rule('user')
+        self.mox.StubOutWithMock(policy.RuleCheck, '__call__')
+        self.mox.ReplayAll()
+
+        self.assertTrue(enforcer.enforce(
+            'user', {'project_id': '1', 'user.id': 'u'},
+            {'roles': [], 'project_id': '1', 'user_id': 'u'}))
+
+    def test_role_only_decisions_are_shared(self):
+        enforcer = self._enforcer()
+        compiler = enforcer._get_compiler()
+        self.assertTrue(compiler.depends_on_roles_only('admin'))
+        self.assertTrue(compiler.depends_on_roles_only('missing_ref'))
+        self.assertFalse(compiler.depends_on_roles_only('owner'))
+        self.assertFalse(compiler.depends_on_roles_only('constant'))
+
+        self.assertTrue(enforcer.enforce(
+            'admin', {}, {'roles': ['Admin'], 'user_id': 'a'}))
+        self.assertTrue(enforcer.enforce(
+            'admin', {'project_id': '1'}, {'roles': ['admin'],
+                                           'user_id': 'b'}))
+        self.assertFalse(enforcer.enforce(
+            'admin', {}, {'roles': ['member'], 'user_id': 'a'}))
+        self.assertEqual(len(compiler._role_decisions), 2)
+
+        enforcer.set_rules({'admin': policy.parse_rule('role:member')})
+        self.assertTrue(enforcer.enforce(
+            'admin', {}, {'roles': ['member'], 'user_id': 'a'}))
+
+    def test_rules_being_compiled_are_awaited(self):
+        enforcer = policy.Enforcer()
+        enforcer.load_rules = lambda force_reload=False: None
+        enforcer.set_rules({
+            'admin_required': policy.parse_rule('role:admin'),
+            'delete': policy.parse_rule('rule:admin_required')})
+        creds = {'roles': ['admin']}
+        compiling = threading.Event()
+        resume = threading.Event()
+        role_check = policy.Compiler._role_check
+
+        def paused_role_check(compiler, check):
+            # Hold the first thread in the middle of admin_required
+            if threading.current_thread() is first:
+                compiling.set()
+                resume.wait(5)
+            return role_check(compiler, check)
+
+        self.mox.stubs.Set(policy.Compiler, '_role_check', paused_role_check)
+
+        results = {}
+
+        def enforce(rule):
+            results[rule] = enforcer.enforce(rule, {}, creds)
+
+        first = threading.Thread(target=enforce, args=('admin_required',))
+        second = threading.Thread(target=enforce, args=('delete',))
+        first.start()
+        self.assertTrue(compiling.wait(5))
+        second.start()
+        # Let the second thread reach the rule being compiled
+        second.join(0.1)
+        resume.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(results, {'admin_required': True, 'delete': True})
+        self.assertTrue(enforcer.enforce('delete', {}, creds))
+
+
+class PolicyServerHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Allows the requests whose path ends with /allow, keeping alive."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.getheader('content-length'))
+        form = urlparse.parse_qs(self.rfile.read(length))
+        self.server.requests.append((self.path, self.client_address, form))
+        if self.path.endswith('/slow'):
+            time.sleep(0.3)
+        body = 'True' if self.path.endswith('/allow') else 'False'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PolicyServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients giving up on slow requests close their connection
+        pass
+
+
+class HttpCheckTests(test.TestCase):
+
+    def setUp(self):
+        super(HttpCheckTests, self).setUp()
+        self.server = PolicyServer(('127.0.0.1', 0), PolicyServerHandler)
+        self.server.requests = []
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.base = '//127.0.0.1:%d' % self.server.server_address[1]
+        self.client = policy.HttpClient(timeout=0.1, cache_ttl=60)
+        self.enforcer = policy.Enforcer(http_client=self.client)
+        self.enforcer.load_rules = lambda force_reload=False: None
+        self.enforcer.set_rules(dict(
+            (name, policy.parse_rule('http:%s/%%(project_id)s/%s'
+                                     % (self.base, name)))
+            for name in ('allow', 'deny', 'slow')))
+
+    def tearDown(self):
+        self.client.clear()
+        self.server.shutdown()
+        self.server.server_close()
+        super(HttpCheckTests, self).tearDown()
+
+    def test_decisions(self):
+        creds = {'roles': ['member'], 'user_id': 'u'}
+        self.assertTrue(self.enforcer.enforce('allow', {'project_id': '1'},
+                                              creds))
+        self.assertFalse(self.enforcer.enforce('deny', {'project_id': '1'},
+                                               creds))
+        path, address, form = self.server.requests[0]
+        self.assertEqual(path, '/1/allow')
+        self.assertEqual(policy.jsonutils.loads(form['credentials'][0]),
+                         creds)
+
+    def test_connection_is_kept_alive(self):
+        for project_id in ('1', '2', '3'):
+            self.enforcer.enforce('allow', {'project_id': project_id},
+                                  {'roles': []})
+        addresses = set(address for p, address, f in self.server.requests)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(addresses), 1)
+
+    def test_decisions_are_cached(self):
+        for i in range(3):
+            self.enforcer.enforce('allow', {'project_id': '1'},
+                                  {'roles': []})
+        self.assertEqual(len(self.server.requests), 1)
+
+        self.client.clear()
+        self.enforcer.enforce('allow', {'project_id': '1'}, {'roles': []})
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_timeout_fails_closed(self):
+        self.assertFalse(self.enforcer.enforce('slow', {'project_id': '1'},
+                                               {'roles': []}))
+
+    def test_timeout_fallback(self):
+        self.client.fallback = True
+        self.assertTrue(self.enforcer.enforce('slow', {'project_id': '1'},
+                                              {'roles': []}))
+        # Fallback decisions are not cached
+        self.client.fallback = False
+        self.assertFalse(self.enforcer.enforce('slow', {'project_id': '1'},
+                                               {'roles': []}))
+
+    def test_unreachable_server_fails_closed(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertFalse(self.enforcer.enforce('allow', {'project_id': '1'},
+                                               {'roles': []}))
+
+
+class PolicyReloadTests(test.TestCase):
+
+    def setUp(self):
+        super(PolicyReloadTests, self).setUp()
+        self.now = 1000.0
+        self.reads = []
+
+        def read_cached_file(filename, force_reload=False):
+            self.reads.append(filename)
+            return len(self.reads) == 1 or force_reload, '{"admin": ""}'
+
+        self.mox.stubs.Set(policy.fileutils, 'read_cached_file',
+                           read_cached_file)
+        self.mox.stubs.Set(policy.time, 'time', lambda: self.now)
+        self.enforcer = policy.Enforcer(recheck_interval=10)
+        self.enforcer.policy_path = 'policy.json'
+
+    def test_file_is_not_checked_within_the_interval(self):
+        for i in range(5):
+            self.assertTrue(self.enforcer.enforce('admin', {}, {}))
+            self.now += 1
+        self.assertEqual(len(self.reads), 1)
+
+        self.now += 10
+        self.enforcer.enforce('admin', {}, {})
+        self.assertEqual(len(self.reads), 2)
+
+    def test_force_reload_ignores_the_interval(self):
+        self.enforcer.load_rules()
+        self.enforcer.load_rules(force_reload=True)
+        self.assertEqual(len(self.reads), 2)
+
+    def test_no_interval_checks_every_time(self):
+        self.enforcer.recheck_interval = 0
+        for i in range(3):
+            self.enforcer.load_rules()
+        self.assertEqual(len(self.reads), 3)
+
+
+class PolicyCheckTests(test.TestCase):
+
+    def setUp(self):
+        super(PolicyCheckTests, self).setUp()
+        self.enforcer = wildcard_policy._get_enforcer()['identity']
+        self.calls = []
+        enforce = self.enforcer.enforce
+
+        def counting_enforce(rule, target, creds, *args, **kwargs):
+            self.calls.append((rule, target))
+            return enforce(rule, target, creds, *args, **kwargs)
+
+        self.mox.stubs.Set(self.enforcer, 'enforce', counting_enforce)
+
+    def test_target_keys(self):
+        self.assertEqual(self.enforcer.target_keys('identity:delete_group'),
+                         frozenset())
+        self.assertEqual(self.enforcer.target_keys('identity:update_user'),
+                         frozenset(['user_id']))
+
+    def test_unread_target_keys_share_a_decision(self):
+        action = (("identity", "identity:delete_group"),)
+        for group_id in ('1', '2', '3'):
+            wildcard_policy.check(action, self.request,
+                                  {'group_id': group_id})
+        wildcard_policy.check(action, self.request)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_read_target_keys_are_decided_separately(self):
+        action = (("identity", "identity:update_user"),)
+        for user_id in ('1', '2', '1', '2'):
+            wildcard_policy.check(action, self.request,
+                                  {'user_id': user_id, 'name': user_id * 2})
+        self.assertEqual(len(self.calls), 2)
+
+    def test_decisions_are_per_request(self):
+        action = (("identity", "identity:delete_group"),)
+        wildcard_policy.check(action, self.request)
+        wildcard_policy.check(action, self.factory.get('/'))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_check_many(self):
+        actions = [(("identity", "identity:delete_group"),),
+                   (("identity", "identity:update_user"),),
+                   (("identity", "identity:delete_group"),
+                    ("identity", "identity:update_user"))]
+        targets = [{'user_id': user_id} for user_id in ('1', '2', '1')]
+
+        matrix = wildcard_policy.check_many(actions, self.request, targets)
+
+        self.assertEqual(matrix, [
+            [wildcard_policy.check(rules, self.request, target)
+             for target in targets]
+            for rules in actions
+        ])
+        self.assertEqual(len(self.calls), 3)
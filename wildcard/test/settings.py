@@ -72,6 +72,9 @@ AVAILABLE_REGIONS = [
 ]
 
 OPENSTACK_KEYSTONE_URL = "http://localhost:5000/v2.0"
+
+WILDCARD_ADMIN_USER = "admin"
+WILDCARD_ADMIN_PASSWORD = "secret"
 OPENSTACK_KEYSTONE_DEFAULT_ROLE = "_member_"
 
 OPENSTACK_KEYSTONE_MULTIDOMAIN_SUPPORT = True
@@ -89,6 +92,9 @@ OPENSTACK_KEYSTONE_BACKEND = {
 KICKSTAND_PAYLOAD_BACKEND = True
 KICKSTAND_RIPCORD_BACKEND = True
 
+# Run backend calls inline so mox expectations are met in a fixed order.
+WILDCARD_API_CONCURRENCY = {'default': 1}
+
 KICKSTAND_RANDOM_PASSWORD_LENGTH = 12
 import string
 KICKSTAND_RANDOM_PASSWORD_CHARS = string.ascii_letters + string.digits
@@ -50,6 +50,14 @@ SERVICE_CATALOG = [
           "adminURL": "http://admin.payload.example.com:9859",
           "publicURL": "http://public.payload.example.com:9859",
           "internalURL": "http://int.payload.example.com:9859"}]},
+    {"type": "sip",
+     "name": "ripcord",
+     "endpoints_links": [],
+     "endpoints": [
+         {"region": "regionOne",
+          "adminURL": "http://admin.ripcord.example.com:9869",
+          "publicURL": "http://public.ripcord.example.com:9869",
+          "internalURL": "http://int.ripcord.example.com:9869"}]},
 ]
 
 